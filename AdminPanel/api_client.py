@@ -1,21 +1,81 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from configurations import main_config
+from configurations.config import APIConfig
 from fastapi import HTTPException
 from loguru import logger as api_logger
+from prometheus_client import Counter
+
+API_READS = Counter(
+    'adminpanel_api_reads_total',
+    'GET requests of the panel to the Database API by how they were served',
+    ['result']
+)
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+@dataclass
+class CacheEntry:
+    """
+    Cached answer of a GET request
+    """
+    value: Any
+    fetched_at: float
+
+
+def _error_detail(response: httpx.Response) -> str:
+    """
+    Readable reason of a failed Database API request instead of its raw body
+    """
+    try:
+        detail = response.json().get("detail")
+    except (ValueError, AttributeError):
+        detail = None
+    if isinstance(detail, str):
+        return detail
+    if isinstance(detail, list):
+        # Validation errors of the request body
+        return "; ".join(str(error.get("msg", error)) if isinstance(error, dict) else str(error) for error in detail)
+    return f"Database API ответил {response.status_code}"
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    """
+    A background refresh may have no caller to receive its error
+    """
+    if not task.cancelled() and task.exception() is not None:
+        api_logger.warning(f'Background refresh failed: {task.exception()!r}')
 
 
 class APIClient:
     """
-    Client for interacting with Database API
+    Client for interacting with Database API.
+    One instance per process (`api_client`) keeps a pooled HTTP client for the lifetime of the app.
+    Identical GET requests in flight are sent once and every caller gets the same answer;
+    list reads are also cached for a short time and served stale while they are refreshed.
+    Every write of the panel clears the cache, so the page after a redirect shows the change
     """
     
-    def __init__(self) -> None:
+    def __init__(self, config: APIConfig = main_config.api) -> None:
         """
-        Initialize API client with base URL and HTTP client
+        Initialize API client, the HTTP client is created by start()
+        
+        Args:
+            config: Database API configuration
         """
-        self.base_url: str = main_config.api.base_url
-        self.client: httpx.AsyncClient = httpx.AsyncClient(timeout=30.0)
+        self.config: APIConfig = config
+        self.base_url: str = config.base_url
+        self.client: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        # Bumped by every write, answers requested before the write are not cached
+        self._generation: int = 0
     
     async def __aenter__(self) -> "APIClient":
         """
@@ -24,6 +84,7 @@ class APIClient:
         Returns:
             APIClient instance
         """
+        await self.start()
         return self
     
     async def __aexit__(self, exc_type: Optional[type[BaseException]], exc_val: Optional[BaseException], exc_tb: Optional[Any]) -> None:
@@ -37,11 +98,98 @@ class APIClient:
         """
         await self.close()
     
+    async def start(self) -> None:
+        """
+        Create the HTTP client with its connection pool
+        """
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections
+                )
+            )
+            api_logger.info(f'API client started: max_connections={self.config.max_connections}')
+    
     async def close(self) -> None:
         """
         Close the HTTP client
         """
-        await self.client.aclose()
+        if self.client is not None:
+            for task in list(self._inflight.values()):
+                task.cancel()
+            await self.client.aclose()
+            self.client = None
+            self.invalidate()
+    
+    def invalidate(self) -> None:
+        """
+        Forget cached answers and requests in flight, the next reads go to the Database API
+        """
+        self._generation += 1
+        self._cache.clear()
+        self._inflight.clear()
+    
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None, cache: bool = False) -> Any:
+        """
+        Send a GET request, coalesced with an identical request in flight
+        
+        Args:
+            path: Path of the Database API endpoint
+            params: Query parameters, None values are dropped
+            cache: Serve the answer from the cache, for list reads
+            
+        Returns:
+            Decoded JSON answer, shared with other callers and must not be modified
+            
+        Raises:
+            httpx.HTTPStatusError: If the Database API answers with an error
+        """
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        key: CacheKey = (path, tuple(sorted((name, str(value)) for name, value in params.items())))
+        if cache:
+            entry = self._cache.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.fetched_at
+                if age < self.config.cache_ttl:
+                    API_READS.labels('hit').inc()
+                    self._cache.move_to_end(key)
+                    return entry.value
+                if age < self.config.cache_ttl + self.config.cache_stale:
+                    # Stale-while-revalidate: this caller does not wait, the refresh serves the next ones
+                    API_READS.labels('stale').inc()
+                    self._fetch(key, path, params, cache).add_done_callback(_log_refresh_error)
+                    return entry.value
+        API_READS.labels('coalesced' if key in self._inflight else 'miss').inc()
+        # Shielded: a caller what gives up does not cancel the request for the others
+        return await asyncio.shield(self._fetch(key, path, params, cache))
+    
+    def _fetch(self, key: CacheKey, path: str, params: Dict[str, Any], cache: bool) -> asyncio.Task:
+        """
+        Task of the request in flight for the key, started if there is none
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._request(key, path, params, cache, self._generation))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._request_done(key, done))
+        return task
+    
+    def _request_done(self, key: CacheKey, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+    
+    async def _request(self, key: CacheKey, path: str, params: Dict[str, Any], cache: bool, generation: int) -> Any:
+        response = await self.client.get(f"{self.base_url}{path}", params=params)
+        response.raise_for_status()
+        result = response.json()
+        if cache and generation == self._generation:
+            self._cache[key] = CacheEntry(result, time.monotonic())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.config.cache_size:
+                self._cache.popitem(last=False)
+        return result
     
     # User methods
     async def get_all_users(self) -> List[Dict[str, Any]]:
@@ -56,18 +204,91 @@ class APIClient:
         """
         try:
             api_logger.info('Request to get all users')
-            response = await self.client.get(f"{self.base_url}/user/get/all/users")
-            response.raise_for_status()
-            result = response.json()
+            result = await self._get("/user/get/all/users", cache=True)
             api_logger.info('All users received')
             return result
         except httpx.HTTPStatusError as e:
             api_logger.error('Error getting all users', exc_info=True)
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
         except Exception as e:
             api_logger.error('Error getting all users', exc_info=True)
             raise
     
+    async def get_users_page(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get one page of users, sorted and filtered by the Database API
+        
+        Args:
+            params: Query parameters: limit, sort, order, active, tag and one of the cursors after/before
+            
+        Returns:
+            Dictionary with items, total, next_cursor and prev_cursor
+            
+        Raises:
+            HTTPException: If request fails
+        """
+        try:
+            api_logger.info(f'Request to get a page of users: {params}')
+            result = await self._get("/user/get/users", params, cache=True)
+            api_logger.info(f'Page of {len(result["items"])} users received')
+            return result
+        except httpx.HTTPStatusError as e:
+            api_logger.error('Error getting a page of users', exc_info=True)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
+        except Exception as e:
+            api_logger.error('Error getting a page of users', exc_info=True)
+            raise
+    
+    async def get_devices_page(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get one page of devices, searched and filtered by the Database API
+        
+        Args:
+            params: Query parameters: limit, q, active, user_id and one of the cursors after/before
+            
+        Returns:
+            Dictionary with items, total, next_cursor and prev_cursor
+            
+        Raises:
+            HTTPException: If request fails
+        """
+        try:
+            api_logger.info(f'Request to get a page of devices: {params}')
+            result = await self._get("/device/get/devices", params, cache=True)
+            api_logger.info(f'Page of {len(result["items"])} devices received')
+            return result
+        except httpx.HTTPStatusError as e:
+            api_logger.error('Error getting a page of devices', exc_info=True)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
+        except Exception as e:
+            api_logger.error('Error getting a page of devices', exc_info=True)
+            raise
+    
+    async def get_stats(self, days: int) -> Dict[str, Any]:
+        """
+        Get the totals of users and devices and the signups of the last days
+        
+        Args:
+            days: Number of the last days with signups
+            
+        Returns:
+            Dictionary with users, users_banned, devices, devices_on and signups
+            
+        Raises:
+            HTTPException: If request fails
+        """
+        try:
+            api_logger.info(f'Request to get statistics: days={days}')
+            result = await self._get("/stats/get/stats", {"days": days}, cache=True)
+            api_logger.info('Statistics received')
+            return result
+        except httpx.HTTPStatusError as e:
+            api_logger.error('Error getting statistics', exc_info=True)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
+        except Exception as e:
+            api_logger.error('Error getting statistics', exc_info=True)
+            raise
+    
     async def get_user_by_id(self, user_id: int) -> Dict[str, Any]:
         """
         Get user by ID
@@ -83,14 +304,12 @@ class APIClient:
         """
         try:
             api_logger.info(f'Request to get user: user_id={user_id}')
-            response = await self.client.get(f"{self.base_url}/user/get/user/{user_id}")
-            response.raise_for_status()
-            result = response.json()
+            result = await self._get(f"/user/get/user/{user_id}")
             api_logger.info('User received')
             return result
         except httpx.HTTPStatusError as e:
             api_logger.error('Error getting user', exc_info=True)
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
         except Exception as e:
             api_logger.error('Error getting user', exc_info=True)
             raise
@@ -120,10 +339,13 @@ class APIClient:
             return result
         except httpx.HTTPStatusError as e:
             api_logger.error('An error occurred while creating the user', exc_info=True)
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
         except Exception as e:
             api_logger.error('An error occurred while creating the user', exc_info=True)
             raise
+        finally:
+            # Even a failed write may have been applied, cached pages must not hide it
+            self.invalidate()
     
     async def update_user(self, user_id: int, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -151,10 +373,46 @@ class APIClient:
             return result
         except httpx.HTTPStatusError as e:
             api_logger.error('Error updating user', exc_info=True)
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
         except Exception as e:
             api_logger.error('Error updating user', exc_info=True)
             raise
+        finally:
+            self.invalidate()
+    
+    async def set_users_active(self, user_ids: List[int], active: bool) -> List[Dict[str, Any]]:
+        """
+        Ban or unban many users with one request
+        
+        Args:
+            user_ids: IDs of the users to update
+            active: New active flag, False is a ban
+            
+        Returns:
+            List of dictionaries with data of the users what changed
+            
+        Raises:
+            HTTPException: If update fails
+        """
+        try:
+            api_logger.info(f'Bulk user update request: {len(user_ids)} users, active={active}')
+            # One statement on the Database API side, the ban of a whole page is applied or not at all
+            response = await self.client.put(
+                f"{self.base_url}/user/update/users",
+                json={"user_ids": user_ids, "active": active}
+            )
+            response.raise_for_status()
+            result = response.json()
+            api_logger.info(f'{len(result)} users updated')
+            return result
+        except httpx.HTTPStatusError as e:
+            api_logger.error('Error updating users', exc_info=True)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
+        except Exception as e:
+            api_logger.error('Error updating users', exc_info=True)
+            raise
+        finally:
+            self.invalidate()
     
     async def delete_user(self, user_id: int) -> Dict[str, Any]:
         """
@@ -178,9 +436,13 @@ class APIClient:
             return result
         except httpx.HTTPStatusError as e:
             api_logger.error('Error deleting user', exc_info=True)
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+            raise HTTPException(status_code=e.response.status_code, detail=_error_detail(e.response))
         except Exception as e:
             api_logger.error('Error deleting user', exc_info=True)
             raise
-    
+        finally:
+            self.invalidate()
+
 
+# Shared by all routes, started and closed by the app lifespan
+api_client: APIClient = APIClient()
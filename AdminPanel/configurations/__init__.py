@@ -5,11 +5,20 @@ env = EnvConfig.read()
 
 main_config = cf.Config(
     api=cf.APIConfig(
-        base_url=env('API_BASE_URL', default='http://database:8000')
+        base_url=env('API_BASE_URL', default='http://database:8000'),
+        timeout=env.float('API_TIMEOUT', 30.0),
+        max_connections=env.int('API_MAX_CONNECTIONS', 20),
+        cache_ttl=env.float('API_CACHE_TTL', 2.0),
+        cache_stale=env.float('API_CACHE_STALE', 10.0),
+        cache_size=env.int('API_CACHE_SIZE', 256)
     ),
     auth=cf.AuthConfig(
         secret_key=env('SECRET_KEY', default="secret_key2112"),
         username=env('ADMIN_USERNAME', default='admin'),
         password=env('ADMIN_PASSWORD', default='admin')
+    ),
+    monitoring=cf.MonitoringConfig(
+        loop_lag_interval=env.float('LOOP_LAG_INTERVAL', 0.5),
+        loop_block_threshold=env.float('LOOP_BLOCK_THRESHOLD', 0.25)
     )
 )
@@ -7,6 +7,14 @@ class APIConfig:
     Configuration class for Database API
     """
     base_url: str
+    timeout: float = 30.0
+    # Connections of the shared pool of the panel process
+    max_connections: int = 20
+    # Reads of lists are served from the cache for cache_ttl seconds,
+    # for the next cache_stale seconds the cached answer is served while it is refreshed in the background
+    cache_ttl: float = 2.0
+    cache_stale: float = 10.0
+    cache_size: int = 256
 
 
 @dataclass
@@ -19,6 +27,15 @@ class AuthConfig:
     password: str
 
 
+@dataclass
+class MonitoringConfig:
+    """
+    Configuration class for event loop monitoring
+    """
+    loop_lag_interval: float = 0.5
+    loop_block_threshold: float = 0.25
+
+
 @dataclass
 class Config:
     """
@@ -26,4 +43,5 @@ class Config:
     """
     api: APIConfig
     auth: AuthConfig
+    monitoring: MonitoringConfig
 
@@ -1,12 +1,42 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
+from prometheus_client import make_asgi_app
 from starlette.middleware.sessions import SessionMiddleware
 import uvicorn
 
+from api_client import api_client
 from configurations import main_config
-from routes import auth_routes, user_routes, index_routes
+from monitoring import LoopMonitor
+from rendering import precompile_templates
+from routes import auth_routes, user_routes, device_routes, dashboard_routes, index_routes
 from log.config import logger
 
-app = FastAPI(title="Admin Panel")
+loop_monitor: LoopMonitor = LoopMonitor(
+    "adminpanel",
+    interval=main_config.monitoring.loop_lag_interval,
+    block_threshold=main_config.monitoring.loop_block_threshold
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Application lifespan: precompile templates, start and stop background monitors and the shared Database API client
+    
+    Args:
+        app: FastAPI application
+    """
+    precompile_templates()
+    loop_monitor.start()
+    await api_client.start()
+    yield
+    await api_client.close()
+    await loop_monitor.stop()
+
+
+app = FastAPI(title="Admin Panel", lifespan=lifespan)
 
 # Add session middleware
 app.add_middleware(
@@ -20,6 +50,9 @@ app.add_middleware(
 app.include_router(index_routes.router)
 app.include_router(auth_routes.router)
 app.include_router(user_routes.router)
+app.include_router(device_routes.router)
+app.include_router(dashboard_routes.router)
+app.mount("/metrics", make_asgi_app())
 
 logger.info("Admin Panel initialized")
 
@@ -0,0 +1 @@
+from .loop_monitor import LoopMonitor
@@ -0,0 +1,108 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from loguru import logger as monitor_logger
+from prometheus_client import Counter, Histogram
+
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between the scheduled and the actual wake-up of the monitor task',
+    ['service'],
+    buckets=LOOP_LAG_BUCKETS
+)
+LOOP_BLOCKED = Counter(
+    'event_loop_blocked_total',
+    'Number of times the event loop was blocked longer than the threshold',
+    ['service']
+)
+
+
+class LoopMonitor:
+    """
+    Event loop lag monitor with blocking-call detector.
+
+    A task on the loop sleeps for ``interval`` seconds and records how late it woke up.
+    A watchdog thread follows the task heartbeat; when the loop does not come back
+    within ``block_threshold`` seconds, the stack of the loop thread is logged, which
+    points at the code that is blocking it.
+    """
+
+    def __init__(self, service: str, interval: float = 0.5, block_threshold: float = 0.25) -> None:
+        """
+        Args:
+            service: Service name used as metric label
+            interval: Sampling interval of the lag measurement in seconds
+            block_threshold: Lag in seconds after which the blocking stack is captured
+        """
+        self.service: str = service
+        self.interval: float = interval
+        self.block_threshold: float = block_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event: threading.Event = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: float = time.monotonic()
+
+    def start(self) -> None:
+        """
+        Start the lag measurement task and the watchdog thread on the running loop
+        """
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name=f'{self.service}-loop-watchdog', daemon=True)
+        self._watchdog.start()
+        monitor_logger.info(f'Event loop monitor started: interval={self.interval}s, threshold={self.block_threshold}s')
+
+    async def stop(self) -> None:
+        """
+        Stop the measurement task and the watchdog thread
+        """
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval + self.block_threshold)
+            self._watchdog = None
+        monitor_logger.info('Event loop monitor stopped')
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._heartbeat = time.monotonic()
+            LOOP_LAG.labels(self.service).observe(lag)
+
+    def _watch(self) -> None:
+        reported = False
+        check_every = max(self.block_threshold / 2, 0.01)
+        while not self._stop_event.wait(check_every):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.block_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            LOOP_BLOCKED.labels(self.service).inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<no frame>'
+            monitor_logger.warning(
+                f'Event loop blocked for {stalled:.3f}s, stack of the loop thread:\n{stack}'
+            )
@@ -0,0 +1,155 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader
+from loguru import logger
+
+TEMPLATES_DIR = "templates"
+# Rows of one request to the Database API, its page limit
+BACKEND_PAGE_SIZE = 500
+# Rendered HTML is sent in pieces of about this many characters
+STREAM_CHUNK_SIZE = 4096
+
+# Small pages are rendered into one string
+templates: Jinja2Templates = Jinja2Templates(directory=TEMPLATES_DIR)
+# Large tables are rendered while their rows arrive, loops of the templates accept async iterators
+stream_env: Environment = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True, enable_async=True)
+
+
+def precompile_templates() -> int:
+    """
+    Compile every template of both environments, so the first requests do not pay for it
+    and a broken template fails the start instead of a page
+
+    Returns:
+        Number of compiled templates
+    """
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+        stream_env.get_template(name)
+    logger.info(f'{len(names)} templates precompiled')
+    return len(names)
+
+
+class RowStream:
+    """
+    Rows of one table page assembled from keyset pages of the Database API.
+    prefetch() reads the first batch before the response starts, so its errors still get a proper status code;
+    the rest is read while the template renders, the next batch is requested while the current one is rendered
+    """
+
+    def __init__(self, fetch: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], params: Dict[str, Any],
+                 size: int) -> None:
+        """
+        Initialize stream, it yields no rows until prefetch() succeeds
+
+        Args:
+            fetch: API client method what reads one page by limit and after/before cursors
+            params: Query parameters of the page with its cursors
+            size: Number of rows of the page
+        """
+        self._fetch = fetch
+        self._params: Dict[str, Any] = params
+        self._size: int = size
+        self._rows: List[Dict[str, Any]] = []
+        self._forward: bool = params.get("before") is None
+        self.total: int = 0
+        self.next_cursor: Optional[Any] = None
+        self.prev_cursor: Optional[Any] = None
+        # Set when a batch after the first one could not be read, the table is cut short
+        self.failed: bool = False
+
+    def _request(self, limit: int, **cursor: Any) -> Awaitable[Dict[str, Any]]:
+        return self._fetch({**self._params, "limit": min(limit, BACKEND_PAGE_SIZE), "after": None, "before": None, **cursor})
+
+    async def prefetch(self) -> None:
+        """
+        Read the first batch. Going back, the rows before the cursor arrive nearest first,
+        so the whole page is read here and kept in memory
+
+        Raises:
+            HTTPException: If the Database API request fails
+        """
+        if self._forward:
+            page = await self._request(self._size, after=self._params.get("after"))
+            self._rows = page["items"]
+            self.total, self.next_cursor, self.prev_cursor = page["total"], page["next_cursor"], page["prev_cursor"]
+            return
+        cursor = self._params["before"]
+        while len(self._rows) < self._size:
+            page = await self._request(self._size - len(self._rows), before=cursor)
+            if not self._rows:
+                self.next_cursor = page["next_cursor"]
+            self._rows = page["items"] + self._rows
+            self.total, self.prev_cursor = page["total"], page["prev_cursor"]
+            cursor = page["prev_cursor"]
+            if cursor is None or not page["items"]:
+                break
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        rows, self._rows = self._rows, []
+        remaining = self._size - len(rows)
+        pending: Optional[asyncio.Task] = None
+        try:
+            while True:
+                if self._forward and remaining > 0 and self.next_cursor is not None:
+                    pending = asyncio.ensure_future(self._request(remaining, after=self.next_cursor))
+                for row in rows:
+                    yield row
+                if pending is None:
+                    return
+                try:
+                    page = await pending
+                except Exception:
+                    logger.error('Error loading the next rows of the table', exc_info=True)
+                    self.failed = True
+                    return
+                finally:
+                    pending = None
+                rows = page["items"]
+                remaining -= len(rows)
+                self.next_cursor = page["next_cursor"]
+                if not rows:
+                    return
+        finally:
+            # The client went away in the middle of the table
+            if pending is not None:
+                pending.cancel()
+
+
+async def _chunks(pieces: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """
+    Join the small pieces produced by the template into chunks of about STREAM_CHUNK_SIZE characters
+    """
+    buffer: List[str] = []
+    length = 0
+    async for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer).encode()
+            buffer.clear()
+            length = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def stream_template(name: str, context: Dict[str, Any], status_code: int = 200) -> StreamingResponse:
+    """
+    Render a template as a chunked response: the browser gets the head of the page at once
+    and the table grows while its rows are read from the Database API
+
+    Args:
+        name: Template name
+        context: Template context, RowStream values are iterated by the template loops
+        status_code: Status code of the response
+
+    Returns:
+        StreamingResponse with the rendered page
+    """
+    template = stream_env.get_template(name)
+    return StreamingResponse(_chunks(template.generate_async(context)), status_code=status_code,
+                             media_type="text/html; charset=utf-8")
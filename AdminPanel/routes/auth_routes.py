@@ -1,14 +1,13 @@
 from fastapi import APIRouter, Request, Form, HTTPException, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from typing import Union
 from loguru import logger
 
 from auth import verify_credentials
 from configurations import main_config
+from rendering import templates
 
 router: APIRouter = APIRouter()
-templates: Jinja2Templates = Jinja2Templates(directory="templates")
 
 
 @router.get("/login", response_model=None)
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Request, HTTPException, status
+from fastapi.responses import HTMLResponse
+from typing import Dict, Any, Optional
+from loguru import logger
+
+from auth import require_auth
+from api_client import api_client
+from rendering import templates
+
+router: APIRouter = APIRouter()
+
+SIGNUP_DAYS = 30
+
+
+@router.get("/dashboard", response_class=HTMLResponse)
+@require_auth
+async def dashboard_page(request: Request) -> HTMLResponse:
+    """
+    Dashboard page with the totals of users and devices and the signups of the last days.
+    The Database API serves them from counters, the page costs the same for any number of users
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        HTMLResponse with dashboard page
+    """
+    logger.info('Request to get dashboard page')
+    stats: Optional[Dict[str, Any]] = None
+    error = None
+    status_code = status.HTTP_200_OK
+    try:
+        stats = await api_client.get_stats(SIGNUP_DAYS)
+        logger.info('Dashboard loaded successfully')
+    except HTTPException as e:
+        logger.error('HTTP error loading dashboard', exc_info=True)
+        error = f"Ошибка при загрузке данных: {e.detail}"
+        status_code = e.status_code
+    except Exception as e:
+        logger.error('Error loading dashboard', exc_info=True)
+        error = "Произошла ошибка при загрузке сводки."
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    return templates.TemplateResponse(
+        "dashboard.html",
+        {
+            "request": request,
+            "stats": stats,
+            # Height of the tallest bar of the signups chart
+            "max_signups": max([day["users"] for day in stats["signups"]] + [1]) if stats else 1,
+            "days": SIGNUP_DAYS,
+            "error": error,
+            "active_tab": "dashboard",
+        },
+        status_code=status_code
+    )
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Request, HTTPException, status
+from fastapi.responses import HTMLResponse, StreamingResponse
+from typing import Dict, Any, Optional
+from urllib.parse import urlencode
+from loguru import logger
+
+from auth import require_auth
+from api_client import api_client
+from rendering import RowStream, stream_template
+from validation import validate_user_id
+
+router: APIRouter = APIRouter()
+
+# Rows per page the admin can choose, large pages are streamed while they are read
+DEVICES_PAGE_SIZES = (50, 500, 5000)
+
+
+def _cursor(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _devices_query(params: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Pick the search, filters and cursor of the devices page from query parameters, unknown values are dropped
+
+    Args:
+        params: Query parameters of the page
+
+    Returns:
+        Dictionary with size, q, active, user_id, after and before
+    """
+    owner = (params.get("user_id") or "").strip()
+    after = _cursor(params.get("after"))
+    size = params.get("size")
+    return {
+        "size": int(size) if size in map(str, DEVICES_PAGE_SIZES) else DEVICES_PAGE_SIZES[0],
+        "q": (params.get("q") or "").strip()[:100] or None,
+        "active": {"true": True, "false": False}.get(params.get("active")),
+        "user_id": owner or None,
+        "after": after,
+        "before": None if after is not None else _cursor(params.get("before")),
+    }
+
+
+def _devices_params(query: Dict[str, Any], **cursor: Optional[int]) -> str:
+    """
+    Query string of the devices page with the size, search and filters of the query and the given cursor
+    """
+    params = {
+        "size": None if query["size"] == DEVICES_PAGE_SIZES[0] else query["size"],
+        "q": query["q"],
+        "active": None if query["active"] is None else str(query["active"]).lower(),
+        "user_id": query["user_id"],
+        **cursor,
+    }
+    return urlencode({key: value for key, value in params.items() if value is not None})
+
+
+@router.get("/devices", response_class=HTMLResponse)
+@require_auth
+async def devices_page(request: Request) -> StreamingResponse:
+    """
+    Devices page, one page of devices searched and filtered by the Database API
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        StreamingResponse with devices page
+    """
+    logger.info('Request to get devices page')
+    query = _devices_query(dict(request.query_params))
+    error = None
+    status_code = status.HTTP_200_OK
+
+    if query["user_id"] is not None:
+        is_valid, error, query["user_id"] = validate_user_id(query["user_id"])
+        if not is_valid:
+            logger.warning(f'Devices page failed validation: error={error}')
+            status_code = status.HTTP_400_BAD_REQUEST
+
+    devices = RowStream(api_client.get_devices_page, {key: value for key, value in query.items() if key != "size"}, query["size"])
+    if error is None:
+        try:
+            await devices.prefetch()
+            logger.info('Devices page loaded successfully')
+        except HTTPException as e:
+            logger.error('HTTP error loading devices page', exc_info=True)
+            error = f"Ошибка при загрузке данных: {e.detail}"
+            status_code = e.status_code
+        except Exception as e:
+            logger.error('Error loading devices page', exc_info=True)
+            error = "Произошла ошибка при загрузке страницы устройств."
+            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    return stream_template(
+        "devices.html",
+        {
+            "request": request,
+            "devices": devices,
+            "query": query,
+            "page_sizes": DEVICES_PAGE_SIZES,
+            # The next cursor is known only after the last row, the links are built at the end of the table
+            "page_url": lambda **cursor: "/devices?" + _devices_params(query, **cursor),
+            "error": error,
+            "active_tab": "devices",
+        },
+        status_code=status_code
+    )
@@ -11,14 +11,14 @@ router: APIRouter = APIRouter()
 @require_auth
 async def index(request: Request) -> RedirectResponse:
     """
-    Redirect to users page
+    Redirect to dashboard page
     
     Args:
         request: FastAPI request object
         
     Returns:
-        RedirectResponse to users page
+        RedirectResponse to dashboard page
     """
-    logger.info('Request to index page, redirecting to users')
-    return RedirectResponse(url="/users", status_code=303)
+    logger.info('Request to index page, redirecting to dashboard')
+    return RedirectResponse(url="/dashboard", status_code=303)
 
@@ -1,81 +1,150 @@
 from fastapi import APIRouter, Request, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from typing import Dict, List, Any, Union
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from typing import Dict, List, Any, Optional, Union
+from urllib.parse import parse_qsl, urlencode
 from loguru import logger
 
 from auth import require_auth
-from api_client import APIClient
+from api_client import api_client
+from rendering import RowStream, stream_template
 from validation import validate_user_id
 
 router: APIRouter = APIRouter()
-templates: Jinja2Templates = Jinja2Templates(directory="templates")
 
+# Rows per page the admin can choose, large pages are streamed while they are read.
+# The largest one is the limit of the bulk user update of the Database API, a selected page is banned in one request
+USERS_PAGE_SIZES = (50, 500, 5000)
+USER_SORTS = ("create_time", "device_counter")
 
-@router.get("/users", response_class=HTMLResponse)
-@require_auth
-async def users_page(request: Request) -> HTMLResponse:
+
+def _users_query(params: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Pick the sort, filters and cursor of the users page from query parameters, unknown values fall back to defaults
+
+    Args:
+        params: Query parameters of the page
+
+    Returns:
+        Dictionary with size, sort, order, active, tag, after and before
+    """
+    active = params.get("active")
+    size = params.get("size")
+    return {
+        "size": int(size) if size in map(str, USERS_PAGE_SIZES) else USERS_PAGE_SIZES[0],
+        "sort": params.get("sort") if params.get("sort") in USER_SORTS else "create_time",
+        "order": "asc" if params.get("order") == "asc" else "desc",
+        "active": {"true": True, "false": False}.get(active),
+        "tag": (params.get("tag") or "").strip()[:100] or None,
+        "after": params.get("after") or None,
+        "before": None if params.get("after") else params.get("before") or None,
+    }
+
+
+def _users_params(query: Dict[str, Any], **cursor: Optional[str]) -> str:
+    """
+    Query string of the users page with the size, sort and filters of the query and the given cursor
+    """
+    params = {
+        "size": None if query["size"] == USERS_PAGE_SIZES[0] else query["size"],
+        "sort": query["sort"],
+        "order": query["order"],
+        "active": None if query["active"] is None else str(query["active"]).lower(),
+        "tag": query["tag"],
+        **cursor,
+    }
+    return urlencode({key: value for key, value in params.items() if value is not None})
+
+
+def _return_query(form_data: Any) -> Dict[str, Any]:
     """
-    Users management page
-    
+    Sort, filters and cursor of the page the form was posted from
+    """
+    return _users_query(dict(parse_qsl(str(form_data.get("return_to") or ""))))
+
+
+async def _render_users(request: Request, query: Dict[str, Any], error: Optional[str] = None,
+                        status_code: int = status.HTTP_200_OK) -> StreamingResponse:
+    """
+    Render the visible slice of users as a stream, an error of the page itself is shown instead of the table
+
     Args:
         request: FastAPI request object
-        
+        query: Size, sort, filters and cursor of the page
+        error: Error message to show above the table
+        status_code: Status code of the response
+
     Returns:
-        HTMLResponse with users page
+        StreamingResponse with users page
     """
+    params = {key: value for key, value in query.items() if key != "size"}
+    users = RowStream(api_client.get_users_page, params, query["size"])
     try:
-        logger.info('Request to get users page')
-        async with APIClient() as client:
-            users: List[Dict[str, Any]] = await client.get_all_users()
-        logger.info('Users page loaded successfully')
-        return templates.TemplateResponse(
-            "users.html",
-            {"request": request, "users": users, "active_tab": "users"}
-        )
+        await users.prefetch()
     except HTTPException as e:
         logger.error('HTTP error loading users page', exc_info=True)
-        return templates.TemplateResponse(
-            "users.html",
-            {"request": request, "users": [], "error": f"Ошибка при загрузке данных: {e.detail}", "active_tab": "users"},
-            status_code=e.status_code
-        )
+        error = error or f"Ошибка при загрузке данных: {e.detail}"
+        status_code = e.status_code if status_code == status.HTTP_200_OK else status_code
     except Exception as e:
         logger.error('Error loading users page', exc_info=True)
-        return templates.TemplateResponse(
-            "users.html",
-            {"request": request, "users": [], "error": "Произошла ошибка при загрузке страницы пользователей.", "active_tab": "users"},
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+        error = error or "Произошла ошибка при загрузке страницы пользователей."
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR if status_code == status.HTTP_200_OK else status_code
+
+    return stream_template(
+        "users.html",
+        {
+            "request": request,
+            "users": users,
+            "query": query,
+            "page_sizes": USERS_PAGE_SIZES,
+            # Forms post it back, so the redirect after a ban returns to the same slice
+            "return_to": _users_params(query, after=query["after"], before=query["before"]),
+            # The next cursor is known only after the last row, the links are built at the end of the table
+            "page_url": lambda **cursor: "/users?" + _users_params(query, **cursor),
+            "error": error,
+            "active_tab": "users",
+        },
+        status_code=status_code
+    )
+
+
+@router.get("/users", response_class=HTMLResponse)
+@require_auth
+async def users_page(request: Request) -> StreamingResponse:
+    """
+    Users management page, one page of users sorted and filtered by the Database API
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        StreamingResponse with users page
+    """
+    logger.info('Request to get users page')
+    return await _render_users(request, _users_query(dict(request.query_params)))
 
 
 @router.post("/users/update/{user_id}", response_model=None)
 @require_auth
-async def update_user(request: Request, user_id: int) -> Union[RedirectResponse, HTMLResponse]:
+async def update_user(request: Request, user_id: int) -> Union[RedirectResponse, StreamingResponse]:
     """
     Update user - only ban (active) field
-    
+
     Args:
         request: FastAPI request object
         user_id: Telegram user_id (unique identifier) of the user to update
-        
+
     Returns:
-        RedirectResponse to users page
+        RedirectResponse to the same page of users
     """
+    form_data = await request.form()
+    query = _return_query(form_data)
+
     # Validate user_id
     is_valid, error_message, validated_id = validate_user_id(user_id)
     if not is_valid:
         logger.warning(f'User update failed validation: user_id={user_id}, error={error_message}')
-        async with APIClient() as client:
-            users: List[Dict[str, Any]] = await client.get_all_users()
-        return templates.TemplateResponse(
-            "users.html",
-            {"request": request, "users": users, "error": error_message, "active_tab": "users"},
-            status_code=status.HTTP_400_BAD_REQUEST
-        )
-    
-    form_data = await request.form()
-    
+        return await _render_users(request, query, error_message, status.HTTP_400_BAD_REQUEST)
+
     try:
         logger.info(f'User update request: user_id={user_id}')
         # ban checkbox: if checked (present in form_data with value "on"), active=False
@@ -84,27 +153,60 @@ async def update_user(request: Request, user_id: int) -> Union[RedirectResponse,
         user_data: Dict[str, bool] = {
             "active": not ban_checked
         }
-        
-        async with APIClient() as client:
-            await client.update_user(validated_id, user_data)
+
+        await api_client.update_user(validated_id, user_data)
         logger.info('User updated')
-        return RedirectResponse(url="/users", status_code=303)
+        return RedirectResponse(url="/users?" + _users_params(query, after=query["after"], before=query["before"]), status_code=303)
     except HTTPException as e:
         logger.error('Error updating user', exc_info=True)
-        async with APIClient() as client:
-            users: List[Dict[str, Any]] = await client.get_all_users()
-        return templates.TemplateResponse(
-            "users.html",
-            {"request": request, "users": users, "error": f"Ошибка при обновлении пользователя: {e.detail}", "active_tab": "users"},
-            status_code=e.status_code
-        )
+        return await _render_users(request, query, f"Ошибка при обновлении пользователя: {e.detail}", e.status_code)
     except Exception as e:
         logger.error('Error updating user', exc_info=True)
-        async with APIClient() as client:
-            users: List[Dict[str, Any]] = await client.get_all_users()
-        return templates.TemplateResponse(
-            "users.html",
-            {"request": request, "users": users, "error": "Произошла ошибка при обновлении пользователя.", "active_tab": "users"},
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        return await _render_users(
+            request, query, "Произошла ошибка при обновлении пользователя.", status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+@router.post("/users/bulk", response_model=None)
+@require_auth
+async def bulk_update_users(request: Request) -> Union[RedirectResponse, StreamingResponse]:
+    """
+    Ban or unban all selected users with one request to the Database API
+
+    Args:
+        request: FastAPI request object
+
+    Returns:
+        RedirectResponse to the same page of users
+    """
+    form_data = await request.form()
+    query = _return_query(form_data)
+    action = form_data.get("action")
+    user_ids: List[int] = []
+    error_message = None
+    for raw_id in form_data.getlist("user_ids"):
+        is_valid, error_message, validated_id = validate_user_id(raw_id)
+        if not is_valid:
+            break
+        user_ids.append(validated_id)
+    if error_message is None and action not in ("ban", "unban"):
+        error_message = "Неизвестное действие."
+    if error_message is None and not user_ids:
+        error_message = "Выберите хотя бы одного пользователя."
+    if error_message is not None:
+        logger.warning(f'Bulk user update failed validation: error={error_message}')
+        return await _render_users(request, query, error_message, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        logger.info(f'Bulk user update request: action={action}, users={len(user_ids)}')
+        await api_client.set_users_active(user_ids, active=action == "unban")
+        logger.info('Users updated')
+        return RedirectResponse(url="/users?" + _users_params(query, after=query["after"], before=query["before"]), status_code=303)
+    except HTTPException as e:
+        logger.error('Error updating users', exc_info=True)
+        return await _render_users(request, query, f"Ошибка при обновлении пользователей: {e.detail}", e.status_code)
+    except Exception as e:
+        logger.error('Error updating users', exc_info=True)
+        return await _render_users(
+            request, query, "Произошла ошибка при обновлении пользователей.", status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
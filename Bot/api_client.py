@@ -1,5 +1,6 @@
+import json
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from configurations import main_config
 from datetime import datetime
 from loguru import logger as api_logger
@@ -16,7 +17,6 @@ class APIClient:
         """
         self.base_url: str = main_config.api.base_url
         self.client: httpx.AsyncClient = httpx.AsyncClient(timeout=30.0)
-        self.device_control_url: str | None = main_config.bot.device_control_url
     
     async def __aenter__(self) -> "APIClient":
         """
@@ -44,27 +44,6 @@ class APIClient:
         """
         await self.client.aclose()
 
-    async def send_device_packet(self, device_data: Dict[str, Any]) -> None:
-        """
-        Send device data to external controller if configured.
-        """
-        if not self.device_control_url:
-            return
-        try:
-            api_logger.info(
-                f"Sending device packet to controller: device_id={device_data.get('device_id')}"
-            )
-            response = await self.client.post(
-                self.device_control_url,
-                json=device_data,
-            )
-            response.raise_for_status()
-            api_logger.info("Device packet successfully delivered")
-        except httpx.HTTPStatusError:
-            api_logger.error('Controller rejected device packet', exc_info=True)
-        except Exception:
-            api_logger.error('Error sending device packet to controller', exc_info=True)
-    
     # User methods
     async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -160,6 +139,22 @@ class APIClient:
             api_logger.error('Error getting devices', exc_info=True)
             raise
     
+    async def get_registered_devices(self) -> List[Dict[str, Any]]:
+        """
+        Get every registered device of all users
+        
+        Returns:
+            List of dictionaries with device data
+        """
+        try:
+            api_logger.info('Request to get every registered device')
+            response = await self.client.get(f"{self.base_url}/device/get/all/devices")
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error getting registered devices', exc_info=True)
+            raise
+    
     async def get_device_by_id(self, device_id: int) -> Optional[Dict[str, Any]]:
         """
         Get device by ID
@@ -241,6 +236,34 @@ class APIClient:
             api_logger.error('An error occurred while creating the device', exc_info=True)
             raise
     
+    async def create_devices(self, user_id: int, devices: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Create many devices of the user in one transaction and add them to the user's devices list
+        
+        Args:
+            user_id: Telegram user_id of the owner
+            devices: List of dictionaries with title, description and address
+            
+        Returns:
+            List of dictionaries with created device data in the order of the input
+        """
+        try:
+            api_logger.info(f'Request to import {len(devices)} devices')
+            response = await self.client.post(
+                f"{self.base_url}/device/create/devices",
+                json={
+                    "user_id": user_id,
+                    "create_time": datetime.now().isoformat(),
+                    "devices": devices
+                }
+            )
+            response.raise_for_status()
+            api_logger.info('Devices imported')
+            return response.json()
+        except Exception as e:
+            api_logger.error('An error occurred while importing devices', exc_info=True)
+            raise
+    
     async def update_device(self, device_id: int, device_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Update device
@@ -269,6 +292,60 @@ class APIClient:
             api_logger.error('Error updating device', exc_info=True)
             raise
     
+    async def get_diverged_devices(self, older_than: float, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get devices whose reported state differs from the desired one
+        
+        Args:
+            older_than: Only devices diverged for longer than this many seconds
+            limit: Maximum number of devices
+            
+        Returns:
+            List of dictionaries with device data, the longest diverged first
+        """
+        try:
+            api_logger.info(f'Request to get diverged devices: older_than={older_than}')
+            response = await self.client.get(
+                f"{self.base_url}/device/get/diverged/devices",
+                params={"older_than": older_than, "limit": limit}
+            )
+            response.raise_for_status()
+            devices = response.json()
+            api_logger.info(f'Found {len(devices)} diverged devices')
+            return devices
+        except httpx.HTTPStatusError as e:
+            api_logger.error('Error getting diverged devices', exc_info=True)
+            raise
+        except Exception as e:
+            api_logger.error('Error getting diverged devices', exc_info=True)
+            raise
+    
+    async def stream_changes(self, entity: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Read the change feed of the Database API (Server-Sent Events) until the connection ends
+
+        Args:
+            entity: Entity whose changes are received, e.g. "device"
+
+        Yields:
+            Feed events: {"type": "change", ...} of one row or {"type": "resync"} after missed events
+        """
+        api_logger.info(f'Change feed subscription: entity={entity}')
+        # Heartbeats arrive every few seconds, a longer silence means the connection is dead
+        async with self.client.stream(
+            "GET", f"{self.base_url}/events/stream", params={"entity": entity}, timeout=httpx.Timeout(30.0)
+        ) as response:
+            response.raise_for_status()
+            data: List[str] = []
+            async for line in response.aiter_lines():
+                if line.startswith('data:'):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    event = json.loads('\n'.join(data))
+                    data = []
+                    if event.get('type'):
+                        yield event
+
     async def delete_device(self, device_id: int, user_id: int) -> Dict[str, Any]:
         """
         Delete device and remove it from user's devices list
@@ -312,3 +389,308 @@ class APIClient:
             api_logger.error('Error deleting device', exc_info=True)
             raise
 
+
+    # Group and scene methods
+    async def get_user_groups(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Get device groups of a user
+        
+        Args:
+            user_id: Telegram user_id of the owner
+            
+        Returns:
+            List of dictionaries with group data
+        """
+        try:
+            api_logger.info(f'Request to get groups of user: user_id={user_id}')
+            response = await self.client.get(f"{self.base_url}/group/get/user/groups/{user_id}")
+            response.raise_for_status()
+            groups = response.json()
+            api_logger.info(f'Found {len(groups)} groups for user')
+            return groups
+        except Exception as e:
+            api_logger.error('Error getting groups', exc_info=True)
+            raise
+
+    async def get_group_by_id(self, group_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get group by ID
+        
+        Args:
+            group_id: ID of the group
+            
+        Returns:
+            Dictionary with group data or None if not found
+        """
+        try:
+            api_logger.info(f'Request to get group: group_id={group_id}')
+            response = await self.client.get(f"{self.base_url}/group/get/group/{group_id}")
+            if response.status_code in (400, 404):
+                return None
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error getting group', exc_info=True)
+            raise
+
+    async def get_group_devices(self, group_id: int) -> List[Dict[str, Any]]:
+        """
+        Get member devices of a group
+        
+        Args:
+            group_id: ID of the group
+            
+        Returns:
+            List of dictionaries with device data
+        """
+        try:
+            api_logger.info(f'Request to get group devices: group_id={group_id}')
+            response = await self.client.get(f"{self.base_url}/group/get/group/devices/{group_id}")
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error getting group devices', exc_info=True)
+            raise
+
+    async def create_group(self, user_id: int, title: str, devices: List[int]) -> Dict[str, Any]:
+        """
+        Create a device group
+        
+        Args:
+            user_id: Telegram user_id of the owner
+            title: Group title
+            devices: IDs of the member devices
+            
+        Returns:
+            Dictionary with created group data
+        """
+        try:
+            api_logger.info('Request to create a new group')
+            response = await self.client.post(
+                f"{self.base_url}/group/create/group",
+                json={
+                    "user_id": user_id,
+                    "title": title,
+                    "devices": devices,
+                    "create_time": datetime.now().isoformat()
+                }
+            )
+            response.raise_for_status()
+            api_logger.info('New group created')
+            return response.json()
+        except Exception as e:
+            api_logger.error('An error occurred while creating the group', exc_info=True)
+            raise
+
+    async def set_group_state(self, group_id: int, active: bool) -> List[Dict[str, Any]]:
+        """
+        Turn all devices of a group on or off
+        
+        Args:
+            group_id: ID of the group
+            active: Desired state
+            
+        Returns:
+            List of dictionaries with data of the devices what changed
+        """
+        try:
+            api_logger.info(f'Group state request: group_id={group_id}, active={active}')
+            response = await self.client.put(
+                f"{self.base_url}/group/set/group/{group_id}",
+                json={"active": active}
+            )
+            response.raise_for_status()
+            devices = response.json()
+            api_logger.info(f'Group state changed for {len(devices)} devices')
+            return devices
+        except Exception as e:
+            api_logger.error('Error setting group state', exc_info=True)
+            raise
+
+    async def delete_group(self, group_id: int) -> Dict[str, Any]:
+        """
+        Delete a group, the devices are kept
+        
+        Args:
+            group_id: ID of the group
+            
+        Returns:
+            Dictionary with deleted group data
+        """
+        try:
+            api_logger.info(f'Request to delete group: group_id={group_id}')
+            response = await self.client.delete(f"{self.base_url}/group/delete/group/{group_id}")
+            response.raise_for_status()
+            api_logger.info('Group deleted')
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error deleting group', exc_info=True)
+            raise
+
+    async def get_user_scenes(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Get scenes of a user
+        
+        Args:
+            user_id: Telegram user_id of the owner
+            
+        Returns:
+            List of dictionaries with scene data
+        """
+        try:
+            api_logger.info(f'Request to get scenes of user: user_id={user_id}')
+            response = await self.client.get(f"{self.base_url}/scene/get/user/scenes/{user_id}")
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error getting scenes', exc_info=True)
+            raise
+
+    async def create_scene(self, user_id: int, title: str, states: Dict[int, bool]) -> Dict[str, Any]:
+        """
+        Save a scene
+        
+        Args:
+            user_id: Telegram user_id of the owner
+            title: Scene title
+            states: Desired state by device ID
+            
+        Returns:
+            Dictionary with created scene data
+        """
+        try:
+            api_logger.info('Request to create a new scene')
+            response = await self.client.post(
+                f"{self.base_url}/scene/create/scene",
+                json={
+                    "user_id": user_id,
+                    "title": title,
+                    "states": {str(device_id): active for device_id, active in states.items()},
+                    "create_time": datetime.now().isoformat()
+                }
+            )
+            response.raise_for_status()
+            api_logger.info('New scene created')
+            return response.json()
+        except Exception as e:
+            api_logger.error('An error occurred while creating the scene', exc_info=True)
+            raise
+
+    async def apply_scene(self, scene_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Set all devices of a scene to their saved states
+        
+        Args:
+            scene_id: ID of the scene
+            
+        Returns:
+            List of dictionaries with data of the devices what changed or None if the scene does not exist
+        """
+        try:
+            api_logger.info(f'Request to apply scene: scene_id={scene_id}')
+            response = await self.client.post(f"{self.base_url}/scene/apply/scene/{scene_id}")
+            if response.status_code == 400:
+                return None
+            response.raise_for_status()
+            devices = response.json()
+            api_logger.info(f'Scene changed {len(devices)} devices')
+            return devices
+        except Exception as e:
+            api_logger.error('Error applying scene', exc_info=True)
+            raise
+
+    async def delete_scene(self, scene_id: int) -> Dict[str, Any]:
+        """
+        Delete a scene
+        
+        Args:
+            scene_id: ID of the scene
+            
+        Returns:
+            Dictionary with deleted scene data
+        """
+        try:
+            api_logger.info(f'Request to delete scene: scene_id={scene_id}')
+            response = await self.client.delete(f"{self.base_url}/scene/delete/scene/{scene_id}")
+            response.raise_for_status()
+            api_logger.info('Scene deleted')
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error deleting scene', exc_info=True)
+            raise
+
+    async def create_schedule(self, user_id: int, device_id: int, active: bool,
+                              delay: Optional[int] = None, time_of_day: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Schedule a state change of a device: once after a delay or every day at a time
+        
+        Args:
+            user_id: Telegram user_id of the owner
+            device_id: ID of the device
+            active: State what is set when the schedule fires
+            delay: Seconds until a one-time change
+            time_of_day: Time of a daily change, "HH:MM"
+            
+        Returns:
+            Dictionary with created schedule data or None if the user does not own the device
+        """
+        try:
+            api_logger.info(f'Request to create a new schedule: device_id={device_id}')
+            payload = {
+                "user_id": user_id,
+                "device_id": device_id,
+                "active": active,
+                "create_time": datetime.now().isoformat()
+            }
+            if time_of_day is not None:
+                payload.update(kind="daily", time_of_day=time_of_day)
+            else:
+                payload.update(kind="once", delay=delay)
+            response = await self.client.post(f"{self.base_url}/schedule/create/schedule", json=payload)
+            if response.status_code == 400:
+                return None
+            response.raise_for_status()
+            api_logger.info('New schedule created')
+            return response.json()
+        except Exception as e:
+            api_logger.error('An error occurred while creating the schedule', exc_info=True)
+            raise
+
+    async def get_device_schedules(self, device_id: int) -> List[Dict[str, Any]]:
+        """
+        Get schedules of a device
+        
+        Args:
+            device_id: ID of the device
+            
+        Returns:
+            List of dictionaries with schedule data, the nearest first
+        """
+        try:
+            api_logger.info(f'Request to get schedules of device: device_id={device_id}')
+            response = await self.client.get(f"{self.base_url}/schedule/get/device/schedules/{device_id}")
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error getting schedules', exc_info=True)
+            raise
+
+    async def delete_schedule(self, schedule_id: int) -> Dict[str, Any]:
+        """
+        Delete a schedule
+        
+        Args:
+            schedule_id: ID of the schedule
+            
+        Returns:
+            Dictionary with deleted schedule data
+        """
+        try:
+            api_logger.info(f'Request to delete schedule: schedule_id={schedule_id}')
+            response = await self.client.delete(f"{self.base_url}/schedule/delete/schedule/{schedule_id}")
+            response.raise_for_status()
+            api_logger.info('Schedule deleted')
+            return response.json()
+        except Exception as e:
+            api_logger.error('Error deleting schedule', exc_info=True)
+            raise
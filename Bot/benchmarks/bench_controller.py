@@ -0,0 +1,75 @@
+"""
+Throughput of the controller transports against the local fake controller.
+
+    python benchmarks/bench_controller.py --commands 5000 --batch 50 --delay 0.002
+
+Commands are handed to the transport in outbox-sized batches, like the outbox worker does,
+once over HTTP POST per command and once over the batched WebSocket stream.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller import make_transport
+from controller.fake_controller import FakeController
+
+
+async def measure(url: str, commands: int, batch: int, concurrency: int) -> None:
+    transport = make_transport(url, concurrency=concurrency, frame_size=batch)
+    latencies = []
+    failed = 0
+    started = time.perf_counter()
+    try:
+        for first in range(0, commands, batch):
+            frame = {
+                command_id: {'device_id': command_id % 100, 'active': command_id % 2 == 0}
+                for command_id in range(first, min(first + batch, commands))
+            }
+            t0 = time.perf_counter()
+            results = await transport.send_batch(frame)
+            latencies.append(time.perf_counter() - t0)
+            failed += sum(error is not None for error in results.values())
+    finally:
+        await transport.close()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f'{url.split("://")[0]:<5} {commands} commands in {elapsed:.2f}s -> {commands / elapsed:.0f} cmd/s, '
+        f'batch p50={statistics.median(latencies) * 1000:.1f}ms p95={p95 * 1000:.1f}ms, failed={failed}'
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    runner = web.AppRunner(FakeController(delay=args.delay).make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', args.port)
+    await site.start()
+    try:
+        await measure(f'http://127.0.0.1:{args.port}/packet', args.commands, args.batch, args.concurrency)
+        await measure(f'ws://127.0.0.1:{args.port}/ws', args.commands, args.batch, args.concurrency)
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--delay', type=float, default=0.0, help='Processing time of one command on the controller')
+    parser.add_argument('--port', type=int, default=9077)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict
 from .env_conf import EnvConfig
 
 
@@ -16,7 +17,78 @@ class BotConfig:
     Configuration class for Telegram Bot
     """
     token: str
-    device_control_url: str | None = None
+
+
+@dataclass
+class ControllerConfig:
+    """
+    Configuration class for the device controllers.
+    url is the default controller, routes send devices to other controllers by address prefix
+    """
+    url: str | None = None
+    routes: Dict[str, str] = field(default_factory=dict)
+    limits: Dict[str, int] = field(default_factory=dict)
+    timeout: float = 10.0
+    concurrency: int = 10
+    frame_size: int = 100
+
+
+@dataclass
+class OutboxConfig:
+    """
+    Configuration class for the durable outbox of controller commands
+    """
+    path: str = "/app/data/outbox.db"
+    batch_size: int = 50
+    max_attempts: int = 8
+    retry_base: float = 1.0
+    retry_max: float = 60.0
+    lease: float = 60.0
+    poll_interval: float = 1.0
+    retention: float = 86400.0
+    coalesce_window: float = 0.5
+
+
+@dataclass
+class ReconcilerConfig:
+    """
+    Configuration class for the reconciler of desired and reported device states
+    """
+    interval: float = 10.0
+    deadline: float = 30.0
+    batch_size: int = 500
+    max_attempts: int = 5
+
+
+@dataclass
+class DispatchConfig:
+    """
+    Configuration class for the dispatch of device changes made outside the bot (schedules, rules, API clients)
+    """
+    enabled: bool = True
+    retry: float = 5.0
+
+
+@dataclass
+class ReachabilityConfig:
+    """
+    Configuration class for the background prober of device addresses
+    """
+    enabled: bool = True
+    interval: float = 60.0
+    timeout: float = 3.0
+    concurrency: int = 50
+    default_port: int = 80
+
+
+@dataclass
+class MonitoringConfig:
+    """
+    Configuration class for event loop monitoring and metrics export
+    """
+    metrics_port: int = 9100
+    loop_lag_interval: float = 0.5
+    loop_block_threshold: float = 0.25
 
 
 @dataclass
@@ -26,6 +98,12 @@ class Config:
     """
     api: APIConfig
     bot: BotConfig
+    controller: ControllerConfig
+    outbox: OutboxConfig
+    reconciler: ReconcilerConfig
+    dispatch: DispatchConfig
+    reachability: ReachabilityConfig
+    monitoring: MonitoringConfig
 
 
 def load_config() -> Config:
@@ -42,8 +120,45 @@ def load_config() -> Config:
             base_url=env.str("API_BASE_URL", default="http://database:8000")
         ),
         bot=BotConfig(
-            token=env.str("BOT_TOKEN", default=""),
-            device_control_url=env.str("DEVICE_CONTROL_URL", default="").strip() or None
+            token=env.str("BOT_TOKEN", default="")
+        ),
+        controller=ControllerConfig(
+            url=env.str("DEVICE_CONTROL_URL", default="").strip() or None,
+            routes=env.dict("CONTROLLER_ROUTES", default={}),
+            limits=env.dict("CONTROLLER_LIMITS", subcast_values=int, default={}),
+            timeout=env.float("CONTROLLER_TIMEOUT", default=10.0),
+            concurrency=env.int("CONTROLLER_CONCURRENCY", default=10),
+            frame_size=env.int("CONTROLLER_FRAME_SIZE", default=100)
+        ),
+        outbox=OutboxConfig(
+            path=env.str("OUTBOX_PATH", default="/app/data/outbox.db"),
+            batch_size=env.int("OUTBOX_BATCH_SIZE", default=50),
+            max_attempts=env.int("OUTBOX_MAX_ATTEMPTS", default=8),
+            retry_base=env.float("OUTBOX_RETRY_BASE", default=1.0),
+            retry_max=env.float("OUTBOX_RETRY_MAX", default=60.0),
+            coalesce_window=env.float("OUTBOX_COALESCE_WINDOW", default=0.5)
+        ),
+        reconciler=ReconcilerConfig(
+            interval=env.float("RECONCILE_INTERVAL", default=10.0),
+            deadline=env.float("RECONCILE_DEADLINE", default=30.0),
+            batch_size=env.int("RECONCILE_BATCH_SIZE", default=500),
+            max_attempts=env.int("RECONCILE_MAX_ATTEMPTS", default=5)
+        ),
+        dispatch=DispatchConfig(
+            enabled=env.bool("DISPATCH_ENABLED", default=True),
+            retry=env.float("DISPATCH_RETRY_DELAY", default=5.0)
+        ),
+        reachability=ReachabilityConfig(
+            enabled=env.bool("PROBE_ENABLED", default=True),
+            interval=env.float("PROBE_INTERVAL", default=60.0),
+            timeout=env.float("PROBE_TIMEOUT", default=3.0),
+            concurrency=env.int("PROBE_CONCURRENCY", default=50),
+            default_port=env.int("PROBE_DEFAULT_PORT", default=80)
+        ),
+        monitoring=MonitoringConfig(
+            metrics_port=env.int("METRICS_PORT", default=9100),
+            loop_lag_interval=env.float("LOOP_LAG_INTERVAL", default=0.5),
+            loop_block_threshold=env.float("LOOP_BLOCK_THRESHOLD", default=0.25)
         )
     )
 
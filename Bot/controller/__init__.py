@@ -0,0 +1,2 @@
+from .routing import ControllerRouter, PrefixTrie
+from .transport import ControllerTransport, HTTPControllerTransport, WebSocketControllerTransport, make_transport
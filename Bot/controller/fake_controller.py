@@ -0,0 +1,115 @@
+"""
+Local fake device controller for tests and benchmarks.
+Speaks both protocols of the bot: JSON POST per command on /packet and the batched WebSocket stream on /ws.
+With --report-url it reports applied states back to the DataBase API like a real controller.
+
+    python -m controller.fake_controller --port 9000 --delay 0.005 --fail-rate 0.1 \
+        --report-url http://localhost:8000/device/report/devices --lose-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import ClientSession, WSMsgType, web
+
+
+class FakeController:
+    """
+    In-memory controller what records the last state of every device
+    """
+
+    def __init__(self, delay: float = 0.0, fail_rate: float = 0.0, report_url: Optional[str] = None,
+                 lose_rate: float = 0.0) -> None:
+        """
+        Args:
+            delay: Processing time of one command in seconds
+            fail_rate: Share of commands what are rejected
+            report_url: Batch report endpoint of the DataBase API, states are not reported if None
+            lose_rate: Share of commands what are acknowledged but never reach the hardware
+        """
+        self.delay: float = delay
+        self.fail_rate: float = fail_rate
+        self.report_url: Optional[str] = report_url
+        self.lose_rate: float = lose_rate
+        self.states: Dict[int, bool] = {}
+        self.received: int = 0
+
+    async def _apply(self, device: Dict[str, Any]) -> bool:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        if random.random() < self.fail_rate:
+            return False
+        if random.random() < self.lose_rate:
+            return True
+        self.states[device.get('device_id')] = bool(device.get('active'))
+        await self._report([device])
+        return True
+
+    async def _report(self, devices: List[Dict[str, Any]]) -> None:
+        if not self.report_url:
+            return
+        reports = [
+            {'device_id': device['device_id'], 'active': bool(device.get('active')), 'version': device.get('version')}
+            for device in devices
+        ]
+        try:
+            async with ClientSession() as session:
+                async with session.post(self.report_url, json=reports) as response:
+                    response.raise_for_status()
+        except Exception as e:
+            print(f'State report failed: {e!r}')
+
+    async def handle_packet(self, request: web.Request) -> web.Response:
+        ok = await self._apply(await request.json())
+        return web.json_response({'ok': ok}, status=200 if ok else 503)
+
+    async def handle_stream(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            frame = message.json()
+            if frame.get('type') != 'commands':
+                continue
+            commands: List[Dict[str, Any]] = frame.get('commands', [])
+            applied = await asyncio.gather(*(self._apply(command['device']) for command in commands))
+            await ws.send_json({
+                'type': 'ack',
+                'results': [
+                    {'id': command['id'], 'ok': ok} if ok else {'id': command['id'], 'ok': False, 'error': 'rejected'}
+                    for command, ok in zip(commands, applied)
+                ]
+            })
+        return ws
+
+    def make_app(self) -> web.Application:
+        """
+        Build the aiohttp application
+        
+        Returns:
+            Application with /packet and /ws routes
+        """
+        app = web.Application()
+        app.router.add_post('/packet', self.handle_packet)
+        app.router.add_get('/ws', self.handle_stream)
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--report-url')
+    parser.add_argument('--lose-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    controller = FakeController(args.delay, args.fail_rate, args.report_url, args.lose_rate)
+    web.run_app(controller.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+from loguru import logger as routing_logger
+
+from .transport import ControllerTransport, make_transport
+
+
+class PrefixTrie:
+    """
+    Character trie for the longest-prefix match of device addresses.
+    Built once at startup, a lookup walks the address once regardless of the number of routes
+    """
+
+    def __init__(self) -> None:
+        self._root: Dict[str, dict] = {}
+        self._value_key: object = object()
+
+    def insert(self, prefix: str, value: str) -> None:
+        """
+        Add a route
+
+        Args:
+            prefix: Address prefix, an empty prefix matches every address
+            value: Value returned for addresses under the prefix
+        """
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._value_key] = value
+
+    def lookup(self, address: str) -> Optional[str]:
+        """
+        Find the value of the longest prefix of the address
+
+        Args:
+            address: Device address
+
+        Returns:
+            Value of the longest matching prefix or None if nothing matches
+        """
+        node = self._root
+        found = node.get(self._value_key)
+        for char in address:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(self._value_key, found)
+        return found
+
+
+class ControllerRouter:
+    """
+    Routing table from device addresses to controllers.
+    Every controller gets its own transport, i.e. its own connection pool and concurrency limit
+    """
+
+    def __init__(self, routes: Dict[str, str], default_url: Optional[str] = None, timeout: float = 10.0,
+                 concurrency: int = 10, frame_size: int = 100, limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Args:
+            routes: Controller URL by address prefix, a trailing "*" in the prefix is ignored ("10.0.1.*")
+            default_url: Controller of addresses what match no prefix
+            timeout: Delivery timeout in seconds
+            concurrency: Default maximum of simultaneous requests per controller
+            frame_size: Maximum commands per WebSocket frame
+            limits: Concurrency overrides by controller URL
+        """
+        limits = limits or {}
+        self._trie: PrefixTrie = PrefixTrie()
+        self.transports: Dict[str, ControllerTransport] = {}
+        table = dict(routes)
+        if default_url:
+            table.setdefault('', default_url)
+        for prefix, url in table.items():
+            self._trie.insert(prefix.rstrip('*').strip(), url)
+            if url not in self.transports:
+                self.transports[url] = make_transport(
+                    url,
+                    timeout=timeout,
+                    concurrency=limits.get(url, concurrency),
+                    frame_size=frame_size
+                )
+        routing_logger.info(f'Controller routing table: {len(table)} routes, {len(self.transports)} controllers')
+
+    def __bool__(self) -> bool:
+        return bool(self.transports)
+
+    def __iter__(self) -> Iterator[Tuple[str, ControllerTransport]]:
+        return iter(self.transports.items())
+
+    def resolve(self, address: Optional[str]) -> Optional[str]:
+        """
+        Find the controller of a device
+
+        Args:
+            address: Device address
+
+        Returns:
+            Controller URL or None if the address has no route
+        """
+        return self._trie.lookup((address or '').strip())
+
+    async def close(self) -> None:
+        """
+        Close the transports of all controllers
+        """
+        for transport in self.transports.values():
+            await transport.close()
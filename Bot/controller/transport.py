@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import aiohttp
+import httpx
+from loguru import logger as transport_logger
+
+
+class ControllerTransport(ABC):
+    """
+    Base class of transports what deliver device commands to a controller
+    """
+
+    @abstractmethod
+    async def send_batch(self, commands: Dict[int, Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        """
+        Deliver a batch of commands
+        
+        Args:
+            commands: Device packets by command ID
+            
+        Returns:
+            Delivery error by command ID, None for acknowledged commands
+        """
+
+    async def close(self) -> None:
+        """
+        Release connections of the transport
+        """
+
+
+class HTTPControllerTransport(ControllerTransport):
+    """
+    Legacy protocol: one JSON POST per command over a pooled keep-alive HTTP client
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, concurrency: int = 10) -> None:
+        """
+        Args:
+            url: Controller endpoint
+            timeout: Request timeout in seconds
+            concurrency: Maximum number of simultaneous requests
+        """
+        self.url: str = url
+        self.client: httpx.AsyncClient = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def _post(self, payload: Dict[str, Any]) -> Optional[str]:
+        async with self._semaphore:
+            try:
+                response = await self.client.post(self.url, json=payload)
+                response.raise_for_status()
+                return None
+            except Exception as e:
+                transport_logger.error(f"Error sending device packet to controller: device_id={payload.get('device_id')}", exc_info=True)
+                return repr(e)
+
+    async def send_batch(self, commands: Dict[int, Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        results = await asyncio.gather(*(self._post(payload) for payload in commands.values()))
+        return dict(zip(commands.keys(), results))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class WebSocketControllerTransport(ControllerTransport):
+    """
+    Persistent WebSocket stream to the controller.
+    Many commands travel in one frame, acknowledgements are matched to commands by ID,
+    and the connection is re-established transparently after a failure.
+
+    Frames sent:     {"type": "commands", "commands": [{"id": 1, "device": {...}}, ...]}
+    Frames received: {"type": "ack", "results": [{"id": 1, "ok": true}, {"id": 2, "ok": false, "error": "..."}]}
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, frame_size: int = 100, concurrency: int = 10,
+                 reconnect_base: float = 0.5, reconnect_max: float = 30.0) -> None:
+        """
+        Args:
+            url: Controller WebSocket endpoint (ws:// or wss://)
+            timeout: Seconds to wait for the acknowledgement of a frame
+            frame_size: Maximum number of commands in one frame
+            concurrency: Maximum frames awaiting their acknowledgement at once
+            reconnect_base: First reconnect delay in seconds
+            reconnect_max: Maximum reconnect delay in seconds
+        """
+        self.url: str = url
+        self.timeout: float = timeout
+        self.frame_size: int = frame_size
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self.reconnect_base: float = reconnect_base
+        self.reconnect_max: float = reconnect_max
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._connect_lock: asyncio.Lock = asyncio.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._wire_ids = itertools.count(1)
+        self._failures: int = 0
+
+    async def _connect(self) -> aiohttp.ClientWebSocketResponse:
+        async with self._connect_lock:
+            if self._ws is not None and not self._ws.closed:
+                return self._ws
+            if self._failures:
+                delay = min(self.reconnect_max, self.reconnect_base * 2 ** (self._failures - 1))
+                await asyncio.sleep(delay)
+            if self._session is None:
+                self._session = aiohttp.ClientSession()
+            try:
+                self._ws = await self._session.ws_connect(self.url, heartbeat=30)
+            except Exception:
+                self._failures += 1
+                raise
+            self._failures = 0
+            self._reader = asyncio.create_task(self._read(self._ws))
+            transport_logger.info(f'Controller stream connected: {self.url}')
+            return self._ws
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    self._handle_frame(message.json())
+                except Exception:
+                    # One malformed frame must not leave the stream without a reader
+                    transport_logger.warning(f'Malformed frame from the controller stream skipped: {message.data[:200]!r}')
+        except Exception:
+            transport_logger.error('Controller stream reader failed', exc_info=True)
+        finally:
+            transport_logger.warning('Controller stream disconnected')
+            # Closed, so the next send reconnects instead of waiting for acks nobody reads
+            if not ws.closed:
+                await ws.close()
+            # Unacknowledged commands are failed, the outbox retries them over the next connection
+            for wire_id, waiter in list(self._pending.items()):
+                if not waiter.done():
+                    waiter.set_result('connection lost')
+                self._pending.pop(wire_id, None)
+
+    def _handle_frame(self, frame: Any) -> None:
+        if not isinstance(frame, dict) or frame.get('type') != 'ack':
+            return
+        for result in frame.get('results') or []:
+            waiter = self._pending.pop(str(result.get('id')), None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None if result.get('ok') else result.get('error', 'rejected'))
+
+    async def _send_frame(self, commands: Dict[int, Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        async with self._semaphore:
+            return await self._deliver_frame(commands)
+
+    async def _deliver_frame(self, commands: Dict[int, Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        try:
+            ws = await self._connect()
+        except Exception as e:
+            transport_logger.error(f'Can not connect to the controller stream {self.url}', exc_info=True)
+            return {command_id: repr(e) for command_id in commands}
+
+        loop = asyncio.get_running_loop()
+        waiters: Dict[int, asyncio.Future] = {}
+        frame = []
+        for command_id, payload in commands.items():
+            wire_id = f'{command_id}:{next(self._wire_ids)}'
+            waiters[command_id] = self._pending[wire_id] = loop.create_future()
+            frame.append({'id': wire_id, 'device': payload})
+        try:
+            await ws.send_json({'type': 'commands', 'commands': frame})
+            done, _ = await asyncio.wait(waiters.values(), timeout=self.timeout)
+        except Exception:
+            transport_logger.error('Error sending frame to the controller stream', exc_info=True)
+            done = set()
+        finally:
+            for item in frame:
+                self._pending.pop(item['id'], None)
+        return {
+            command_id: waiter.result() if waiter in done else 'ack timeout'
+            for command_id, waiter in waiters.items()
+        }
+
+    async def send_batch(self, commands: Dict[int, Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        items = list(commands.items())
+        frames = [dict(items[i:i + self.frame_size]) for i in range(0, len(items), self.frame_size)]
+        results: Dict[int, Optional[str]] = {}
+        for frame_results in await asyncio.gather(*(self._send_frame(frame) for frame in frames)):
+            results.update(frame_results)
+        return results
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+
+def make_transport(url: str, timeout: float = 10.0, concurrency: int = 10, frame_size: int = 100) -> ControllerTransport:
+    """
+    Choose the transport by the URL scheme: ws:// and wss:// use the persistent stream, anything else HTTP POST
+    
+    Args:
+        url: Controller endpoint
+        timeout: Delivery timeout in seconds
+        concurrency: Maximum simultaneous HTTP requests or WebSocket frames awaiting acknowledgement
+        frame_size: Maximum commands per WebSocket frame
+        
+    Returns:
+        Controller transport
+    """
+    if url.startswith(('ws://', 'wss://')):
+        return WebSocketControllerTransport(url, timeout=timeout, frame_size=frame_size, concurrency=concurrency)
+    return HTTPControllerTransport(url, timeout=timeout, concurrency=concurrency)
@@ -1,6 +1,9 @@
 from aiogram import Dispatcher
 from .common import register_common_handlers
 from .device import register_device_handlers
+from .import_devices import register_import_handlers
+from .group import register_group_handlers
+from .schedule import register_schedule_handlers
 
 
 def register_handlers(dp: Dispatcher):
@@ -12,4 +15,7 @@ def register_handlers(dp: Dispatcher):
     """
     register_common_handlers(dp)
     register_device_handlers(dp)
+    register_import_handlers(dp)
+    register_group_handlers(dp)
+    register_schedule_handlers(dp)
 
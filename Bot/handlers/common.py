@@ -55,6 +55,7 @@ async def show_main_menu(message: Message):
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=BUTTONS["list_devices"], callback_data="list_devices")],
+        [InlineKeyboardButton(text=BUTTONS["groups"], callback_data="grp_list")],
         [InlineKeyboardButton(text=BUTTONS["add_device"], callback_data="add_device")],
         [InlineKeyboardButton(text=BUTTONS["help"], callback_data="help")]
     ])
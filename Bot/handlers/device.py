@@ -5,6 +5,8 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from api_client import APIClient
+from outbox import Outbox
+from reachability import ReachabilityProber
 from lexicon import LEXICON, BUTTONS, STATUS_LABELS
 
 
@@ -14,6 +16,30 @@ class DeviceStates(StatesGroup):
     waiting_for_address = State()
 
 
+def clean_title(title: str | None) -> str | None:
+    """
+    Stripped device title or None if it is empty or longer than 100 characters
+    """
+    title = (title or '').strip()
+    return title if title and len(title) <= 100 else None
+
+
+def clean_description(description: str | None) -> str | None:
+    """
+    Stripped device description or None if it is longer than 500 characters
+    """
+    description = (description or '').strip()
+    return description if len(description) <= 500 else None
+
+
+def clean_address(address: str | None) -> str | None:
+    """
+    Stripped device address or None if it is empty or longer than 200 characters
+    """
+    address = (address or '').strip()
+    return address if address and len(address) <= 200 else None
+
+
 async def _ensure_user_exists(client: APIClient, telegram_user: TelegramUser):
     """
     Make sure the user exists in the backend; create automatically if missing.
@@ -25,22 +51,40 @@ async def _ensure_user_exists(client: APIClient, telegram_user: TelegramUser):
     return user
 
 
-async def cmd_devices(message: Message):
+def _connection_status(prober: ReachabilityProber | None, device_id: int) -> str:
+    """
+    Connection line of a device from the cached probe result, the handlers never probe themselves
+    """
+    result = prober.get(device_id) if prober else None
+    if result is None:
+        return STATUS_LABELS["link_unknown"]
+    if result.online:
+        return STATUS_LABELS["link_online"].format(rtt=round(result.rtt * 1000))
+    return STATUS_LABELS["link_offline"]
+
+
+def _is_offline(prober: ReachabilityProber | None, device_id: int) -> bool:
+    result = prober.get(device_id) if prober else None
+    return result is not None and not result.online
+
+
+async def cmd_devices(message: Message, prober: ReachabilityProber | None = None):
     """
     Handle /devices command - show all user devices
     """
-    await list_devices_handler(message)
+    await list_devices_handler(message, prober=prober)
 
 
-async def list_devices_callback(callback: CallbackQuery):
+async def list_devices_callback(callback: CallbackQuery, prober: ReachabilityProber | None = None):
     """
     Handle callback for listing devices
     """
     await callback.answer()
-    await list_devices_handler(callback.message, callback.from_user)
+    await list_devices_handler(callback.message, callback.from_user, prober)
 
 
-async def list_devices_handler(message: Message, telegram_user: TelegramUser | None = None):
+async def list_devices_handler(message: Message, telegram_user: TelegramUser | None = None,
+                               prober: ReachabilityProber | None = None):
     """
     List all devices for the user
     """
@@ -76,18 +120,23 @@ async def list_devices_handler(message: Message, telegram_user: TelegramUser | N
                 if description:
                     text += f"Описание: {description}\n"
                 text += f"Статус: {status}\n"
+                text += f"Связь: {_connection_status(prober, device_id)}\n"
                 text += f"Адрес: {device.get('address', STATUS_LABELS['address_unknown'])}\n"
                 text += "─" * 20 + "\n"
                 
+                icon = STATUS_LABELS['icon_on'] if active else STATUS_LABELS['icon_off']
+                if _is_offline(prober, device_id):
+                    icon += STATUS_LABELS['icon_offline']
                 keyboard_buttons.append([
                     InlineKeyboardButton(
-                        text=f"{title} ({STATUS_LABELS['icon_on'] if active else STATUS_LABELS['icon_off']})",
+                        text=f"{title} ({icon})",
                         callback_data=f"device_{device_id}"
                     )
                 ])
             
             keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons + [
                 [InlineKeyboardButton(text=BUTTONS["add_device"], callback_data="add_device")],
+                [InlineKeyboardButton(text=BUTTONS["import_devices"], callback_data="import_devices")],
                 [InlineKeyboardButton(text=BUTTONS["main_menu"], callback_data="main_menu")]
             ])
             
@@ -130,8 +179,8 @@ async def process_title(message: Message, state: FSMContext):
     """
     Process device title
     """
-    title = message.text.strip()
-    if not title or len(title) > 100:
+    title = clean_title(message.text)
+    if title is None:
         await message.answer(LEXICON["invalid_title"])
         return
     
@@ -144,8 +193,8 @@ async def process_description(message: Message, state: FSMContext):
     """
     Process device description
     """
-    description = message.text.strip()
-    if len(description) > 500:
+    description = clean_description(message.text)
+    if description is None:
         await message.answer(LEXICON["invalid_description"])
         return
     
@@ -158,8 +207,8 @@ async def process_address(message: Message, state: FSMContext):
     """
     Process device address and create device
     """
-    address = message.text.strip()
-    if not address or len(address) > 200:
+    address = clean_address(message.text)
+    if address is None:
         await message.answer(LEXICON["invalid_address"])
         return
     
@@ -190,7 +239,8 @@ async def process_address(message: Message, state: FSMContext):
         await state.clear()
 
 
-async def device_action_callback(callback: CallbackQuery, state: FSMContext):
+async def device_action_callback(callback: CallbackQuery, state: FSMContext,
+                                 prober: ReachabilityProber | None = None):
     """
     Handle callback for device actions
     """
@@ -222,6 +272,7 @@ async def device_action_callback(callback: CallbackQuery, state: FSMContext):
                         callback_data=f"toggle_{device_id}"
                     )
                 ],
+                [InlineKeyboardButton(text=BUTTONS["schedules"], callback_data=f"sch_dev_{device_id}")],
                 [InlineKeyboardButton(text=BUTTONS["delete_device"], callback_data=f"delete_{device_id}")],
                 [InlineKeyboardButton(text=BUTTONS["back_to_devices"], callback_data="list_devices")]
             ])
@@ -232,6 +283,7 @@ async def device_action_callback(callback: CallbackQuery, state: FSMContext):
                 f"Описание: {device.get('description', STATUS_LABELS['description_unknown'])}\n"
                 f"Адрес: {device.get('address', STATUS_LABELS['address_unknown'])}\n"
                 f"Статус: {STATUS_LABELS['on'] if active else STATUS_LABELS['off']}\n"
+                f"Связь: {_connection_status(prober, device_id)}\n"
                 f"Создано: {device.get('create_time', STATUS_LABELS['created_unknown'])}",
                 reply_markup=keyboard
             )
@@ -241,9 +293,11 @@ async def device_action_callback(callback: CallbackQuery, state: FSMContext):
         await callback.message.answer(LEXICON["generic_error"])
 
 
-async def toggle_device_callback(callback: CallbackQuery):
+async def toggle_device_callback(callback: CallbackQuery, outbox: Outbox,
+                                 prober: ReachabilityProber | None = None):
     """
-    Handle toggle device callback
+    Handle toggle device callback.
+    The controller command is only queued in the outbox, delivery happens in the background
     """
     await callback.answer()
     
@@ -265,26 +319,27 @@ async def toggle_device_callback(callback: CallbackQuery):
             
             # Toggle device
             new_active = not device.get('active', False)
-            await client.update_device(device_id, {"active": new_active})
-            
-            updated_device = await client.get_device_by_id(device_id)
+            # The update response is the fresh row from the primary, no need to read it back
+            updated_device = await client.update_device(device_id, {"active": new_active})
             if updated_device:
-                await client.send_device_packet(updated_device)
+                await outbox.enqueue(updated_device)
 
             status_text = STATUS_LABELS["text_on"] if new_active else STATUS_LABELS["text_off"]
-            await callback.message.answer(
-                LEXICON["device_toggle_success"].format(status=status_text)
-            )
+            text = LEXICON["device_toggle_success"].format(status=status_text)
+            if _is_offline(prober, device_id):
+                # The outbox keeps retrying, so the command still lands once the device is back
+                text += LEXICON["device_offline_note"]
+            await callback.message.answer(text)
             
             # Update the device list
-            await list_devices_handler(callback.message, callback.from_user)
+            await list_devices_handler(callback.message, callback.from_user, prober)
             
     except Exception as e:
         logger.error('Error toggling device', exc_info=True)
         await callback.message.answer(LEXICON["toggle_error"])
 
 
-async def delete_device_callback(callback: CallbackQuery):
+async def delete_device_callback(callback: CallbackQuery, prober: ReachabilityProber | None = None):
     """
     Handle delete device callback
     """
@@ -312,7 +367,7 @@ async def delete_device_callback(callback: CallbackQuery):
             )
             
             # Update the device list
-            await list_devices_handler(callback.message, callback.from_user)
+            await list_devices_handler(callback.message, callback.from_user, prober)
             
     except Exception as e:
         logger.error('Error deleting device', exc_info=True)
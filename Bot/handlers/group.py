@@ -0,0 +1,415 @@
+import asyncio
+from loguru import logger
+from aiogram import Dispatcher, F
+from aiogram.filters import Command, StateFilter
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, User as TelegramUser
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from api_client import APIClient
+from outbox import Outbox
+from lexicon import LEXICON, BUTTONS, STATUS_LABELS
+from .device import _ensure_user_exists
+
+
+class GroupStates(StatesGroup):
+    waiting_for_title = State()
+    choosing_devices = State()
+
+
+class SceneStates(StatesGroup):
+    waiting_for_title = State()
+
+
+def _callback_id(callback: CallbackQuery) -> int:
+    return int(callback.data.rsplit('_', 1)[1])
+
+
+async def _get_own_group(client: APIClient, group_id: int, user_id: int):
+    """
+    Get the group if it belongs to the user
+    """
+    group = await client.get_group_by_id(group_id)
+    if not group or group.get('user_id') != user_id:
+        return None
+    return group
+
+
+async def cmd_groups(message: Message):
+    """
+    Handle /groups command - show groups and scenes of the user
+    """
+    await groups_handler(message)
+
+
+async def groups_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle callback for listing groups
+    """
+    await callback.answer()
+    await state.clear()
+    await groups_handler(callback.message, callback.from_user)
+
+
+async def groups_handler(message: Message, telegram_user: TelegramUser | None = None):
+    """
+    List groups and scenes of the user, one tap on a scene applies it
+    """
+    try:
+        telegram_user = telegram_user or message.from_user
+        user_id = telegram_user.id
+
+        async with APIClient() as client:
+            user = await _ensure_user_exists(client, telegram_user)
+            if not user.get('active', True):
+                await message.answer(LEXICON["account_blocked"])
+                return
+            groups, scenes = await asyncio.gather(client.get_user_groups(user_id), client.get_user_scenes(user_id))
+
+        text = LEXICON["groups_header"]
+        keyboard_buttons = []
+        if not groups:
+            text += LEXICON["no_groups"]
+        for group in groups:
+            keyboard_buttons.append([
+                InlineKeyboardButton(
+                    text=f"📂 {group['title']} ({len(group['devices'])})",
+                    callback_data=f"grp_show_{group['group_id']}"
+                )
+            ])
+        if scenes:
+            text += LEXICON["scenes_header"]
+        for scene in scenes:
+            keyboard_buttons.append([
+                InlineKeyboardButton(text=f"🎬 {scene['title']}", callback_data=f"scn_apply_{scene['scene_id']}"),
+                InlineKeyboardButton(text="🗑", callback_data=f"scn_del_{scene['scene_id']}")
+            ])
+
+        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons + [
+            [InlineKeyboardButton(text=BUTTONS["add_group"], callback_data="grp_new")],
+            [InlineKeyboardButton(text=BUTTONS["main_menu"], callback_data="main_menu")]
+        ])
+        await message.answer(text, reply_markup=keyboard)
+
+    except Exception as e:
+        logger.error('Error listing groups', exc_info=True)
+        await message.answer(LEXICON["groups_error"])
+
+
+async def show_group(message: Message, client: APIClient, group: dict):
+    """
+    Show the group card with the state of every member and the bulk buttons
+    """
+    devices = await client.get_group_devices(group['group_id'])
+    text = LEXICON["group_card"].format(title=group['title'])
+    if not devices:
+        text += LEXICON["group_empty"]
+    for device in devices:
+        icon = STATUS_LABELS["icon_on"] if device.get('active') else STATUS_LABELS["icon_off"]
+        text += f"{icon} {device.get('title', STATUS_LABELS['title_unknown'])}\n"
+
+    group_id = group['group_id']
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text=BUTTONS["group_on"], callback_data=f"grp_on_{group_id}"),
+            InlineKeyboardButton(text=BUTTONS["group_off"], callback_data=f"grp_off_{group_id}")
+        ],
+        [InlineKeyboardButton(text=BUTTONS["save_scene"], callback_data=f"scn_new_{group_id}")],
+        [InlineKeyboardButton(text=BUTTONS["delete_group"], callback_data=f"grp_del_{group_id}")],
+        [InlineKeyboardButton(text=BUTTONS["back_to_groups"], callback_data="grp_list")]
+    ])
+    await message.answer(text, reply_markup=keyboard)
+
+
+async def group_card_callback(callback: CallbackQuery):
+    """
+    Handle callback for opening a group
+    """
+    await callback.answer()
+
+    try:
+        async with APIClient() as client:
+            group = await _get_own_group(client, _callback_id(callback), callback.from_user.id)
+            if not group:
+                await callback.message.answer(LEXICON["group_not_found"])
+                return
+            await show_group(callback.message, client, group)
+
+    except Exception as e:
+        logger.error('Error showing group', exc_info=True)
+        await callback.message.answer(LEXICON["generic_error"])
+
+
+async def group_toggle_callback(callback: CallbackQuery, outbox: Outbox):
+    """
+    Handle turning a whole group on or off.
+    All members change with one DataBase statement and their controller commands are queued in one outbox transaction
+    """
+    await callback.answer()
+
+    try:
+        active = callback.data.startswith("grp_on_")
+        async with APIClient() as client:
+            group = await _get_own_group(client, _callback_id(callback), callback.from_user.id)
+            if not group:
+                await callback.message.answer(LEXICON["group_not_found"])
+                return
+
+            # Only the devices what actually changed come back, they are the ones needing a command
+            changed = await client.set_group_state(group['group_id'], active)
+            await outbox.enqueue_many(changed)
+
+            status_text = STATUS_LABELS["group_text_on"] if active else STATUS_LABELS["group_text_off"]
+            if changed:
+                text = LEXICON["group_toggle_success"].format(title=group['title'], status=status_text, count=len(changed))
+            else:
+                text = LEXICON["group_toggle_nothing"].format(title=group['title'], status=status_text)
+            await callback.message.answer(text)
+            await show_group(callback.message, client, group)
+
+    except Exception as e:
+        logger.error('Error toggling group', exc_info=True)
+        await callback.message.answer(LEXICON["group_toggle_error"])
+
+
+async def delete_group_callback(callback: CallbackQuery):
+    """
+    Handle delete group callback
+    """
+    await callback.answer()
+
+    try:
+        async with APIClient() as client:
+            group = await _get_own_group(client, _callback_id(callback), callback.from_user.id)
+            if not group:
+                await callback.message.answer(LEXICON["group_not_found"])
+                return
+            await client.delete_group(group['group_id'])
+        await callback.message.answer(LEXICON["group_deleted"].format(title=group['title']))
+        await groups_handler(callback.message, callback.from_user)
+
+    except Exception as e:
+        logger.error('Error deleting group', exc_info=True)
+        await callback.message.answer(LEXICON["generic_error"])
+
+
+async def add_group_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle callback for creating a group
+    """
+    await callback.answer()
+    await state.set_state(GroupStates.waiting_for_title)
+    await callback.message.answer(LEXICON["add_group_intro"])
+
+
+def _devices_keyboard(devices: list, selected: list) -> InlineKeyboardMarkup:
+    buttons = []
+    for device in devices:
+        mark = STATUS_LABELS["checked"] if device['device_id'] in selected else STATUS_LABELS["unchecked"]
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"{mark} {device.get('title', STATUS_LABELS['title_unknown'])}",
+                callback_data=f"grp_pick_{device['device_id']}"
+            )
+        ])
+    buttons.append([
+        InlineKeyboardButton(text=BUTTONS["save_group"], callback_data="grp_save"),
+        InlineKeyboardButton(text=BUTTONS["cancel"], callback_data="grp_list")
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+async def process_group_title(message: Message, state: FSMContext):
+    """
+    Process group title and offer the user's devices to choose from
+    """
+    title = message.text.strip() if message.text else ''
+    if not title or len(title) > 100:
+        await message.answer(LEXICON["invalid_group_title"])
+        return
+
+    try:
+        async with APIClient() as client:
+            devices = await client.get_all_devices(message.from_user.id)
+        if not devices:
+            await state.clear()
+            await message.answer(LEXICON["no_devices"])
+            return
+
+        choices = [{'device_id': device['device_id'], 'title': device.get('title')} for device in devices]
+        await state.update_data(title=title, choices=choices, selected=[])
+        await state.set_state(GroupStates.choosing_devices)
+        await message.answer(
+            LEXICON["choose_group_devices"].format(title=title),
+            reply_markup=_devices_keyboard(choices, [])
+        )
+    except Exception as e:
+        logger.error('Error starting device selection', exc_info=True)
+        await state.clear()
+        await message.answer(LEXICON["create_group_error"])
+
+
+async def pick_device_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle checking and unchecking a device while creating a group
+    """
+    await callback.answer()
+    device_id = _callback_id(callback)
+    data = await state.get_data()
+    selected = data.get('selected', [])
+    if device_id in selected:
+        selected.remove(device_id)
+    else:
+        selected.append(device_id)
+    await state.update_data(selected=selected)
+    await callback.message.edit_reply_markup(reply_markup=_devices_keyboard(data.get('choices', []), selected))
+
+
+async def save_group_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle saving the new group
+    """
+    data = await state.get_data()
+    if not data.get('selected'):
+        await callback.answer(LEXICON["group_needs_devices"], show_alert=True)
+        return
+    await callback.answer()
+
+    try:
+        async with APIClient() as client:
+            group = await client.create_group(callback.from_user.id, data['title'], data['selected'])
+        await state.clear()
+        await callback.message.answer(
+            LEXICON["group_created"].format(title=group['title'], count=len(group['devices']))
+        )
+        await groups_handler(callback.message, callback.from_user)
+
+    except Exception as e:
+        logger.error('Error creating group', exc_info=True)
+        await state.clear()
+        await callback.message.answer(LEXICON["create_group_error"])
+
+
+async def add_scene_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle callback for saving the current state of a group as a scene
+    """
+    await callback.answer()
+
+    try:
+        async with APIClient() as client:
+            group = await _get_own_group(client, _callback_id(callback), callback.from_user.id)
+        if not group:
+            await callback.message.answer(LEXICON["group_not_found"])
+            return
+        await state.set_state(SceneStates.waiting_for_title)
+        await state.update_data(group_id=group['group_id'])
+        await callback.message.answer(LEXICON["ask_scene_title"].format(title=group['title']))
+
+    except Exception as e:
+        logger.error('Error starting scene creation', exc_info=True)
+        await callback.message.answer(LEXICON["generic_error"])
+
+
+async def process_scene_title(message: Message, state: FSMContext):
+    """
+    Process scene title and save the current states of the group devices
+    """
+    title = message.text.strip() if message.text else ''
+    if not title or len(title) > 100:
+        await message.answer(LEXICON["invalid_group_title"])
+        return
+
+    try:
+        data = await state.get_data()
+        async with APIClient() as client:
+            devices = await client.get_group_devices(data['group_id'])
+            scene = await client.create_scene(
+                message.from_user.id,
+                title,
+                {device['device_id']: bool(device.get('active')) for device in devices}
+            )
+        await state.clear()
+        await message.answer(LEXICON["scene_created"].format(title=scene['title'], count=len(scene['states'])))
+
+    except Exception as e:
+        logger.error('Error creating scene', exc_info=True)
+        await state.clear()
+        await message.answer(LEXICON["create_scene_error"])
+
+
+async def _get_own_scene(client: APIClient, scene_id: int, user_id: int):
+    scenes = await client.get_user_scenes(user_id)
+    return next((scene for scene in scenes if scene['scene_id'] == scene_id), None)
+
+
+async def apply_scene_callback(callback: CallbackQuery, outbox: Outbox):
+    """
+    Handle applying a scene: one DataBase statement, one outbox transaction
+    """
+    await callback.answer()
+
+    try:
+        async with APIClient() as client:
+            scene = await _get_own_scene(client, _callback_id(callback), callback.from_user.id)
+            if not scene:
+                await callback.message.answer(LEXICON["scene_not_found"])
+                return
+            changed = await client.apply_scene(scene['scene_id'])
+            if changed is None:
+                await callback.message.answer(LEXICON["scene_not_found"])
+                return
+            await outbox.enqueue_many(changed)
+
+        await callback.message.answer(LEXICON["scene_applied"].format(title=scene['title'], count=len(changed)))
+
+    except Exception as e:
+        logger.error('Error applying scene', exc_info=True)
+        await callback.message.answer(LEXICON["scene_error"])
+
+
+async def delete_scene_callback(callback: CallbackQuery):
+    """
+    Handle delete scene callback
+    """
+    await callback.answer()
+
+    try:
+        async with APIClient() as client:
+            scene = await _get_own_scene(client, _callback_id(callback), callback.from_user.id)
+            if not scene:
+                await callback.message.answer(LEXICON["scene_not_found"])
+                return
+            await client.delete_scene(scene['scene_id'])
+        await callback.message.answer(LEXICON["scene_deleted"].format(title=scene['title']))
+        await groups_handler(callback.message, callback.from_user)
+
+    except Exception as e:
+        logger.error('Error deleting scene', exc_info=True)
+        await callback.message.answer(LEXICON["generic_error"])
+
+
+def register_group_handlers(dp: Dispatcher):
+    """
+    Register group and scene handlers
+
+    Args:
+        dp: Dispatcher instance
+    """
+    # Commands
+    dp.message.register(cmd_groups, Command("groups"))
+
+    # Callbacks
+    dp.callback_query.register(groups_callback, F.data == "grp_list")
+    dp.callback_query.register(add_group_callback, F.data == "grp_new")
+    dp.callback_query.register(pick_device_callback, F.data.startswith("grp_pick_"), GroupStates.choosing_devices)
+    dp.callback_query.register(save_group_callback, F.data == "grp_save", GroupStates.choosing_devices)
+    dp.callback_query.register(group_card_callback, F.data.startswith("grp_show_"))
+    dp.callback_query.register(group_toggle_callback, F.data.startswith("grp_on_") | F.data.startswith("grp_off_"))
+    dp.callback_query.register(delete_group_callback, F.data.startswith("grp_del_"))
+    dp.callback_query.register(add_scene_callback, F.data.startswith("scn_new_"))
+    dp.callback_query.register(apply_scene_callback, F.data.startswith("scn_apply_"))
+    dp.callback_query.register(delete_scene_callback, F.data.startswith("scn_del_"))
+
+    # FSM handlers
+    dp.message.register(process_group_title, GroupStates.waiting_for_title)
+    dp.message.register(process_scene_title, SceneStates.waiting_for_title)
@@ -0,0 +1,210 @@
+import csv
+import html
+import io
+import json
+from typing import Iterator
+from loguru import logger
+from aiogram import Dispatcher, F
+from aiogram.filters import Command, StateFilter
+from aiogram.types import Message, CallbackQuery, User as TelegramUser
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from api_client import APIClient
+from lexicon import LEXICON
+from .device import _ensure_user_exists, clean_title, clean_description, clean_address
+
+# Same limit as the bulk endpoint of the DataBase API
+MAX_IMPORT_ROWS = 1000
+MAX_IMPORT_FILE_SIZE = 1024 * 1024
+# Telegram rejects longer messages
+MAX_MESSAGE_LENGTH = 4000
+
+
+class ImportStates(StatesGroup):
+    waiting_for_file = State()
+
+
+def _read_rows(buffer: io.BytesIO, file_name: str) -> Iterator[tuple[int, dict]]:
+    """
+    Yield the rows of a CSV, JSON array or JSON Lines document one by one
+
+    Args:
+        buffer: Content of the document
+        file_name: Name of the document, the extension selects the format
+
+    Returns:
+        Iterator of the row number as the installer sees it (line of the file, element of an array)
+        and a dict with the raw fields of the row
+    """
+    is_array = buffer.getvalue().lstrip().removeprefix(b'\xef\xbb\xbf').lstrip()[:1] == b'['
+    text = io.TextIOWrapper(buffer, encoding='utf-8-sig')
+    if file_name.lower().endswith('.csv'):
+        header = text.readline()
+        # Spreadsheets with a comma as the decimal separator export CSV with semicolons
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        fields = [field.strip().lower() for field in next(csv.reader([header], delimiter=delimiter), [])]
+        reader = csv.DictReader(text, fieldnames=fields, delimiter=delimiter)
+        for row in reader:
+            yield reader.line_num + 1, row
+    elif is_array:
+        # A JSON array has no row boundaries, it is bounded by MAX_IMPORT_FILE_SIZE instead
+        for n, row in enumerate(json.load(text), start=1):
+            yield n, row if isinstance(row, dict) else {}
+    else:
+        # JSON Lines: one object per line
+        for n, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield n, row if isinstance(row, dict) else {}
+
+
+def _validate_row(row: dict) -> tuple[dict | None, str | None]:
+    """
+    Validate a row with the rules of the step-by-step dialogue
+
+    Returns:
+        Tuple of the device fields and None, or None and the reason of the rejection
+    """
+    fields = {}
+    for name in ('title', 'description', 'address'):
+        value = row.get(name)
+        # JSON values may be numbers, objects or lists; numbers are taken as text, the rest rejects the row
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif value is not None and not isinstance(value, str):
+            return None, LEXICON["import_bad_field_type"].format(field=name)
+        fields[name] = value
+    title = clean_title(fields['title'])
+    if title is None:
+        return None, LEXICON["import_bad_title"]
+    description = clean_description(fields['description'])
+    if description is None:
+        return None, LEXICON["import_bad_description"]
+    address = clean_address(fields['address'])
+    if address is None:
+        return None, LEXICON["import_bad_address"]
+    return {"title": title, "description": description, "address": address}, None
+
+
+async def _send_report(message: Message, lines: list[str]) -> None:
+    """
+    Send the report split into messages what fit the Telegram limit
+    """
+    chunk = LEXICON["import_report_header"]
+    for line in lines:
+        if len(chunk) + len(line) + 1 > MAX_MESSAGE_LENGTH:
+            await message.answer(chunk)
+            chunk = ''
+        chunk += line + '\n'
+    if chunk:
+        await message.answer(chunk)
+
+
+async def cmd_import_devices(message: Message, state: FSMContext, telegram_user: TelegramUser | None = None):
+    """
+    Handle /import_devices command - ask for a document with devices
+    """
+    try:
+        telegram_user = telegram_user or message.from_user
+
+        async with APIClient() as client:
+            user = await _ensure_user_exists(client, telegram_user)
+            if not user.get('active', True):
+                await message.answer(LEXICON["account_blocked"])
+                return
+
+        await state.set_state(ImportStates.waiting_for_file)
+        await message.answer(LEXICON["import_intro"].format(max_rows=MAX_IMPORT_ROWS))
+    except Exception as e:
+        logger.error('Error starting device import', exc_info=True)
+        await message.answer(LEXICON["add_device_error"])
+
+
+async def import_devices_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle callback for importing devices
+    """
+    await callback.answer()
+    await cmd_import_devices(callback.message, state, callback.from_user)
+
+
+async def process_import_file(message: Message, state: FSMContext):
+    """
+    Validate every row of the document, create the valid devices with one request and report every row
+    """
+    document = message.document
+    if document is None or not (document.file_name or '').lower().endswith(('.csv', '.json', '.jsonl')):
+        await message.answer(LEXICON["import_bad_file"])
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_FILE_SIZE:
+        await message.answer(LEXICON["import_file_too_large"].format(max_size=MAX_IMPORT_FILE_SIZE // 1024))
+        return
+
+    await state.clear()
+    try:
+        buffer = io.BytesIO()
+        await message.bot.download(document, destination=buffer)
+        buffer.seek(0)
+
+        report: dict[int, str] = {}
+        valid: list[tuple[int, dict]] = []
+        for count, (n, row) in enumerate(_read_rows(buffer, document.file_name)):
+            if count >= MAX_IMPORT_ROWS:
+                await message.answer(LEXICON["import_too_many_rows"].format(max_rows=MAX_IMPORT_ROWS))
+                return
+            device, error = _validate_row(row)
+            if device is None:
+                report[n] = LEXICON["import_row_error"].format(row=n, error=error)
+            else:
+                valid.append((n, device))
+    except (ValueError, csv.Error) as e:
+        logger.warning(f'Unreadable import file {document.file_name}: {e}')
+        await message.answer(LEXICON["import_unreadable"])
+        return
+    except Exception as e:
+        logger.error('Error reading import file', exc_info=True)
+        await message.answer(LEXICON["import_error"])
+        return
+
+    if not report and not valid:
+        await message.answer(LEXICON["import_empty"])
+        return
+
+    try:
+        if valid:
+            async with APIClient() as client:
+                devices = await client.create_devices(message.from_user.id, [device for _, device in valid])
+            for (n, _), device in zip(valid, devices):
+                report[n] = LEXICON["import_row_created"].format(
+                    row=n,
+                    title=html.escape(device.get('title', '')),
+                    device_id=device.get('device_id')
+                )
+    except Exception as e:
+        logger.error('Error importing devices', exc_info=True)
+        await message.answer(LEXICON["import_error"])
+        return
+
+    await _send_report(message, [report[n] for n in sorted(report)])
+    await message.answer(LEXICON["import_summary"].format(created=len(valid), skipped=len(report) - len(valid)))
+
+
+def register_import_handlers(dp: Dispatcher):
+    """
+    Register device import handlers
+
+    Args:
+        dp: Dispatcher instance
+    """
+    # Commands
+    dp.message.register(cmd_import_devices, Command("import_devices"), StateFilter(None))
+
+    # Callbacks
+    dp.callback_query.register(import_devices_callback, F.data == "import_devices")
+
+    # FSM handlers
+    dp.message.register(process_import_file, ImportStates.waiting_for_file)
@@ -0,0 +1,196 @@
+import re
+from datetime import datetime
+from loguru import logger
+from aiogram import Dispatcher, F
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, User as TelegramUser
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from api_client import APIClient
+from lexicon import LEXICON, BUTTONS, STATUS_LABELS
+from .device import _ensure_user_exists
+
+# Delay of the one-tap timer buttons of the device card
+TIMER_MINUTES = 30
+DAILY_PATTERN = re.compile(r'^([01]?\d|2[0-3])[:.]([0-5]\d)\s+(вкл|выкл)', re.IGNORECASE)
+
+
+class ScheduleStates(StatesGroup):
+    waiting_for_daily = State()
+
+
+async def _get_own_device(client: APIClient, telegram_user: TelegramUser, device_id: int):
+    """
+    Get the device if it belongs to the user
+    """
+    device = await client.get_device_by_id(device_id)
+    if not device:
+        return None
+    user = await _ensure_user_exists(client, telegram_user)
+    if not user or device_id not in user.get('devices', []):
+        return None
+    return device
+
+
+async def show_schedules(message: Message, client: APIClient, device: dict):
+    """
+    Show the schedules of a device with buttons to add and delete them
+    """
+    device_id = device['device_id']
+    schedules = await client.get_device_schedules(device_id)
+    text = LEXICON["schedules_header"].format(title=device.get('title', STATUS_LABELS['title_unknown']))
+    if not schedules:
+        text += LEXICON["no_schedules"]
+
+    keyboard_buttons = []
+    for schedule in schedules:
+        action = STATUS_LABELS["schedule_on"] if schedule['active'] else STATUS_LABELS["schedule_off"]
+        if schedule['kind'] == 'daily':
+            line = LEXICON["schedule_daily"].format(action=action, time=schedule['time_of_day'][:5])
+        else:
+            line = LEXICON["schedule_once"].format(
+                action=action,
+                time=datetime.fromisoformat(schedule['next_run']).strftime('%d.%m %H:%M')
+            )
+        text += line
+        keyboard_buttons.append([
+            InlineKeyboardButton(text=f"🗑 {line.strip()}", callback_data=f"sch_del_{schedule['schedule_id']}_{device_id}")
+        ])
+
+    # The timer sets the opposite of the current state, "turn off after 30 minutes" for a device what is on
+    timer_active = not device.get('active', False)
+    timer_text = BUTTONS["timer_on"] if timer_active else BUTTONS["timer_off"]
+    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons + [
+        [InlineKeyboardButton(
+            text=timer_text.format(minutes=TIMER_MINUTES),
+            callback_data=f"sch_in_{device_id}_{int(timer_active)}"
+        )],
+        [InlineKeyboardButton(text=BUTTONS["add_daily"], callback_data=f"sch_day_{device_id}")],
+        [InlineKeyboardButton(text=BUTTONS["back_to_device"], callback_data=f"device_{device_id}")]
+    ])
+    await message.answer(text, reply_markup=keyboard)
+
+
+async def schedules_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle callback for opening the schedules of a device
+    """
+    await callback.answer()
+    await state.clear()
+
+    try:
+        device_id = int(callback.data.rsplit('_', 1)[1])
+        async with APIClient() as client:
+            device = await _get_own_device(client, callback.from_user, device_id)
+            if not device:
+                await callback.message.answer(LEXICON["no_device_access"])
+                return
+            await show_schedules(callback.message, client, device)
+
+    except Exception as e:
+        logger.error('Error showing schedules', exc_info=True)
+        await callback.message.answer(LEXICON["schedule_error"])
+
+
+async def timer_callback(callback: CallbackQuery):
+    """
+    Handle the one-tap timer: change the state of the device once after TIMER_MINUTES
+    """
+    await callback.answer()
+
+    try:
+        _, _, device_id, active = callback.data.split('_')
+        device_id = int(device_id)
+        async with APIClient() as client:
+            device = await _get_own_device(client, callback.from_user, device_id)
+            if not device:
+                await callback.message.answer(LEXICON["no_device_access"])
+                return
+            await client.create_schedule(callback.from_user.id, device_id, active == '1', delay=TIMER_MINUTES * 60)
+            await callback.message.answer(LEXICON["schedule_created"])
+            await show_schedules(callback.message, client, device)
+
+    except Exception as e:
+        logger.error('Error creating timer', exc_info=True)
+        await callback.message.answer(LEXICON["schedule_error"])
+
+
+async def add_daily_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Handle callback for adding a daily schedule
+    """
+    await callback.answer()
+    await state.set_state(ScheduleStates.waiting_for_daily)
+    await state.update_data(device_id=int(callback.data.rsplit('_', 1)[1]))
+    await callback.message.answer(LEXICON["ask_schedule_daily"])
+
+
+async def process_daily(message: Message, state: FSMContext):
+    """
+    Process "HH:MM on/off" and create the daily schedule
+    """
+    match = DAILY_PATTERN.match(message.text.strip() if message.text else '')
+    if not match:
+        await message.answer(LEXICON["invalid_schedule_daily"])
+        return
+
+    try:
+        hours, minutes, action = match.groups()
+        data = await state.get_data()
+        await state.clear()
+        async with APIClient() as client:
+            device = await _get_own_device(client, message.from_user, data['device_id'])
+            if not device:
+                await message.answer(LEXICON["no_device_access"])
+                return
+            await client.create_schedule(
+                message.from_user.id,
+                device['device_id'],
+                action.lower() == 'вкл',
+                time_of_day=f"{int(hours):02d}:{minutes}"
+            )
+            await message.answer(LEXICON["schedule_created"])
+            await show_schedules(message, client, device)
+
+    except Exception as e:
+        logger.error('Error creating daily schedule', exc_info=True)
+        await message.answer(LEXICON["schedule_error"])
+
+
+async def delete_schedule_callback(callback: CallbackQuery):
+    """
+    Handle delete schedule callback
+    """
+    await callback.answer()
+
+    try:
+        _, _, schedule_id, device_id = callback.data.split('_')
+        async with APIClient() as client:
+            device = await _get_own_device(client, callback.from_user, int(device_id))
+            schedules = await client.get_device_schedules(int(device_id)) if device else []
+            if not any(schedule['schedule_id'] == int(schedule_id) for schedule in schedules):
+                await callback.message.answer(LEXICON["no_device_access"])
+                return
+            await client.delete_schedule(int(schedule_id))
+            await callback.message.answer(LEXICON["schedule_deleted"])
+            await show_schedules(callback.message, client, device)
+
+    except Exception as e:
+        logger.error('Error deleting schedule', exc_info=True)
+        await callback.message.answer(LEXICON["schedule_error"])
+
+
+def register_schedule_handlers(dp: Dispatcher):
+    """
+    Register schedule handlers
+
+    Args:
+        dp: Dispatcher instance
+    """
+    # Callbacks
+    dp.callback_query.register(schedules_callback, F.data.startswith("sch_dev_"))
+    dp.callback_query.register(timer_callback, F.data.startswith("sch_in_"))
+    dp.callback_query.register(add_daily_callback, F.data.startswith("sch_day_"))
+    dp.callback_query.register(delete_schedule_callback, F.data.startswith("sch_del_"))
+
+    # FSM handlers
+    dp.message.register(process_daily, ScheduleStates.waiting_for_daily)
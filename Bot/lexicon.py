@@ -22,6 +22,8 @@ LEXICON: Final[dict[str, str]] = {
         "/help - Показать эту справку\n"
         "/devices - Показать все ваши устройства\n"
         "/add_device - Добавить новое устройство\n"
+        "/import_devices - Добавить устройства из файла CSV/JSON\n"
+        "/groups - Группы устройств и сцены\n"
         "/menu - Показать главное меню\n\n"
         "💡 Используйте кнопки меню для быстрого доступа к функциям."
     ),
@@ -30,7 +32,8 @@ LEXICON: Final[dict[str, str]] = {
     "no_devices": (
         "📱 <b>Ваши устройства</b>\n\n"
         "У вас пока нет устройств.\n"
-        "Используйте /add_device для добавления нового устройства."
+        "Используйте /add_device для добавления нового устройства "
+        "или /import_devices, чтобы добавить сразу несколько из файла."
     ),
     "list_devices_error": "❌ Произошла ошибка при получении списка устройств.",
     "add_device_intro": (
@@ -50,23 +53,98 @@ LEXICON: Final[dict[str, str]] = {
         "Адрес: {address}"
     ),
     "create_device_error": "❌ Произошла ошибка при создании устройства. Попробуйте позже.",
+    "import_intro": (
+        "📥 <b>Импорт устройств</b>\n\n"
+        "Отправьте файл CSV, JSON или JSON Lines (до {max_rows} устройств) с полями "
+        "<code>title</code>, <code>description</code>, <code>address</code>.\n\n"
+        "Пример CSV:\n"
+        "<code>title,description,address\n"
+        "Лампа,Кухня,192.168.1.10\n"
+        "Розетка,,192.168.1.11:8080</code>"
+    ),
+    "import_bad_file": "❌ Отправьте документ с расширением .csv, .json или .jsonl:",
+    "import_file_too_large": "❌ Файл больше {max_size} КБ. Разбейте его на несколько частей:",
+    "import_too_many_rows": "❌ В файле больше {max_rows} устройств. Разбейте его на несколько частей.",
+    "import_unreadable": "❌ Не удалось прочитать файл. Проверьте формат и кодировку UTF-8.",
+    "import_empty": "❌ В файле нет ни одного устройства.",
+    "import_error": "❌ Произошла ошибка при импорте устройств. Ни одно устройство не добавлено, попробуйте позже.",
+    "import_bad_title": "название пустое или длиннее 100 символов",
+    "import_bad_description": "описание длиннее 500 символов",
+    "import_bad_address": "адрес пустой или длиннее 200 символов",
+    "import_bad_field_type": "поле {field} должно быть строкой",
+    "import_report_header": "📋 <b>Результат импорта</b>\n\n",
+    "import_row_created": "Строка {row}: ✅ {title} (ID {device_id})",
+    "import_row_error": "Строка {row}: ❌ {error}",
+    "import_summary": "✅ Добавлено устройств: {created}, пропущено строк: {skipped}.",
     "device_not_found": "❌ Устройство не найдено.",
     "no_device_access": "❌ У вас нет доступа к этому устройству.",
     "generic_error": "❌ Произошла ошибка.",
     "device_toggle_success": "✅ Устройство {status}.",
+    "device_offline_note": "\n⚠️ Устройство сейчас не в сети, команда будет доставлена, когда связь восстановится.",
     "toggle_error": "❌ Произошла ошибка при изменении статуса устройства.",
     "device_deleted": "✅ Устройство '{title}' удалено.",
     "delete_error": "❌ Произошла ошибка при удалении устройства.",
     "devices_list_header": "📱 <b>Ваши устройства:</b>\n\n",
+    "groups_header": "🏠 <b>Группы и сцены</b>\n\n",
+    "no_groups": "Групп пока нет. Создайте группу, чтобы управлять несколькими устройствами одним нажатием.\n",
+    "scenes_header": "\n🎬 <b>Сцены:</b> нажмите, чтобы применить\n",
+    "groups_error": "❌ Произошла ошибка при получении групп.",
+    "group_not_found": "❌ Группа не найдена.",
+    "group_card": "📂 <b>{title}</b>\n\n",
+    "group_empty": "В группе нет устройств.\n",
+    "group_toggle_success": "✅ {title}: {status} устройств — {count}.",
+    "group_toggle_nothing": "✅ {title}: все устройства уже {status}.",
+    "group_toggle_error": "❌ Произошла ошибка при изменении статуса группы.",
+    "add_group_intro": (
+        "➕ <b>Новая группа</b>\n\n"
+        "Введите название группы (например, «Гостиная»):"
+    ),
+    "invalid_group_title": "❌ Название не может быть пустым или длиннее 100 символов. Попробуйте снова:",
+    "choose_group_devices": "Отметьте устройства группы «{title}» и нажмите «Сохранить»:",
+    "group_needs_devices": "Отметьте хотя бы одно устройство.",
+    "group_created": "✅ Группа «{title}» создана, устройств: {count}.",
+    "create_group_error": "❌ Произошла ошибка при создании группы.",
+    "group_deleted": "✅ Группа «{title}» удалена. Устройства остались на месте.",
+    "ask_scene_title": "📸 Введите название сцены. В нее будет сохранено текущее состояние устройств группы «{title}»:",
+    "scene_created": "✅ Сцена «{title}» сохранена, устройств: {count}.",
+    "create_scene_error": "❌ Произошла ошибка при сохранении сцены.",
+    "scene_not_found": "❌ Сцена не найдена.",
+    "scene_applied": "✅ Сцена «{title}» применена, изменено устройств: {count}.",
+    "scene_error": "❌ Произошла ошибка при применении сцены.",
+    "scene_deleted": "✅ Сцена «{title}» удалена.",
+    "schedules_header": "⏰ <b>Расписание «{title}»</b>\n\n",
+    "no_schedules": "Запланированных действий нет.\n",
+    "schedule_once": "{action} {time}\n",
+    "schedule_daily": "{action} каждый день в {time}\n",
+    "ask_schedule_daily": "📅 Введите время и действие, например «07:00 вкл» или «23:30 выкл»:",
+    "invalid_schedule_daily": "❌ Формат: «ЧЧ:ММ вкл» или «ЧЧ:ММ выкл». Попробуйте еще раз:",
+    "schedule_created": "✅ Действие запланировано.",
+    "schedule_deleted": "✅ Действие удалено из расписания.",
+    "schedule_error": "❌ Произошла ошибка при работе с расписанием.",
 }
 
 BUTTONS: Final[dict[str, str]] = {
     "list_devices": "📱 Мои устройства",
     "add_device": "➕ Добавить устройство",
+    "import_devices": "📥 Импорт из файла",
     "help": "ℹ️ Помощь",
     "main_menu": "🔙 Главное меню",
     "back_to_devices": "🔙 Назад к списку",
     "delete_device": "🗑 Удалить",
+    "groups": "🏠 Группы и сцены",
+    "add_group": "➕ Создать группу",
+    "group_on": "🟢 Включить все",
+    "group_off": "🔴 Выключить все",
+    "save_scene": "📸 Сохранить как сцену",
+    "delete_group": "🗑 Удалить группу",
+    "back_to_groups": "🔙 Назад к группам",
+    "save_group": "✅ Сохранить",
+    "cancel": "✖️ Отмена",
+    "schedules": "⏰ Расписание",
+    "timer_on": "⏲ Включить через {minutes} мин",
+    "timer_off": "⏲ Выключить через {minutes} мин",
+    "add_daily": "📅 Каждый день…",
+    "back_to_device": "🔙 Назад к устройству",
 }
 
 STATUS_LABELS: Final[dict[str, str]] = {
@@ -78,9 +156,19 @@ STATUS_LABELS: Final[dict[str, str]] = {
     "icon_off": "🔴",
     "text_on": "включено",
     "text_off": "выключено",
+    "group_text_on": "включено",
+    "group_text_off": "выключено",
+    "checked": "☑️",
+    "unchecked": "⬜",
+    "schedule_on": "🟢 включить",
+    "schedule_off": "🔴 выключить",
     "address_unknown": "Не указан",
     "description_unknown": "Не указано",
     "created_unknown": "Неизвестно",
     "title_unknown": "Без названия",
+    "icon_offline": " ⚠️",
+    "link_online": "📶 в сети, {rtt} мс",
+    "link_offline": "⚠️ нет связи",
+    "link_unknown": "❔ еще не проверено",
 }
 
@@ -2,9 +2,15 @@ import asyncio
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from prometheus_client import start_http_server
 
+from api_client import APIClient
 from configurations import main_config
+from controller import ControllerRouter
 from handlers import register_handlers
+from monitoring import LoopMonitor
+from outbox import ChangeDispatcher, Outbox, Reconciler
+from reachability import ReachabilityProber
 from log.config import logger
 
 
@@ -25,9 +31,57 @@ async def main():
     register_handlers(dp)
     logger.info("Handlers registered")
     
+    # Metrics and event loop monitoring
+    start_http_server(main_config.monitoring.metrics_port)
+    logger.info(f"Metrics exported on port {main_config.monitoring.metrics_port}")
+    loop_monitor = LoopMonitor(
+        "bot",
+        interval=main_config.monitoring.loop_lag_interval,
+        block_threshold=main_config.monitoring.loop_block_threshold
+    )
+    loop_monitor.start()
+    
+    # Durable outbox of controller commands, handlers receive it as the "outbox" argument
+    controller = main_config.controller
+    router = ControllerRouter(
+        controller.routes,
+        default_url=controller.url,
+        timeout=controller.timeout,
+        concurrency=controller.concurrency,
+        frame_size=controller.frame_size,
+        limits=controller.limits
+    )
+    outbox = Outbox(main_config.outbox, router)
+    outbox.start()
+    
+    # Re-sends commands of devices whose reported state did not converge to the desired one
+    reconciler_client = APIClient()
+    reconciler = Reconciler(main_config.reconciler, reconciler_client, outbox)
+    reconciler.start()
+    
+    # Commands for state changes made outside the bot: schedules, rules, other clients of the DataBase API
+    dispatcher_client = APIClient()
+    dispatcher = ChangeDispatcher(main_config.dispatch, dispatcher_client, outbox)
+    dispatcher.start()
+    
+    # Online/offline of device addresses for the device list and card, handlers only read its cache
+    prober_client = APIClient()
+    prober = ReachabilityProber(main_config.reachability, prober_client)
+    prober.start()
+    
     # Start polling
     logger.info("Bot started, waiting for messages...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot, outbox=outbox, prober=prober)
+    finally:
+        await prober.stop()
+        await prober_client.close()
+        await dispatcher.stop()
+        await dispatcher_client.close()
+        await reconciler.stop()
+        await reconciler_client.close()
+        await outbox.stop()
+        await loop_monitor.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+from .outbox import Outbox
+from .store import OutboxStore, OutboxCommand
+from .reconciler import Reconciler
+from .dispatcher import ChangeDispatcher
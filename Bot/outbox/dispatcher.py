@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from loguru import logger as dispatcher_logger
+from prometheus_client import Counter
+
+from api_client import APIClient
+from configurations.config import DispatchConfig
+from .outbox import Outbox
+
+DISPATCHED = Counter('change_feed_dispatched_total', 'Controller commands queued for device changes seen in the change feed')
+RESYNCS = Counter('change_feed_resyncs_total', 'Change feed reconnects and resync events, changes made meanwhile were not seen')
+
+
+class ChangeDispatcher:
+    """
+    Background consumer of the DataBase change feed what queues controller commands for desired state changes
+    made outside the bot: schedules, rules and other API clients only write the DataBase.
+    Changes made by the bot handlers arrive here too, the outbox skips the versions it has already queued
+    """
+
+    def __init__(self, config: DispatchConfig, client: APIClient, outbox: Outbox) -> None:
+        """
+        Initialize dispatcher
+
+        Args:
+            config: Dispatcher configuration
+            client: API client of the DataBase service
+            outbox: Outbox the commands are queued in
+        """
+        self.config: DispatchConfig = config
+        self.client: APIClient = client
+        self.outbox: Outbox = outbox
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Start consuming the change feed
+        """
+        if self._task is None and self.config.enabled and self.outbox.enabled:
+            self._task = asyncio.create_task(self._run())
+            dispatcher_logger.info('Change dispatcher started')
+
+    async def stop(self) -> None:
+        """
+        Stop consuming the change feed
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            dispatcher_logger.info('Change dispatcher stopped')
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async for event in self.client.stream_changes('device'):
+                    await self.dispatch(event)
+                dispatcher_logger.warning('Change feed closed by the DataBase service')
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                dispatcher_logger.error('Change feed connection failed', exc_info=True)
+            # Changes made while disconnected are re-sent by the reconciler once it sees them diverged
+            RESYNCS.inc()
+            await asyncio.sleep(self.config.retry)
+
+    async def dispatch(self, event: Dict[str, Any]) -> Optional[int]:
+        """
+        Queue the controller command for one feed event
+
+        Args:
+            event: Change feed event
+
+        Returns:
+            ID of the queued command or None if the event needs no command
+        """
+        if event['type'] == 'resync':
+            RESYNCS.inc()
+            dispatcher_logger.warning('Change feed resync, device changes were missed')
+            return None
+        if event.get('entity') != 'device' or event.get('op') != 'update' or 'active' not in event.get('changes', ()):
+            return None
+        device: Optional[Dict[str, Any]] = event.get('data')
+        if device is None:
+            # Events too large for NOTIFY come without the row
+            device = await self.client.get_device_by_id(event['id'])
+            if device is None:
+                return None
+        command_id = await self.outbox.enqueue(device)
+        if command_id is not None:
+            DISPATCHED.inc()
+        return command_id
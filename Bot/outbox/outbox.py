@@ -0,0 +1,230 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger as outbox_logger
+from prometheus_client import Counter, Gauge, Histogram
+
+from configurations.config import OutboxConfig
+from controller import ControllerRouter, ControllerTransport
+from .store import OutboxCommand, OutboxStore
+
+OUTBOX_DEPTH = Gauge('controller_outbox_depth', 'Controller commands waiting for delivery', ['controller'])
+DELIVERY_LATENCY = Histogram(
+    'controller_delivery_latency_seconds',
+    'Time from queueing a controller command to its acknowledgement',
+    ['controller'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+DELIVERIES = Counter('controller_deliveries_total', 'Controller delivery attempts by result', ['controller', 'result'])
+UNROUTED = Counter('controller_commands_unrouted_total', 'Controller commands dropped because no route matches the device address')
+COLLAPSED = Counter(
+    'controller_commands_collapsed_total',
+    'Controller commands merged into a command of the same device still waiting in the queue'
+)
+
+
+class Outbox:
+    """
+    Durable outbox of controller commands.
+    Handlers only persist the command; every controller has its own delivery lane what hands its commands
+    to the controller transport in batches and retries failed ones with exponential backoff,
+    so a slow or unreachable site does not hold back the others.
+    Commands of one device are coalesced: within the coalescing window only the last desired state is sent
+    """
+
+    def __init__(self, config: OutboxConfig, router: ControllerRouter) -> None:
+        """
+        Initialize outbox
+        
+        Args:
+            config: Outbox configuration
+            router: Routing table from device addresses to controllers
+        """
+        self.config: OutboxConfig = config
+        self.router: ControllerRouter = router
+        self.store: OutboxStore = OutboxStore(config.path)
+        self._wakeup: Dict[str, asyncio.Event] = {controller: asyncio.Event() for controller, _ in router}
+        # Newest desired state version queued per device, the same change arrives from the handler and the change feed
+        self._versions: Dict[int, int] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether a controller is configured at all
+        """
+        return bool(self.router)
+
+    async def enqueue(self, device_data: Dict[str, Any], force: bool = False) -> Optional[int]:
+        """
+        Persist a command for the device and wake the worker
+        
+        Args:
+            device_data: Device packet for the controller
+            force: Queue the command even if this desired state version was already queued
+            
+        Returns:
+            ID of the queued command or None if no controller serves the device or the version was already queued
+        """
+        return (await self.enqueue_many([device_data], force=force))[0]
+
+    async def enqueue_many(self, devices: List[Dict[str, Any]], force: bool = False) -> List[Optional[int]]:
+        """
+        Persist commands for many devices in one outbox transaction and wake their controller lanes.
+        Used for group and scene changes: the lanes then deliver the commands to all controllers concurrently,
+        in batches and within the transport concurrency limits.
+        A desired state version already queued is skipped, unless forced by the reconciler re-sends
+        
+        Args:
+            devices: Device packets for the controller
+            force: Queue the commands even for desired state versions already queued
+            
+        Returns:
+            IDs of the queued commands in the order of devices, None for devices no controller serves
+            and for versions already queued
+        """
+        if not self.enabled or not devices:
+            return [None] * len(devices)
+        routed = []
+        for device_data in devices:
+            if not self._is_new_version(device_data, force):
+                routed.append(None)
+                continue
+            controller = self.router.resolve(device_data.get('address'))
+            if controller is None:
+                outbox_logger.warning(
+                    f"No controller route for device_id={device_data['device_id']}, address={device_data.get('address')!r}"
+                )
+                UNROUTED.inc()
+            routed.append(controller)
+        commands = [
+            (device_data['device_id'], controller, device_data)
+            for device_data, controller in zip(devices, routed) if controller is not None
+        ]
+        stored = iter(await asyncio.to_thread(self.store.enqueue_many, commands, self.config.coalesce_window) if commands else ())
+        command_ids: List[Optional[int]] = []
+        for device_data, controller in zip(devices, routed):
+            if controller is None:
+                command_ids.append(None)
+                continue
+            command_id, collapsed = next(stored)
+            command_ids.append(command_id)
+            if collapsed:
+                outbox_logger.info(f"Controller command collapsed: id={command_id}, device_id={device_data['device_id']}")
+                COLLAPSED.inc()
+                continue
+            outbox_logger.info(f"Controller command queued: id={command_id}, device_id={device_data['device_id']}, controller={controller}")
+            OUTBOX_DEPTH.labels(controller).inc()
+            self._wakeup[controller].set()
+        return command_ids
+
+    def _is_new_version(self, device_data: Dict[str, Any], force: bool) -> bool:
+        version = device_data.get('version')
+        if version is None:
+            return True
+        device_id = device_data['device_id']
+        known = self._versions.get(device_id)
+        if known is not None and version <= known and not force:
+            return False
+        if known is None or version > known:
+            self._versions[device_id] = version
+        return True
+
+    def start(self) -> None:
+        """
+        Start one delivery lane per controller and the maintenance worker
+        """
+        if self._tasks or not self.enabled:
+            return
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        for controller, transport in self.router:
+            self._tasks.append(asyncio.create_task(self._run(controller, transport)))
+        outbox_logger.info(f'Outbox started with {len(self._tasks) - 1} controller lanes')
+
+    async def stop(self) -> None:
+        """
+        Stop the delivery lanes, close the store and the controller transports
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.close)
+        await self.router.close()
+        outbox_logger.info('Outbox worker stopped')
+
+    async def _maintain(self) -> None:
+        moved = await asyncio.to_thread(self.store.reroute, set(self.router.transports), self.router.resolve)
+        if moved:
+            outbox_logger.info(f'Re-routed {moved} waiting controller commands to the current routing table')
+            for wakeup in self._wakeup.values():
+                wakeup.set()
+        last_purge = 0.0
+        while True:
+            try:
+                depth = await asyncio.to_thread(self.store.depth)
+                for controller in self._wakeup:
+                    OUTBOX_DEPTH.labels(controller).set(depth.get(controller, 0))
+                if time.time() - last_purge > 3600:
+                    await asyncio.to_thread(self.store.purge, self.config.retention)
+                    last_purge = time.time()
+            except Exception:
+                outbox_logger.error('Outbox maintenance failed', exc_info=True)
+            await asyncio.sleep(self.config.poll_interval)
+
+    async def _run(self, controller: str, transport: ControllerTransport) -> None:
+        wakeup = self._wakeup[controller]
+        while True:
+            try:
+                commands = await asyncio.to_thread(
+                    self.store.claim, controller, self.config.batch_size, self.config.lease
+                )
+                if commands:
+                    await self._deliver_batch(controller, transport, commands)
+                    continue
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=self.config.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                outbox_logger.error(f'Outbox lane of {controller} failed', exc_info=True)
+                await asyncio.sleep(self.config.poll_interval)
+
+    async def _deliver_batch(self, controller: str, transport: ControllerTransport, commands: List[OutboxCommand]) -> None:
+        try:
+            errors = await transport.send_batch({command.id: command.payload for command in commands})
+        except Exception as e:
+            outbox_logger.error(f'Controller transport of {controller} failed', exc_info=True)
+            errors = {command.id: repr(e) for command in commands}
+
+        acked = [command for command in commands if errors.get(command.id, 'no result') is None]
+        if acked:
+            await asyncio.to_thread(self.store.ack, [command.id for command in acked])
+            now = time.time()
+            for command in acked:
+                DELIVERY_LATENCY.labels(controller).observe(now - command.created_at)
+            DELIVERIES.labels(controller, 'acked').inc(len(acked))
+            OUTBOX_DEPTH.labels(controller).dec(len(acked))
+        for command in commands:
+            error = errors.get(command.id, 'no result')
+            if error is not None:
+                await self._handle_failure(command, error)
+
+    async def _handle_failure(self, command: OutboxCommand, error: str) -> None:
+        attempts = command.attempts + 1
+        if attempts >= self.config.max_attempts:
+            outbox_logger.error(f'Controller command {command.id} dropped after {attempts} attempts: {error}')
+            await asyncio.to_thread(self.store.fail, command.id, error)
+            DELIVERIES.labels(command.controller, 'dead').inc()
+            OUTBOX_DEPTH.labels(command.controller).dec()
+            return
+        delay = min(self.config.retry_max, self.config.retry_base * 2 ** command.attempts)
+        delay *= random.uniform(0.5, 1.0)
+        outbox_logger.warning(f'Controller command {command.id} failed (attempt {attempts}), retry in {delay:.1f}s: {error}')
+        await asyncio.to_thread(self.store.retry, command.id, error, delay)
+        DELIVERIES.labels(command.controller, 'retry').inc()
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from loguru import logger as reconciler_logger
+from prometheus_client import Counter, Gauge
+
+from api_client import APIClient
+from configurations.config import ReconcilerConfig
+from .outbox import Outbox
+
+DIVERGED = Gauge('reconciler_diverged_devices', 'Devices whose reported state differs from the desired one past the deadline')
+RESENT = Counter('reconciler_resent_total', 'Controller commands re-sent by the reconciler')
+GAVE_UP = Counter('reconciler_gave_up_total', 'Devices the reconciler stopped re-sending after the last attempt')
+
+
+@dataclass
+class ResendState:
+    """
+    Re-sends already made for one desired state version of a device
+    """
+    version: int
+    attempts: int
+    next_at: float
+
+
+class Reconciler:
+    """
+    Background loop what re-sends controller commands for devices whose reported state
+    still differs from the desired one after the deadline.
+    Only the diverged devices are read (the DataBase keeps a partial index of them),
+    re-sends of one device back off exponentially and stop after max_attempts per desired version
+    """
+
+    def __init__(self, config: ReconcilerConfig, client: APIClient, outbox: Outbox) -> None:
+        """
+        Initialize reconciler
+
+        Args:
+            config: Reconciler configuration
+            client: API client of the DataBase service
+            outbox: Outbox the commands are re-sent through
+        """
+        self.config: ReconcilerConfig = config
+        self.client: APIClient = client
+        self.outbox: Outbox = outbox
+        self._resends: Dict[int, ResendState] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Start the reconciliation loop
+        """
+        if self._task is None and self.outbox.enabled:
+            self._task = asyncio.create_task(self._run())
+            reconciler_logger.info('Reconciler started')
+
+    async def stop(self) -> None:
+        """
+        Stop the reconciliation loop
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            reconciler_logger.info('Reconciler stopped')
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                reconciler_logger.error('Reconciliation pass failed', exc_info=True)
+            await asyncio.sleep(self.config.interval)
+
+    async def reconcile(self) -> int:
+        """
+        Run one reconciliation pass
+
+        Returns:
+            Number of re-sent commands
+        """
+        devices = await self.client.get_diverged_devices(self.config.deadline, self.config.batch_size)
+        DIVERGED.set(len(devices))
+        now = time.monotonic()
+        resent = 0
+        for device in devices:
+            state = self._resends.get(device['device_id'])
+            if state is None or state.version != device['version']:
+                state = ResendState(version=device['version'], attempts=0, next_at=now)
+                self._resends[device['device_id']] = state
+            if state.attempts >= self.config.max_attempts or now < state.next_at:
+                continue
+            await self.outbox.enqueue(device, force=True)
+            state.attempts += 1
+            state.next_at = now + self.config.deadline * 2 ** state.attempts
+            resent += 1
+            RESENT.inc()
+            if state.attempts == self.config.max_attempts:
+                GAVE_UP.inc()
+                reconciler_logger.warning(
+                    f"Device {device['device_id']} still diverged after {state.attempts} re-sends of version {state.version}"
+                )
+        # Devices what converged (or were deleted) are forgotten
+        diverged_ids = {device['device_id'] for device in devices}
+        if len(devices) < self.config.batch_size:
+            for device_id in list(self._resends):
+                if device_id not in diverged_ids:
+                    del self._resends[device_id]
+        if resent:
+            reconciler_logger.info(f'Reconciler re-sent {resent} of {len(devices)} diverged devices')
+        return resent
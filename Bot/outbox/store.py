@@ -0,0 +1,275 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class OutboxCommand:
+    """
+    Controller command persisted in the outbox
+    """
+    id: int
+    device_id: int
+    controller: str
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: float
+
+
+class OutboxStore:
+    """
+    SQLite-backed persistent queue of controller commands.
+    Methods are blocking and are meant to be called through asyncio.to_thread
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open (or create) the outbox database
+        
+        Args:
+            path: Path to the SQLite file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock: threading.Lock = threading.Lock()
+        self._db: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id INTEGER NOT NULL,
+                controller TEXT NOT NULL DEFAULT '',
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                leased_until REAL,
+                acked_at REAL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_outbox_device_status ON outbox (device_id, status);
+            """
+        )
+        # Outbox files created before multi-controller routing have no controller column
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if 'controller' not in columns:
+            self._db.execute("ALTER TABLE outbox ADD COLUMN controller TEXT NOT NULL DEFAULT ''")
+        self._db.executescript(
+            """
+            DROP INDEX IF EXISTS ix_outbox_status_available;
+            CREATE INDEX IF NOT EXISTS ix_outbox_controller_status_available ON outbox (controller, status, available_at);
+            """
+        )
+
+    def close(self) -> None:
+        """
+        Close the database connection
+        """
+        with self._lock:
+            self._db.close()
+
+    def enqueue(self, device_id: int, controller: str, payload: Dict[str, Any], window: float = 0.0) -> Tuple[int, bool]:
+        """
+        Persist a command. If the device already has a command waiting in the queue,
+        that command takes the new payload instead, so only the last desired state is delivered
+        
+        Args:
+            device_id: ID of the target device
+            controller: URL of the controller what serves the device
+            payload: Packet for the controller
+            window: Coalescing window in seconds, a new command is held this long before delivery
+            
+        Returns:
+            Tuple of (ID of the stored command, whether it was collapsed into a waiting one)
+        """
+        return self.enqueue_many([(device_id, controller, payload)], window)[0]
+
+    def enqueue_many(self, commands: List[Tuple[int, str, Dict[str, Any]]], window: float = 0.0) -> List[Tuple[int, bool]]:
+        """
+        Persist commands of many devices in one transaction, coalescing like enqueue
+        
+        Args:
+            commands: List of (device_id, controller, payload)
+            window: Coalescing window in seconds
+            
+        Returns:
+            List of (ID of the stored command, whether it was collapsed into a waiting one) in the order of commands
+        """
+        now = time.time()
+        results = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for device_id, controller, payload in commands:
+                    data = json.dumps(payload, default=str)
+                    waiting = self._db.execute(
+                        "SELECT id FROM outbox WHERE device_id = ? AND status = 'pending' ORDER BY id DESC LIMIT 1",
+                        (device_id,)
+                    ).fetchone()
+                    if waiting is not None:
+                        self._db.execute(
+                            "UPDATE outbox SET payload = ?, controller = ? WHERE id = ?", (data, controller, waiting[0])
+                        )
+                        results.append((waiting[0], True))
+                    else:
+                        cursor = self._db.execute(
+                            "INSERT INTO outbox (device_id, controller, payload, created_at, available_at) VALUES (?, ?, ?, ?, ?)",
+                            (device_id, controller, data, now, now + window)
+                        )
+                        results.append((cursor.lastrowid, False))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return results
+
+    def claim(self, controller: str, limit: int, lease: float) -> List[OutboxCommand]:
+        """
+        Take due commands of one controller for delivery. Commands whose lease expired (worker crashed) are taken again
+        
+        Args:
+            controller: URL of the controller
+            limit: Maximum number of commands
+            lease: Seconds the commands stay reserved for this worker
+            
+        Returns:
+            List of claimed commands
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    """
+                    SELECT id, device_id, controller, payload, attempts, created_at FROM outbox
+                    WHERE controller = ?
+                      AND ((status = 'pending' AND available_at <= ?) OR (status = 'inflight' AND leased_until < ?))
+                    ORDER BY id LIMIT ?
+                    """,
+                    (controller, now, now, limit)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'inflight', leased_until = ? WHERE id = ?",
+                    [(now + lease, row[0]) for row in rows]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return [
+            OutboxCommand(
+                id=row[0], device_id=row[1], controller=row[2], payload=json.loads(row[3]),
+                attempts=row[4], created_at=row[5]
+            )
+            for row in rows
+        ]
+
+    def ack(self, command_ids: List[int]) -> None:
+        """
+        Record acknowledgements of delivered commands
+        
+        Args:
+            command_ids: IDs of delivered commands
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET status = 'acked', acked_at = ?, leased_until = NULL WHERE id = ?",
+                [(now, command_id) for command_id in command_ids]
+            )
+
+    def retry(self, command_id: int, error: str, delay: float) -> None:
+        """
+        Return a failed command to the queue after a delay
+        
+        Args:
+            command_id: ID of the command
+            error: Text of the delivery error
+            delay: Seconds until the next attempt
+        """
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE outbox SET status = 'pending', attempts = attempts + 1, available_at = ?,
+                                  leased_until = NULL, last_error = ?
+                WHERE id = ?
+                """,
+                (time.time() + delay, error, command_id)
+            )
+
+    def fail(self, command_id: int, error: str) -> None:
+        """
+        Give up on a command after the last attempt
+        
+        Args:
+            command_id: ID of the command
+            error: Text of the delivery error
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = 'dead', attempts = attempts + 1, leased_until = NULL, last_error = ? WHERE id = ?",
+                (error, command_id)
+            )
+
+    def depth(self) -> Dict[str, int]:
+        """
+        Number of commands waiting for delivery per controller
+        
+        Returns:
+            Count of pending and in-flight commands by controller URL
+        """
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT controller, COUNT(*) FROM outbox WHERE status IN ('pending', 'inflight') GROUP BY controller"
+            ).fetchall())
+
+    def reroute(self, controllers: Set[str], resolve: Callable[[Optional[str]], Optional[str]]) -> int:
+        """
+        Re-resolve waiting commands of controllers what are no longer configured
+        (routing table changed between restarts, or the file predates routing)
+        
+        Args:
+            controllers: URLs of the configured controllers
+            resolve: Function from a device address to a controller URL
+            
+        Returns:
+            Number of re-routed commands
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, controller, payload FROM outbox WHERE status IN ('pending', 'inflight')"
+            ).fetchall()
+            moves = []
+            for command_id, controller, payload in rows:
+                if controller in controllers:
+                    continue
+                target = resolve(json.loads(payload).get('address'))
+                if target is not None:
+                    moves.append((target, command_id))
+            self._db.executemany("UPDATE outbox SET controller = ? WHERE id = ?", moves)
+        return len(moves)
+
+    def purge(self, older_than: float) -> int:
+        """
+        Delete acknowledged commands older than the given age
+        
+        Args:
+            older_than: Age in seconds
+            
+        Returns:
+            Number of deleted commands
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM outbox WHERE status = 'acked' AND acked_at < ?",
+                (time.time() - older_than,)
+            )
+            return cursor.rowcount
@@ -0,0 +1 @@
+from .prober import ReachabilityProber, ProbeResult, parse_address
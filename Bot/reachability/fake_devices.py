@@ -0,0 +1,55 @@
+"""
+Local fake devices for testing the reachability prober.
+Listens on a range of TCP ports, each port standing in for one device; a share of the ports is left closed
+so those devices show up as offline. Prints the addresses to register:
+
+    python -m reachability.fake_devices --ports 9200-9299 --offline-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+from typing import List, Tuple
+
+
+async def _accept(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    writer.close()
+
+
+async def serve(host: str, ports: List[int], offline_rate: float) -> Tuple[List[int], List[int]]:
+    """
+    Open listeners for the online share of the ports
+
+    Args:
+        host: Interface to listen on
+        ports: Ports of all fake devices
+        offline_rate: Share of the ports what stay closed
+
+    Returns:
+        Tuple of online and offline ports
+    """
+    online, offline = [], []
+    for port in ports:
+        if random.random() < offline_rate:
+            offline.append(port)
+            continue
+        await asyncio.start_server(_accept, host, port)
+        online.append(port)
+    return online, offline
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--ports', default='9200-9209', help='Port range of the fake devices, e.g. 9200-9299')
+    parser.add_argument('--offline-rate', type=float, default=0.2)
+    args = parser.parse_args()
+
+    first, _, last = args.ports.partition('-')
+    online, offline = await serve(args.host, list(range(int(first), int(last or first) + 1)), args.offline_rate)
+    print(f'online:  {" ".join(f"{args.host}:{port}" for port in online)}')
+    print(f'offline: {" ".join(f"{args.host}:{port}" for port in offline)}')
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
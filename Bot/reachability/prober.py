@@ -0,0 +1,203 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger as prober_logger
+from prometheus_client import Counter, Gauge, Histogram
+
+from api_client import APIClient
+from configurations.config import ReachabilityConfig
+
+PROBES = Counter('reachability_probes_total', 'Address probes by result', ['result'])
+PROBE_RTT = Histogram(
+    'reachability_probe_rtt_seconds',
+    'TCP connect time of reachable device addresses',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+DEVICES = Gauge('reachability_devices', 'Devices by the result of their last probe', ['state'])
+ROUND_SECONDS = Gauge('reachability_round_seconds', 'Duration of the last probing round')
+
+SCHEME_PORTS = {'http': 80, 'https': 443, 'ws': 80, 'wss': 443}
+
+
+@dataclass
+class ProbeResult:
+    """
+    Last probe of a device address
+    """
+    online: bool
+    rtt: Optional[float]
+    checked_at: float
+    error: Optional[str] = None
+
+
+def parse_address(address: str, default_port: int) -> Optional[Tuple[str, int]]:
+    """
+    Parse a device address ("10.0.0.5", "10.0.0.5:8080", "[fe80::1]:80" or a URL) into host and port
+
+    Args:
+        address: Address of the device as registered by the user
+        default_port: Port used when the address has none
+
+    Returns:
+        Tuple of host and port or None if the address can not be probed
+    """
+    address = (address or '').strip()
+    if not address:
+        return None
+    try:
+        parts = urlsplit(address if '://' in address else f'//{address}')
+        port = parts.port or SCHEME_PORTS.get(parts.scheme, default_port)
+    except ValueError:
+        return None
+    if not parts.hostname:
+        return None
+    return parts.hostname, port
+
+
+class ReachabilityProber:
+    """
+    Background prober of device addresses.
+    Every interval the registered devices are read once and each distinct address gets a TCP connect probe;
+    the probes are spread evenly over the interval and at most `concurrency` of them run at a time,
+    so a large fleet produces a steady trickle instead of a burst. Handlers read the cached results only
+    and never probe while a user waits
+    """
+
+    def __init__(self, config: ReachabilityConfig, client: APIClient) -> None:
+        """
+        Initialize prober
+
+        Args:
+            config: Reachability configuration
+            client: API client of the DataBase service
+        """
+        self.config: ReachabilityConfig = config
+        self.client: APIClient = client
+        self._results: Dict[int, ProbeResult] = {}
+        self._slots: asyncio.Semaphore = asyncio.Semaphore(config.concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, device_id: int) -> Optional[ProbeResult]:
+        """
+        Get the cached result of a device
+
+        Args:
+            device_id: ID of the device
+
+        Returns:
+            Last probe result or None if the device was not probed yet
+        """
+        return self._results.get(device_id)
+
+    def start(self) -> None:
+        """
+        Start the probing loop
+        """
+        if self._task is None and self.config.enabled:
+            self._task = asyncio.create_task(self._run())
+            prober_logger.info('Reachability prober started')
+
+    async def stop(self) -> None:
+        """
+        Stop the probing loop
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            prober_logger.info('Reachability prober stopped')
+
+    async def probe(self, address: str) -> ProbeResult:
+        """
+        Probe one address with a TCP connect
+
+        Args:
+            address: Address of the device
+
+        Returns:
+            Probe result with the connect time as RTT
+        """
+        target = parse_address(address, self.config.default_port)
+        if target is None:
+            PROBES.labels('invalid').inc()
+            return ProbeResult(online=False, rtt=None, checked_at=time.time(), error='invalid address')
+        host, port = target
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=self.config.timeout)
+        except asyncio.TimeoutError:
+            PROBES.labels('timeout').inc()
+            return ProbeResult(online=False, rtt=None, checked_at=time.time(), error='timeout')
+        except OSError as e:
+            PROBES.labels('refused').inc()
+            return ProbeResult(online=False, rtt=None, checked_at=time.time(), error=e.strerror or type(e).__name__)
+        except ValueError as e:
+            # Host names the resolver rejects, e.g. UnicodeError of a label longer than 63 characters
+            PROBES.labels('invalid').inc()
+            return ProbeResult(online=False, rtt=None, checked_at=time.time(), error=f'invalid address: {e}')
+        rtt = time.perf_counter() - started
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        PROBES.labels('online').inc()
+        PROBE_RTT.observe(rtt)
+        return ProbeResult(online=True, rtt=rtt, checked_at=time.time())
+
+    async def _probe_devices(self, address: str, device_ids: List[int]) -> None:
+        try:
+            result = await self.probe(address)
+            for device_id in device_ids:
+                self._results[device_id] = result
+        finally:
+            self._slots.release()
+
+    async def run_round(self) -> int:
+        """
+        Probe every registered address once, spread over the interval
+
+        Returns:
+            Number of probed addresses
+        """
+        devices = await self.client.get_registered_devices()
+        # Devices sharing an address (several relays of one board) cost one probe
+        targets: Dict[str, List[int]] = {}
+        for device in devices:
+            targets.setdefault(device.get('address') or '', []).append(device['device_id'])
+        registered = {device['device_id'] for device in devices}
+        for device_id in list(self._results):
+            if device_id not in registered:
+                del self._results[device_id]
+
+        started = time.monotonic()
+        step = self.config.interval / max(len(targets), 1)
+        tasks = []
+        for n, (address, device_ids) in enumerate(targets.items()):
+            delay = started + n * step - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._slots.acquire()
+            tasks.append(asyncio.create_task(self._probe_devices(address, device_ids)))
+        await asyncio.gather(*tasks)
+
+        online = sum(1 for result in self._results.values() if result.online)
+        DEVICES.labels('online').set(online)
+        DEVICES.labels('offline').set(len(self._results) - online)
+        ROUND_SECONDS.set(time.monotonic() - started)
+        prober_logger.info(f'Probed {len(targets)} addresses: {online} of {len(self._results)} devices online')
+        return len(targets)
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                await self.run_round()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                prober_logger.error('Reachability round failed', exc_info=True)
+            await asyncio.sleep(max(self.config.interval - (time.monotonic() - started), 0))
@@ -1 +1 @@
-from .routs import user_router, device_router
\ No newline at end of file
+from .routs import user_router, device_router, events_router, telemetry_router, group_router, scene_router, schedule_router, rule_router, stats_router
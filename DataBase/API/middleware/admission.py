@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from loguru import logger as admission_logger
+from prometheus_client import Counter, Gauge, Histogram
+
+from DataBase.core.db_connection import request_deadline
+
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+PRIORITIES = ('write', 'read')
+
+QUEUE_LENGTH = Gauge('admission_queue_length', 'Requests waiting for a free slot', ['priority'])
+IN_FLIGHT = Gauge('admission_in_flight', 'Requests currently being processed')
+REJECTED = Counter('admission_rejected_total', 'Requests rejected by admission control', ['priority', 'reason'])
+QUEUE_WAIT = Histogram(
+    'admission_queue_wait_seconds',
+    'Time spent waiting for a free slot',
+    ['priority'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+
+class AdmissionRejected(Exception):
+    """
+    Request can not be admitted: the wait queue is full or the deadline passed while waiting
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded priority wait queue.
+    Freed slots are handed to waiting writes first, then to reads
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, priority: str, timeout: float) -> None:
+        """
+        Take a slot, waiting in the queue no longer than timeout
+        :param priority: 'write' or 'read'
+        :param timeout: Maximum time to wait for a slot in seconds
+        """
+        if self._active < self.max_concurrency and self.queued == 0:
+            self._active += 1
+            IN_FLIGHT.set(self._active)
+            return
+        if self.queued >= self.max_queue:
+            raise AdmissionRejected('queue_full')
+        if timeout <= 0:
+            raise AdmissionRejected('deadline')
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters[priority]
+        queue.append(waiter)
+        QUEUE_LENGTH.labels(priority).set(len(queue))
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # release() handed over the slot just as the deadline fired, it is ours now
+                return
+            raise AdmissionRejected('deadline')
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in queue:
+                queue.remove(waiter)
+            QUEUE_LENGTH.labels(priority).set(len(queue))
+
+    def release(self) -> None:
+        """
+        Give the slot to the next waiter or free it
+        """
+        for priority in PRIORITIES:
+            queue = self._waiters[priority]
+            while queue:
+                waiter = queue.popleft()
+                QUEUE_LENGTH.labels(priority).set(len(queue))
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._active -= 1
+        IN_FLIGHT.set(self._active)
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware what limits concurrent requests to the DataBase API.
+    Requests over capacity wait in a bounded queue until their deadline, otherwise they get a fast 503 with Retry-After.
+    The request deadline is exported to the DB layer, which turns it into statement_timeout
+    """
+
+    def __init__(self, app, max_concurrency: int, max_queue: int, request_timeout: float,
+                 retry_after: int = 1, exempt_paths: tuple[str, ...] = ()):
+        self.app = app
+        self.controller = AdmissionController(max_concurrency, max_queue)
+        self.request_timeout = request_timeout
+        self.retry_after = retry_after
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        priority = 'read' if scope['method'] in READ_METHODS else 'write'
+        deadline = time.monotonic() + self.request_timeout
+        started = time.monotonic()
+        try:
+            await self.controller.acquire(priority, timeout=deadline - started)
+        except AdmissionRejected as e:
+            REJECTED.labels(priority, e.reason).inc()
+            admission_logger.warning(f'Request rejected by admission control: {scope["method"]} {scope["path"]}, reason={e.reason}')
+            await self._reject(send)
+            return
+        QUEUE_WAIT.labels(priority).observe(time.monotonic() - started)
+
+        token = request_deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
+            self.controller.release()
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({'detail': 'Service is overloaded, retry later'}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(self.retry_after).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -1,2 +1,9 @@
 from .user import user_router
 from .device import device_router
+from .events import events_router
+from .telemetry import telemetry_router
+from .group import group_router
+from .scene import scene_router
+from .schedule import schedule_router
+from .rule import rule_router
+from .stats import stats_router
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, status, HTTPException, Depends
+import asyncio
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, status, HTTPException, Depends, Query, Response
 from sqlalchemy.orm import Session
 
 from . import pydantic_models as pd_md
+from configurations import main_config
 from DataBase.core.db_connection import get_db
-from DataBase.repositories import DevicesRepo
+from DataBase.events import desired_state
+from DataBase.repositories import DevicesRepo, HistoryRepo
 from ..utils import FunctionsAPI as Func_API
 
 from loguru import logger as device_logger
@@ -43,6 +49,39 @@ async def create_device_api(device: pd_md.DeviceCreate, db: Session = Depends(ge
         )
 
 
+@device_router.post('/create/devices')
+async def create_devices_api(devices: pd_md.DevicesImport, db: Session = Depends(get_db)):
+    """
+    Api router what creates many devices of one user in one transaction and adds them to the user's devices,
+    for imports. Returns the created devices in the order of the request
+    """
+    try:
+        device_logger.info(f'Request to import {len(devices.devices)} devices: user_id={devices.user_id}')
+        created_devices = DevicesRepo(db).create_devices(
+            devices.user_id,
+            [device.__dict__ for device in devices.devices],
+            devices.create_time
+        )
+
+        if created_devices is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='User not found'
+            )
+        device_logger.info(f'{len(created_devices)} devices imported')
+
+        return Func_API.convert_list_devices(created_devices)
+    except HTTPException:
+        device_logger.error('An error occurred while importing devices', exc_info=True)
+        raise
+    except Exception as e:
+        device_logger.error('An error occurred while importing devices', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @device_router.get('/get/device/{device_id}')
 async def get_device_by_id_api(device_id: int, db: Session = Depends(get_db)):
     try:
@@ -88,6 +127,48 @@ async def get_all_devices_api(db: Session = Depends(get_db)):
         )
 
 
+@device_router.get('/get/devices', response_model=pd_md.DevicesPage)
+async def get_devices_page_api(limit: int = Query(50, gt=0, le=500),
+                               q: Optional[str] = Query(None, max_length=100),
+                               active: Optional[bool] = None,
+                               user_id: Optional[int] = None,
+                               after: Optional[int] = None,
+                               before: Optional[int] = None,
+                               db: Session = Depends(get_db)):
+    """
+    Api router what returns one page of devices, newest first, searched and filtered in SQL.
+    q is a case-insensitive substring of the title or the address; pass next_cursor as `after` or prev_cursor as `before`
+    """
+    try:
+        device_logger.info(f'Request to get a page of devices: q={q}, active={active}, user_id={user_id}')
+        if after is not None and before is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Only one of after and before can be set'
+            )
+        repo = DevicesRepo(db)
+        q = q.strip() if q else None
+        devices, has_more = repo.get_devices_page(limit, q, active, user_id, after, before)
+        # Reading forward there is a previous page whenever we came from one, reading backward the same for the next
+        has_next = has_more if before is None else True
+        has_prev = has_more if before is not None else after is not None
+        return pd_md.DevicesPage(
+            items=Func_API.convert_list_devices(devices),
+            total=repo.count_devices(q, active, user_id),
+            next_cursor=devices[-1].device_id if devices and has_next else None,
+            prev_cursor=devices[0].device_id if devices and has_prev else None
+        )
+    except HTTPException:
+        device_logger.error('Error getting a page of devices', exc_info=True)
+        raise
+    except Exception as e:
+        device_logger.error('Error getting a page of devices', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @device_router.put('/update/device/{device_id}')
 async def update_device_api(device_id: int, device: pd_md.DeviceUpdate, db: Session = Depends(get_db)):
     try:
@@ -113,6 +194,130 @@ async def update_device_api(device_id: int, device: pd_md.DeviceUpdate, db: Sess
         )
 
 
+@device_router.put('/update/devices/state')
+async def set_devices_states_api(states: list[pd_md.DeviceDesiredState], db: Session = Depends(get_db)):
+    """
+    Api router what changes the desired state of many devices with a single UPDATE.
+    Returns only the devices what actually changed, they need a controller command
+    """
+    try:
+        device_logger.info(f'Bulk device state update: {len(states)} devices')
+        devices = DevicesRepo(db).set_devices_states({state.device_id: state.active for state in states})
+        return Func_API.convert_list_devices(devices)
+    except Exception as e:
+        device_logger.error('Error updating devices states', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@device_router.post('/report/device/{device_id}')
+async def report_device_state_api(device_id: int, report: pd_md.DeviceReport, db: Session = Depends(get_db)):
+    """
+    Api router what records the state the device actually is in, called by the device or its controller
+    """
+    try:
+        device_logger.info(f'Device state report: device_id={device_id}, active={report.active}, version={report.version}')
+        device = DevicesRepo(db).report_device_state(device_id, report.active, report.version)
+
+        if device is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Device not found'
+            )
+        return pd_md.Device(**device.__dict__)
+    except HTTPException:
+        device_logger.error('Error recording device state report', exc_info=True)
+        raise
+    except Exception as e:
+        device_logger.error('Error recording device state report', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@device_router.post('/report/devices')
+async def report_devices_states_api(reports: list[pd_md.DeviceReportItem], db: Session = Depends(get_db)):
+    """
+    Api router what records reported states of many devices at once, for controllers
+    """
+    try:
+        device_logger.info(f'Batch device state report: {len(reports)} devices')
+        devices = DevicesRepo(db).report_devices_states([report.__dict__ for report in reports])
+        return {'updated': [device.device_id for device in devices]}
+    except Exception as e:
+        device_logger.error('Error recording device state reports', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@device_router.get('/get/diverged/devices')
+async def get_diverged_devices_api(older_than: float = Query(30, ge=0), limit: int = Query(500, gt=0, le=5000),
+                                   db: Session = Depends(get_db)):
+    """
+    Api router what returns devices whose reported state differs from the desired one
+    for longer than older_than seconds, for the reconciler
+    """
+    try:
+        device_logger.info(f'Request to get diverged devices: older_than={older_than}, limit={limit}')
+        deadline = datetime.datetime.now() - datetime.timedelta(seconds=older_than)
+        devices = DevicesRepo(db).get_diverged_devices(deadline, limit)
+        return Func_API.convert_list_devices(devices)
+    except Exception as e:
+        device_logger.error('Error getting diverged devices', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@device_router.get('/history/device/{device_id}', response_model=list[pd_md.DeviceStateChange])
+async def get_device_history_api(device_id: int, limit: int = Query(100, gt=0, le=1000), db: Session = Depends(get_db)):
+    """
+    Api router what returns the latest state changes of the device, newest first
+    """
+    try:
+        device_logger.info(f'Request to get device history: device_id={device_id}, limit={limit}')
+        return HistoryRepo(db).get_recent_history(device_id, limit)
+    except Exception as e:
+        device_logger.error('Error getting device history', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@device_router.get('/uptime/device/{device_id}', response_model=pd_md.DeviceUptime)
+async def get_device_uptime_api(device_id: int, start: Optional[datetime.datetime] = None,
+                                end: Optional[datetime.datetime] = None, db: Session = Depends(get_db)):
+    """
+    Api router what returns how long the device was on within [start, end), the last 7 days by default
+    """
+    try:
+        end = end or datetime.datetime.now()
+        start = start or end - datetime.timedelta(days=7)
+        if start >= end:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='start must be before end'
+            )
+        device_logger.info(f'Request to get device uptime: device_id={device_id}, start={start}, end={end}')
+        return HistoryRepo(db).get_uptime(device_id, start, end)
+    except HTTPException:
+        device_logger.error('Error getting device uptime', exc_info=True)
+        raise
+    except Exception as e:
+        device_logger.error('Error getting device uptime', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @device_router.delete('/delete/device/{device_id}')
 async def delete_device_api(device_id: int, db: Session = Depends(get_db)):
     try:
@@ -137,3 +342,54 @@ async def delete_device_api(device_id: int, db: Session = Depends(get_db)):
         )
 
 
+def make_state_loader(db: Session):
+    """
+    Func what builds the DataBase reader of device states for the long-poll cache
+    :param db: Session of the request, closed right after the read so no pool connection is held while waiting
+    :return: Callable from device ID to its state dict or None
+    """
+    def load(device_id: int) -> Optional[dict]:
+        device = DevicesRepo(db).get_device_by_id(device_id)
+        db.close()
+        if device is None:
+            return None
+        return {'device_id': device.device_id, 'active': device.active, 'version': device.version}
+    return load
+
+
+@device_router.get('/poll/device/{device_id}', response_model=pd_md.DeviceState,
+                   responses={304: {'description': 'State version did not change before the timeout'}})
+async def poll_device_state_api(device_id: int, response: Response, version: int = 0,
+                                timeout: Optional[float] = Query(None, gt=0), db: Session = Depends(get_db)):
+    """
+    Long-poll of the desired device state for firmware.
+    Answers at once when the state version differs from `version`, otherwise holds the request
+    until a write changes the device or timeout passes (304)
+    """
+    try:
+        timeout = min(timeout or main_config.events.longpoll_timeout, main_config.events.longpoll_max_timeout)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        load = make_state_loader(db)
+        while True:
+            state = desired_state.get(device_id, load)
+            if state is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='Device not found'
+                )
+            if state['version'] != version:
+                response.headers['ETag'] = f'"{state["version"]}"'
+                return pd_md.DeviceState(**state)
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await desired_state.wait(device_id, remaining):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': f'"{version}"'})
+    except HTTPException:
+        device_logger.error('Error polling device state', exc_info=True)
+        raise
+    except Exception as e:
+        device_logger.error('Error polling device state', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
@@ -0,0 +1,102 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status, HTTPException
+from fastapi.responses import StreamingResponse
+
+from configurations import main_config
+from DataBase.events import event_bus, Subscription
+
+from loguru import logger as events_logger
+
+events_router = APIRouter(
+    prefix='/events',
+    tags=['events']
+)
+
+ENTITY_NAMES = frozenset({'device', 'user', 'schedule', 'rule'})
+
+
+def make_filters(entity: Optional[list[str]], ids: Optional[list[int]]) -> tuple[Optional[set], Optional[set]]:
+    """
+    Func what validates feed filters, the subscription itself is made once the client is actually served
+    :param entity: Entities to receive, all if empty
+    :param ids: IDs to receive, all if empty
+    :return: Entity and ID filters of the bus, None means all
+    """
+    entities = set(entity or ())
+    unknown = entities - ENTITY_NAMES
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unknown entity: {", ".join(sorted(unknown))}'
+        )
+    return entities or None, set(ids or ()) or None
+
+
+async def sse_stream(entities: Optional[set], ids: Optional[set]):
+    # Subscribed by the first read of the body, a client gone before the response started leaves nothing behind
+    subscription: Subscription = event_bus.subscribe(entities, ids)
+    try:
+        yield 'retry: 3000\n\n'
+        yield 'event: ready\ndata: {}\n\n'
+        while True:
+            try:
+                change = await asyncio.wait_for(subscription.get(), timeout=main_config.events.heartbeat)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield f'event: {change["type"]}\ndata: {json.dumps(change)}\n\n'
+    finally:
+        event_bus.unsubscribe(subscription)
+        events_logger.info('Change feed SSE client disconnected')
+
+
+@events_router.get('/stream')
+async def change_stream_api(entity: Optional[list[str]] = Query(None), ids: Optional[list[int]] = Query(None)):
+    """
+    Server-Sent Events stream of device and user changes.
+    Event "change" carries create/update/delete of one row, event "resync" means events were missed
+    and the client has to re-fetch the state
+    """
+    entities, id_filter = make_filters(entity, ids)
+    events_logger.info(f'Change feed SSE client connected: entity={entity}, ids={ids}')
+    return StreamingResponse(
+        sse_stream(entities, id_filter),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@events_router.websocket('/ws')
+async def change_websocket_api(websocket: WebSocket, entity: Optional[list[str]] = Query(None),
+                               ids: Optional[list[int]] = Query(None)):
+    """
+    WebSocket variant of the change feed, every message is one JSON event
+    """
+    try:
+        entities, id_filter = make_filters(entity, ids)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    await websocket.accept()
+    subscription = event_bus.subscribe(entities, id_filter)
+    events_logger.info(f'Change feed WebSocket client connected: entity={entity}, ids={ids}')
+
+    async def send_events():
+        while True:
+            await websocket.send_json(await subscription.get())
+
+    sender = asyncio.create_task(send_events())
+    try:
+        # The client is not expected to send anything, reading only detects the disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        event_bus.unsubscribe(subscription)
+        events_logger.info('Change feed WebSocket client disconnected')
@@ -0,0 +1,155 @@
+from fastapi import APIRouter, status, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from . import pydantic_models as pd_md
+from DataBase.core.db_connection import get_db
+from DataBase.repositories import GroupsRepo
+from ..utils import FunctionsAPI as Func_API
+
+from loguru import logger as group_logger
+
+group_router = APIRouter(
+    prefix='/group',
+    tags=['group']
+)
+
+
+def group_not_found():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail='Group not found'
+    )
+
+
+@group_router.post('/create/group')
+async def create_group_api(group: pd_md.GroupCreate, db: Session = Depends(get_db)):
+    """
+    Api router what creating new device group, devices the user does not own are left out
+    """
+    try:
+        group_logger.info(f'Request to create a new group: user_id={group.user_id}')
+        created_group = GroupsRepo(db).create_group(**group.__dict__)
+        group_logger.info('New group created')
+        return pd_md.Group(**created_group.__dict__)
+    except Exception as e:
+        group_logger.error('An error occurred while creating the group', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@group_router.get('/get/group/{group_id}')
+async def get_group_by_id_api(group_id: int, db: Session = Depends(get_db)):
+    try:
+        group_logger.info(f'Request to get group: group_id={group_id}')
+        group = GroupsRepo(db).get_group_by_id(group_id)
+        if group is None:
+            raise group_not_found()
+        return pd_md.Group(**group.__dict__)
+    except HTTPException:
+        group_logger.error('Error getting group', exc_info=True)
+        raise
+    except Exception as e:
+        group_logger.error('Error getting group', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@group_router.get('/get/user/groups/{user_id}')
+async def get_user_groups_api(user_id: int, db: Session = Depends(get_db)):
+    try:
+        group_logger.info(f'Request to get groups of user: user_id={user_id}')
+        groups = GroupsRepo(db).get_user_groups(user_id)
+        return [pd_md.Group(**group.__dict__) for group in groups]
+    except Exception as e:
+        group_logger.error('Error getting groups of user', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@group_router.get('/get/group/devices/{group_id}')
+async def get_group_devices_api(group_id: int, db: Session = Depends(get_db)):
+    """
+    Api router what returns the member devices of the group in one query
+    """
+    try:
+        group_logger.info(f'Request to get group devices: group_id={group_id}')
+        devices = GroupsRepo(db).get_group_devices(group_id)
+        if devices is None:
+            raise group_not_found()
+        return Func_API.convert_list_devices(devices)
+    except HTTPException:
+        group_logger.error('Error getting group devices', exc_info=True)
+        raise
+    except Exception as e:
+        group_logger.error('Error getting group devices', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@group_router.put('/update/group/{group_id}')
+async def update_group_api(group_id: int, group: pd_md.GroupUpdate, db: Session = Depends(get_db)):
+    try:
+        group_logger.info(f'Group update request: group_id={group_id}')
+        new_group = GroupsRepo(db).update_group(group_id, **group.__dict__)
+        if new_group is None:
+            raise group_not_found()
+        return pd_md.Group(**new_group.__dict__)
+    except HTTPException:
+        group_logger.error('Error updating group', exc_info=True)
+        raise
+    except Exception as e:
+        group_logger.error('Error updating group', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@group_router.put('/set/group/{group_id}')
+async def set_group_state_api(group_id: int, state: pd_md.GroupState, db: Session = Depends(get_db)):
+    """
+    Api router what turns all devices of the group on or off with a single UPDATE.
+    Returns only the devices what actually changed, they need a controller command
+    """
+    try:
+        group_logger.info(f'Group state request: group_id={group_id}, active={state.active}')
+        devices = GroupsRepo(db).set_group_state(group_id, state.active)
+        if devices is None:
+            raise group_not_found()
+        return Func_API.convert_list_devices(devices)
+    except HTTPException:
+        group_logger.error('Error setting group state', exc_info=True)
+        raise
+    except Exception as e:
+        group_logger.error('Error setting group state', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@group_router.delete('/delete/group/{group_id}')
+async def delete_group_api(group_id: int, db: Session = Depends(get_db)):
+    try:
+        group_logger.info(f'Group delete request: group_id={group_id}')
+        group = GroupsRepo(db).delete_group(group_id)
+        if group is None:
+            raise group_not_found()
+        return pd_md.Group(**group.__dict__)
+    except HTTPException:
+        group_logger.error('Error deleting group', exc_info=True)
+        raise
+    except Exception as e:
+        group_logger.error('Error deleting group', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
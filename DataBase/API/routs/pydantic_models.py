@@ -1,7 +1,7 @@
 import datetime
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 
 class User(BaseModel):
@@ -14,12 +14,25 @@ class User(BaseModel):
     create_time: datetime.datetime
 
 
+class UsersPage(BaseModel):
+    items: list[User]
+    total: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
 class UserUpdate(BaseModel):
     active: Optional[bool] = None
     devices: Optional[list[int]] = None
     device_counter: Optional[int] = None
 
 
+class UsersActiveUpdate(BaseModel):
+    # A whole page of the largest size of the AdminPanel users table is banned with one statement
+    user_ids: list[int] = Field(min_length=1, max_length=5000)
+    active: bool
+
+
 class UserCreate(BaseModel):
     user_id: int
     tag: str
@@ -32,6 +45,57 @@ class Device(BaseModel):
     address: str
     active: bool
     create_time: datetime.datetime
+    version: int = 1
+    desired_at: Optional[datetime.datetime] = None
+    reported_active: Optional[bool] = None
+    reported_version: Optional[int] = None
+    reported_at: Optional[datetime.datetime] = None
+    diverged: bool = False
+
+
+class DevicesPage(BaseModel):
+    items: list[Device]
+    total: int
+    next_cursor: Optional[int] = None
+    prev_cursor: Optional[int] = None
+
+
+class DeviceState(BaseModel):
+    device_id: int
+    active: bool
+    version: int
+
+
+class DeviceStateChange(BaseModel):
+    changed_at: datetime.datetime
+    active: bool
+
+
+class DeviceDayUptime(BaseModel):
+    day: datetime.date
+    on_seconds: int
+
+
+class DeviceUptime(BaseModel):
+    device_id: int
+    start: datetime.datetime
+    end: datetime.datetime
+    on_seconds: int
+    days: list[DeviceDayUptime]
+
+
+class DeviceDesiredState(BaseModel):
+    device_id: int
+    active: bool
+
+
+class DeviceReport(BaseModel):
+    active: bool
+    version: Optional[int] = None
+
+
+class DeviceReportItem(DeviceReport):
+    device_id: int
 
 
 class DeviceUpdate(BaseModel):
@@ -44,4 +108,133 @@ class DeviceCreate(BaseModel):
     title: str
     description: str
     address: str
-    create_time: datetime.datetime
\ No newline at end of file
+    create_time: datetime.datetime
+
+class DeviceImportItem(BaseModel):
+    title: str = Field(min_length=1, max_length=100)
+    description: str = Field(default='', max_length=500)
+    address: str = Field(min_length=1, max_length=200)
+
+
+class DevicesImport(BaseModel):
+    user_id: int
+    create_time: datetime.datetime
+    devices: list[DeviceImportItem] = Field(min_length=1, max_length=1000)
+
+
+class Reading(BaseModel):
+    device_id: int = Field(ge=0, le=2 ** 31 - 1)
+    metric: Literal['power', 'temperature']
+    value: float = Field(allow_inf_nan=False)
+    measured_at: Optional[datetime.datetime] = None
+
+
+class ReadingOut(BaseModel):
+    measured_at: datetime.datetime
+    metric: str
+    value: float
+
+
+class IngestResult(BaseModel):
+    accepted: int
+
+
+class Group(BaseModel):
+    group_id: int
+    user_id: int
+    title: str
+    devices: list[int]
+    create_time: datetime.datetime
+
+
+class GroupCreate(BaseModel):
+    user_id: int
+    title: str
+    devices: list[int] = []
+    create_time: datetime.datetime
+
+
+class GroupUpdate(BaseModel):
+    title: Optional[str] = None
+    devices: Optional[list[int]] = None
+
+
+class GroupState(BaseModel):
+    active: bool
+
+
+class Scene(BaseModel):
+    scene_id: int
+    user_id: int
+    title: str
+    states: dict[int, bool]
+    create_time: datetime.datetime
+
+
+class SceneCreate(BaseModel):
+    user_id: int
+    title: str
+    states: dict[int, bool]
+    create_time: datetime.datetime
+
+
+class Schedule(BaseModel):
+    schedule_id: int
+    user_id: int
+    device_id: int
+    active: bool
+    kind: str
+    time_of_day: Optional[datetime.time] = None
+    next_run: datetime.datetime
+    last_run: Optional[datetime.datetime] = None
+    create_time: datetime.datetime
+
+
+class ScheduleCreate(BaseModel):
+    user_id: int
+    device_id: int
+    active: bool
+    kind: Literal['once', 'daily']
+    # 'once': either the moment or the delay in seconds from create_time
+    run_at: Optional[datetime.datetime] = None
+    delay: Optional[int] = Field(None, gt=0)
+    # 'daily': local time of day
+    time_of_day: Optional[datetime.time] = None
+    create_time: datetime.datetime
+
+
+class Rule(BaseModel):
+    rule_id: int
+    user_id: int
+    trigger_device_id: int
+    trigger_active: bool
+    action_device_id: int
+    action_active: bool
+    enabled: bool
+    create_time: datetime.datetime
+
+
+class RuleCreate(BaseModel):
+    user_id: int
+    trigger_device_id: int
+    trigger_active: bool
+    action_device_id: int
+    action_active: bool
+    create_time: datetime.datetime
+
+
+class RuleUpdate(BaseModel):
+    enabled: bool
+
+
+class DaySignups(BaseModel):
+    day: datetime.date
+    users: int
+
+
+class Stats(BaseModel):
+    users: int
+    users_banned: int
+    devices: int
+    devices_on: int
+    signups: list[DaySignups]
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, status, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from . import pydantic_models as pd_md
+from DataBase.core.db_connection import get_db
+from DataBase.repositories import RulesRepo, RuleCycleError
+
+from loguru import logger as rule_logger
+
+rule_router = APIRouter(
+    prefix='/rule',
+    tags=['rule']
+)
+
+
+def rule_not_found():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail='Rule not found'
+    )
+
+
+@rule_router.post('/create/rule')
+async def create_rule_api(rule: pd_md.RuleCreate, db: Session = Depends(get_db)):
+    """
+    Api router what creates an automation rule "when device A turns on/off, turn device B on/off".
+    Rules what would switch a device on and off in a loop are rejected
+    """
+    try:
+        rule_logger.info(f'Request to create a new rule: user_id={rule.user_id}')
+        created_rule = RulesRepo(db).create_rule(**rule.__dict__)
+        if created_rule is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Device not found'
+            )
+        rule_logger.info('New rule created')
+        return pd_md.Rule(**created_rule.__dict__)
+    except RuleCycleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        rule_logger.error('Error creating rule', exc_info=True)
+        raise
+    except Exception as e:
+        rule_logger.error('An error occurred while creating the rule', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@rule_router.get('/get/user/rules/{user_id}')
+async def get_user_rules_api(user_id: int, db: Session = Depends(get_db)):
+    try:
+        rule_logger.info(f'Request to get rules of user: user_id={user_id}')
+        rules = RulesRepo(db).get_user_rules(user_id)
+        return [pd_md.Rule(**rule.__dict__) for rule in rules]
+    except Exception as e:
+        rule_logger.error('Error getting rules of user', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@rule_router.put('/update/rule/{rule_id}')
+async def update_rule_api(rule_id: int, rule: pd_md.RuleUpdate, db: Session = Depends(get_db)):
+    try:
+        rule_logger.info(f'Rule update request: rule_id={rule_id}, enabled={rule.enabled}')
+        new_rule = RulesRepo(db).set_rule_enabled(rule_id, rule.enabled)
+        if new_rule is None:
+            raise rule_not_found()
+        return pd_md.Rule(**new_rule.__dict__)
+    except RuleCycleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        rule_logger.error('Error updating rule', exc_info=True)
+        raise
+    except Exception as e:
+        rule_logger.error('Error updating rule', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@rule_router.delete('/delete/rule/{rule_id}')
+async def delete_rule_api(rule_id: int, db: Session = Depends(get_db)):
+    try:
+        rule_logger.info(f'Rule delete request: rule_id={rule_id}')
+        rule = RulesRepo(db).delete_rule(rule_id)
+        if rule is None:
+            raise rule_not_found()
+        return pd_md.Rule(**rule.__dict__)
+    except HTTPException:
+        rule_logger.error('Error deleting rule', exc_info=True)
+        raise
+    except Exception as e:
+        rule_logger.error('Error deleting rule', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
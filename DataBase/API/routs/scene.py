@@ -0,0 +1,95 @@
+from fastapi import APIRouter, status, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from . import pydantic_models as pd_md
+from DataBase.core.db_connection import get_db
+from DataBase.repositories import ScenesRepo
+from ..utils import FunctionsAPI as Func_API
+
+from loguru import logger as scene_logger
+
+scene_router = APIRouter(
+    prefix='/scene',
+    tags=['scene']
+)
+
+
+def scene_not_found():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail='Scene not found'
+    )
+
+
+@scene_router.post('/create/scene')
+async def create_scene_api(scene: pd_md.SceneCreate, db: Session = Depends(get_db)):
+    """
+    Api router what saves a scene: desired states of a set of devices, applied with one tap
+    """
+    try:
+        scene_logger.info(f'Request to create a new scene: user_id={scene.user_id}')
+        created_scene = ScenesRepo(db).create_scene(**scene.__dict__)
+        scene_logger.info('New scene created')
+        return pd_md.Scene(**created_scene.__dict__)
+    except Exception as e:
+        scene_logger.error('An error occurred while creating the scene', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@scene_router.get('/get/user/scenes/{user_id}')
+async def get_user_scenes_api(user_id: int, db: Session = Depends(get_db)):
+    try:
+        scene_logger.info(f'Request to get scenes of user: user_id={user_id}')
+        scenes = ScenesRepo(db).get_user_scenes(user_id)
+        return [pd_md.Scene(**scene.__dict__) for scene in scenes]
+    except Exception as e:
+        scene_logger.error('Error getting scenes of user', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@scene_router.post('/apply/scene/{scene_id}')
+async def apply_scene_api(scene_id: int, db: Session = Depends(get_db)):
+    """
+    Api router what sets all devices of the scene to their saved states with a single UPDATE.
+    Returns only the devices what actually changed, they need a controller command
+    """
+    try:
+        scene_logger.info(f'Request to apply scene: scene_id={scene_id}')
+        devices = ScenesRepo(db).apply_scene(scene_id)
+        if devices is None:
+            raise scene_not_found()
+        return Func_API.convert_list_devices(devices)
+    except HTTPException:
+        scene_logger.error('Error applying scene', exc_info=True)
+        raise
+    except Exception as e:
+        scene_logger.error('Error applying scene', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@scene_router.delete('/delete/scene/{scene_id}')
+async def delete_scene_api(scene_id: int, db: Session = Depends(get_db)):
+    try:
+        scene_logger.info(f'Scene delete request: scene_id={scene_id}')
+        scene = ScenesRepo(db).delete_scene(scene_id)
+        if scene is None:
+            raise scene_not_found()
+        return pd_md.Scene(**scene.__dict__)
+    except HTTPException:
+        scene_logger.error('Error deleting scene', exc_info=True)
+        raise
+    except Exception as e:
+        scene_logger.error('Error deleting scene', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
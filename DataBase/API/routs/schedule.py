@@ -0,0 +1,111 @@
+import datetime
+
+from fastapi import APIRouter, status, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from . import pydantic_models as pd_md
+from DataBase.core.db_connection import get_db
+from DataBase.repositories import SchedulesRepo
+
+from loguru import logger as schedule_logger
+
+schedule_router = APIRouter(
+    prefix='/schedule',
+    tags=['schedule']
+)
+
+
+def schedule_not_found():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail='Schedule not found'
+    )
+
+
+@schedule_router.post('/create/schedule')
+async def create_schedule_api(schedule: pd_md.ScheduleCreate, db: Session = Depends(get_db)):
+    """
+    Api router what schedules a state change of a device: once at a moment or after a delay, or every day at a time
+    """
+    try:
+        schedule_logger.info(f'Request to create a new schedule: user_id={schedule.user_id}, device_id={schedule.device_id}')
+        run_at = schedule.run_at
+        if schedule.kind == 'once' and run_at is None and schedule.delay is not None:
+            run_at = schedule.create_time + datetime.timedelta(seconds=schedule.delay)
+        if (schedule.kind == 'once' and run_at is None) or (schedule.kind == 'daily' and schedule.time_of_day is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="'once' schedule needs run_at or delay, 'daily' schedule needs time_of_day"
+            )
+        created_schedule = SchedulesRepo(db).create_schedule(
+            user_id=schedule.user_id,
+            device_id=schedule.device_id,
+            active=schedule.active,
+            kind=schedule.kind,
+            create_time=schedule.create_time,
+            run_at=run_at,
+            time_of_day=schedule.time_of_day
+        )
+        if created_schedule is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Device not found'
+            )
+        schedule_logger.info('New schedule created')
+        return pd_md.Schedule(**created_schedule.__dict__)
+    except HTTPException:
+        schedule_logger.error('Error creating schedule', exc_info=True)
+        raise
+    except Exception as e:
+        schedule_logger.error('An error occurred while creating the schedule', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@schedule_router.get('/get/user/schedules/{user_id}')
+async def get_user_schedules_api(user_id: int, db: Session = Depends(get_db)):
+    try:
+        schedule_logger.info(f'Request to get schedules of user: user_id={user_id}')
+        schedules = SchedulesRepo(db).get_user_schedules(user_id)
+        return [pd_md.Schedule(**schedule.__dict__) for schedule in schedules]
+    except Exception as e:
+        schedule_logger.error('Error getting schedules of user', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@schedule_router.get('/get/device/schedules/{device_id}')
+async def get_device_schedules_api(device_id: int, db: Session = Depends(get_db)):
+    try:
+        schedule_logger.info(f'Request to get schedules of device: device_id={device_id}')
+        schedules = SchedulesRepo(db).get_device_schedules(device_id)
+        return [pd_md.Schedule(**schedule.__dict__) for schedule in schedules]
+    except Exception as e:
+        schedule_logger.error('Error getting schedules of device', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@schedule_router.delete('/delete/schedule/{schedule_id}')
+async def delete_schedule_api(schedule_id: int, db: Session = Depends(get_db)):
+    try:
+        schedule_logger.info(f'Schedule delete request: schedule_id={schedule_id}')
+        schedule = SchedulesRepo(db).delete_schedule(schedule_id)
+        if schedule is None:
+            raise schedule_not_found()
+        return pd_md.Schedule(**schedule.__dict__)
+    except HTTPException:
+        schedule_logger.error('Error deleting schedule', exc_info=True)
+        raise
+    except Exception as e:
+        schedule_logger.error('Error deleting schedule', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, status, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+
+from . import pydantic_models as pd_md
+from DataBase.core.db_connection import get_db
+from DataBase.repositories import StatsRepo
+
+from loguru import logger as stats_logger
+
+stats_router = APIRouter(
+    prefix='/stats',
+    tags=['stats']
+)
+
+
+@stats_router.get('/get/stats', response_model=pd_md.Stats)
+async def get_stats_api(days: int = Query(30, gt=0, le=366), db: Session = Depends(get_db)):
+    """
+    Api router what returns the totals of users and devices and the signups of the last days.
+    Served from counters kept up to date by every write, so a dashboard view never scans the tables
+    """
+    try:
+        stats_logger.info(f'Request to get statistics: days={days}')
+        return StatsRepo(db).get_stats(days)
+    except Exception as e:
+        stats_logger.error('Error getting statistics', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
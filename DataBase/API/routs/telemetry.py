@@ -0,0 +1,100 @@
+import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, status, HTTPException, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from . import pydantic_models as pd_md
+from configurations import main_config
+from DataBase.core.db_connection import get_db
+from DataBase.models import READING_METRICS
+from DataBase.repositories import TelemetryRepo
+from DataBase.telemetry import telemetry_buffer, TelemetryOverloaded, BINARY_CONTENT_TYPE, decode_binary, local_naive
+
+from loguru import logger as telemetry_logger
+
+telemetry_router = APIRouter(
+    prefix='/telemetry',
+    tags=['telemetry']
+)
+
+READINGS = TypeAdapter(list[pd_md.Reading])
+
+
+def parse_readings(body: bytes, content_type: str) -> list[tuple]:
+    """
+    Func what turns a request body into buffer rows
+    :param body: Raw request body
+    :param content_type: Content-Type header of the request
+    :return: List of (device_id, measured_at, metric, value) rows
+    """
+    if content_type.startswith(BINARY_CONTENT_TYPE):
+        try:
+            return decode_binary(body)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    try:
+        readings = READINGS.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    now = datetime.datetime.now()
+    return [
+        (
+            reading.device_id,
+            local_naive(reading.measured_at) if reading.measured_at is not None else now,
+            READING_METRICS[reading.metric],
+            reading.value
+        )
+        for reading in readings
+    ]
+
+
+@telemetry_router.post('/ingest', status_code=status.HTTP_202_ACCEPTED, response_model=pd_md.IngestResult)
+async def ingest_telemetry_api(request: Request):
+    """
+    Api router what accepts a batch of readings: a JSON array of Reading objects
+    or binary records (Content-Type: application/octet-stream, see DataBase/telemetry/codec.py).
+    Readings are buffered and written in bulk, so 202 means accepted, not yet stored.
+    When the buffer stays full the request gets 503 with Retry-After
+    """
+    rows = parse_readings(await request.body(), request.headers.get('content-type', ''))
+    if len(rows) > main_config.telemetry.max_batch:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Batch of {len(rows)} readings exceeds the limit of {main_config.telemetry.max_batch}'
+        )
+    try:
+        await telemetry_buffer.put(rows, main_config.telemetry.enqueue_timeout)
+    except TelemetryOverloaded as e:
+        telemetry_logger.warning(f'Telemetry batch of {len(rows)} readings rejected: {e}')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={'Retry-After': str(main_config.admission.retry_after)}
+        )
+    return {'accepted': len(rows)}
+
+
+@telemetry_router.get('/device/{device_id}', response_model=list[pd_md.ReadingOut])
+async def get_device_readings_api(device_id: int, metric: Optional[Literal['power', 'temperature']] = None,
+                                  start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                                  limit: int = Query(1000, gt=0, le=10000), db: Session = Depends(get_db)):
+    """
+    Api router what returns written readings of the device, the last hour by default
+    """
+    try:
+        end = end or datetime.datetime.now()
+        start = start or end - datetime.timedelta(hours=1)
+        telemetry_logger.info(f'Request to get device readings: device_id={device_id}, metric={metric}, start={start}, end={end}')
+        return TelemetryRepo(db).get_readings(device_id, start, end, READING_METRICS.get(metric), limit)
+    except Exception as e:
+        telemetry_logger.error('Error getting device readings', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
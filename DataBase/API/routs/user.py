@@ -1,8 +1,11 @@
-from fastapi import APIRouter, status, HTTPException, Depends
+from typing import Literal, Optional
+
+from fastapi import APIRouter, status, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 
 from . import pydantic_models as pd_md 
 from DataBase.core.db_connection import get_db
+from DataBase.core.schema import is_schema_ready
 from DataBase.repositories import UserRepo
 from ..utils import FunctionsAPI as Func_API
 
@@ -85,6 +88,56 @@ async def get_all_user_api(db: Session = Depends(get_db)):
             detail=str(e)
         )
 
+@user_router.get('/get/users', response_model=pd_md.UsersPage)
+async def get_users_page_api(limit: int = Query(50, gt=0, le=500),
+                             sort: Literal['create_time', 'device_counter'] = 'create_time',
+                             order: Literal['asc', 'desc'] = 'desc',
+                             active: Optional[bool] = None,
+                             tag: Optional[str] = Query(None, max_length=100),
+                             after: Optional[str] = None,
+                             before: Optional[str] = None,
+                             db: Session = Depends(get_db)):
+    """
+    Api router what returns one page of users, sorted and filtered in SQL.
+    Pages are linked by opaque cursors: pass next_cursor as `after` or prev_cursor as `before`
+    """
+    try:
+        user_logger.info(f'Request to get a page of users: sort={sort} {order}, active={active}, tag={tag}')
+        if after and before:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Only one of after and before can be set'
+            )
+        try:
+            after_key = Func_API.decode_user_cursor(after, sort) if after else None
+            before_key = Func_API.decode_user_cursor(before, sort) if before else None
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+        repo = UserRepo(db)
+        users, has_more = repo.get_users_page(limit, sort, order == 'desc', active, tag, after_key, before_key)
+        # Reading forward there is a previous page whenever we came from one, reading backward the same for the next
+        has_next = has_more if before_key is None else True
+        has_prev = has_more if before_key is not None else after_key is not None
+        return pd_md.UsersPage(
+            items=Func_API.convert_list_users(users),
+            total=repo.count_users(active, tag),
+            next_cursor=Func_API.encode_user_cursor(users[-1], sort) if users and has_next else None,
+            prev_cursor=Func_API.encode_user_cursor(users[0], sort) if users and has_prev else None
+        )
+    except HTTPException:
+        user_logger.error('Error getting a page of users', exc_info=True)
+        raise
+    except Exception as e:
+        user_logger.error('Error getting a page of users', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @user_router.put('/update/user/{user_id}')
 async def update_user_api(user_id: int, user: pd_md.UserUpdate, db: Session = Depends(get_db)):
     try:
@@ -108,6 +161,24 @@ async def update_user_api(user_id: int, user: pd_md.UserUpdate, db: Session = De
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+@user_router.put('/update/users')
+async def update_users_api(users: pd_md.UsersActiveUpdate, db: Session = Depends(get_db)):
+    """
+    Api router what bans or unbans many users with one statement, returns only the users what changed
+    """
+    try:
+        user_logger.info(f'Bulk user update request: {len(users.user_ids)} users, active={users.active}')
+        changed_users = UserRepo(db).set_users_active(users.user_ids, users.active)
+        user_logger.info(f'{len(changed_users)} users updated')
+
+        return Func_API.convert_list_users(changed_users)
+    except Exception as e:
+        user_logger.error('Error updating users', exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
     
 @user_router.delete('/delete/user/{user_id}')
 async def delete_user_api(user_id: int, db: Session = Depends(get_db)):
@@ -145,3 +216,17 @@ async def healthcheck_api():
             detail=str(e)
         )
 
+
+@user_router.get('/ready',
+                 status_code=status.HTTP_200_OK)
+async def readiness_api():
+    """
+    Readiness probe: green only after the DataBase schema check has passed
+    """
+    if not is_schema_ready():
+        user_logger.warning('Readiness check: schema is not ready yet')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Schema is not ready'
+        )
+    return {'status': 'READY'}
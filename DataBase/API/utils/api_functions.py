@@ -1,3 +1,7 @@
+import base64
+import datetime
+import json
+
 from DataBase.models import Users, Devices
 from ..routs import pydantic_models as pd_md
 
@@ -28,4 +32,36 @@ class FunctionsAPI:
         for elem in lst:
             new_list.append(pd_md.Device(**elem.__dict__))
 
-        return new_list
\ No newline at end of file
+        return new_list
+
+    @staticmethod
+    def encode_user_cursor(user: Users, sort: str) -> str:
+        """
+        Func what makes an opaque cursor of the users page from the (sort value, id) key of a user
+        :param user: Users ORM model at the boundary of the page
+        :param sort: Sort column of the page
+        :return: URL-safe cursor string
+        """
+        value = getattr(user, sort)
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        return base64.urlsafe_b64encode(json.dumps([value, user.id]).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_user_cursor(cursor: str, sort: str) -> tuple:
+        """
+        Func what reads the (sort value, id) key back from a cursor of the users page
+        :param cursor: Cursor string made by encode_user_cursor
+        :param sort: Sort column of the page
+        :return: Tuple of the sort value and the id
+        :raises ValueError: If the cursor is malformed or belongs to another sort column
+        """
+        try:
+            value, user_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if sort == 'create_time':
+                value = datetime.datetime.fromisoformat(value)
+            elif not isinstance(value, int):
+                raise ValueError('Cursor value is not a number')
+            return value, int(user_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid cursor: {e}') from e
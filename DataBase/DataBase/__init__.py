@@ -1,3 +1,7 @@
 from . import models
 from . import core
-from . import repositories
\ No newline at end of file
+from . import repositories
+from . import events
+from . import telemetry
+from . import scheduler
+from . import rules
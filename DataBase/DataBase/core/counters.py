@@ -0,0 +1,117 @@
+import random
+
+from sqlalchemy import event, func, inspect, select, text
+from loguru import logger as counters_logger
+
+from DataBase.models import Users, Devices, stats_counters, daily_signups
+from .db_connection import SessionLocal
+from .upsert import increment
+
+# Rows of every counter, a writer adds to one of them picked at random
+STATS_SHARDS = 8
+COUNTERS = ('users', 'users_banned', 'devices', 'devices_on')
+
+# Counter of the model's rows and counter of the rows whose active flag equals the value
+TRACKED = {
+    Users: ('users', 'users_banned', False),
+    Devices: ('devices', 'devices_on', True),
+}
+
+
+def _flag(value, expected: bool) -> int:
+    return 1 if value is expected else 0
+
+
+def record_counts(session, deltas: dict[str, int]):
+    """
+    Adding changes of the counters to the current transaction, they are written on commit.
+    Used by bulk UPDATE ... RETURNING statements what bypass the flush
+    :param session: Session of the transaction
+    :param deltas: Amounts to add by counter name
+    """
+    pending = session.info.setdefault('stats_deltas', {})
+    for name, delta in deltas.items():
+        pending[name] = pending.get(name, 0) + delta
+
+
+@event.listens_for(SessionLocal, 'after_flush')
+def collect_counts(session, flush_context):
+    """
+    Turning the flushed users and devices into changes of the counters
+    """
+    deltas: dict[str, int] = {}
+    signups: dict = session.info.setdefault('stats_signups', {})
+    for objs, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            tracked = TRACKED.get(type(obj))
+            if tracked is None:
+                continue
+            total, flagged, expected = tracked
+            deltas[total] = deltas.get(total, 0) + sign
+            deltas[flagged] = deltas.get(flagged, 0) + sign * _flag(obj.active, expected)
+            if sign > 0 and isinstance(obj, Users):
+                day = obj.create_time.date()
+                signups[day] = signups.get(day, 0) + 1
+    for obj in session.dirty:
+        tracked = TRACKED.get(type(obj))
+        if tracked is None:
+            continue
+        history = inspect(obj).attrs.active.history
+        if not history.has_changes():
+            continue
+        _, flagged, expected = tracked
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        deltas[flagged] = deltas.get(flagged, 0) + _flag(new, expected) - _flag(old, expected)
+    record_counts(session, deltas)
+
+
+@event.listens_for(SessionLocal, 'before_commit')
+def write_counts(session):
+    """
+    Writing the changes of the counters at the very end of the transaction, so the counter rows stay locked only
+    for the commit itself. Rows are updated in a fixed order and two transactions never wait for each other in a cycle
+    """
+    if session.new or session.dirty or session.deleted:
+        # The flush of the commit runs after this hook, its changes must be counted too
+        session.flush()
+    deltas = session.info.pop('stats_deltas', None) or {}
+    signups = session.info.pop('stats_signups', None) or {}
+    shard = random.randrange(STATS_SHARDS)
+    for name in sorted(deltas):
+        if deltas[name]:
+            increment(session, stats_counters, {'name': name, 'shard': shard}, {'value': deltas[name]})
+    for day in sorted(signups):
+        increment(session, daily_signups, {'day': day}, {'users': signups[day]})
+
+
+@event.listens_for(SessionLocal, 'after_soft_rollback')
+def discard_counts(session, previous_transaction):
+    session.info.pop('stats_deltas', None)
+    session.info.pop('stats_signups', None)
+
+
+def rebuild_counters(connection):
+    """
+    Recounting the counters from the tables, run once when the counters table is created.
+    On Postgres the users and devices are locked against writes for the recount, so no concurrent change is lost
+    :param connection: Connection of the schema transaction
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(f'LOCK TABLE "{Users.__tablename__}", "{Devices.__tablename__}" IN SHARE MODE'))
+    # On SQLite the first write takes the DataBase lock, the counts below see every committed change
+    connection.execute(stats_counters.delete())
+    connection.execute(daily_signups.delete())
+    users, banned = connection.execute(
+        select(func.count(Users.id), func.count(Users.id).filter(Users.active.is_(False)))
+    ).one()
+    devices, devices_on = connection.execute(
+        select(func.count(Devices.device_id), func.count(Devices.device_id).filter(Devices.active.is_(True)))
+    ).one()
+    totals = {'users': users, 'users_banned': banned, 'devices': devices, 'devices_on': devices_on}
+    connection.execute(stats_counters.insert(), [{'name': name, 'shard': 0, 'value': totals[name]} for name in COUNTERS])
+    day = func.date(Users.create_time)
+    connection.execute(daily_signups.insert().from_select(
+        ['day', 'users'], select(day, func.count(Users.id)).group_by(day)
+    ))
+    counters_logger.info(f'Statistics counters rebuilt: {totals}')
@@ -1,20 +1,79 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
 from fastapi import HTTPException
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, text, Select
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.orm import declarative_base
 
 from configurations import main_config
 from loguru import logger as db_logger
-engine = create_engine(main_config.db.db_url, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from .engine_factory import make_engine
+from .replicas import init_replicas, pick_replica, replica_engines
+
+
+class RoutingSession(Session):
+    """
+    Session what sends plain reads to a read replica.
+    Writes, flushes and everything after the first write of the session (read-your-writes) go to the primary
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if replica_engines and not self._flushing and not self.info.get('use_primary') and isinstance(clause, Select):
+            replica = pick_replica()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def use_primary(db: Session):
+    """
+    Pinning the session to the primary, used by write methods before they read the row they change
+    """
+    db.info['use_primary'] = True
+
+
+# The engine is created lazily by init_engine() so that every server worker builds its own pool after fork
+engine = None
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 
-def create_tables():
+@event.listens_for(SessionLocal, 'after_flush')
+def stick_to_primary(session, flush_context):
+    """
+    After the first write the rest of the session reads from the primary
+    """
+    use_primary(session)
+
+# Monotonic deadline of the current API request, set by the admission control middleware
+request_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+@event.listens_for(SessionLocal, 'after_begin')
+def apply_statement_timeout(session, transaction, connection):
+    """
+    Limiting every statement of the transaction by the time left until the request deadline
+    """
+    deadline = request_deadline.get()
+    if deadline is None or connection.dialect.name != 'postgresql':
+        return
+    timeout_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+    connection.execute(text(f'SET LOCAL statement_timeout = {timeout_ms}'))
+
+
+def init_engine():
     """
-    Creating all tables in the DataBase
+    Creating the engine and connection pool of the current process
     """
-    Base.metadata.create_all(bind=engine)
+    global engine
+    if engine is None:
+        engine = make_engine(main_config.db.db_url, echo=main_config.db.echo)
+        SessionLocal.configure(bind=engine)
+        init_replicas()
+        db_logger.info(f'DataBase engine created: pool_size={main_config.db.pool_size}, max_overflow={main_config.db.max_overflow}')
+    return engine
 
 
 def get_db():
@@ -0,0 +1,50 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from configurations import main_config
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tuning every new SQLite connection: WAL journal, relaxed fsync and memory-mapped reads
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f'PRAGMA synchronous={main_config.db.sqlite_synchronous}')
+    cursor.execute(f'PRAGMA mmap_size={main_config.db.sqlite_mmap_size}')
+    cursor.execute(f'PRAGMA busy_timeout={main_config.db.sqlite_busy_timeout}')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+def make_engine(url: str, echo: bool = False):
+    """
+    Creating an engine for Postgres or SQLite with the pool settings from config
+    :param url: DataBase URL
+    :param echo: Log all SQL statements
+    :return: SQLAlchemy engine
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite':
+        pool_args = {'pool_size': main_config.db.pool_size, 'max_overflow': main_config.db.max_overflow}
+        if parsed.database in (None, '', ':memory:') or parsed.query.get('mode') == 'memory':
+            # An in-memory DataBase lives in its connection, every thread (the schema check runs in a worker one)
+            # has to share that single connection to see the same tables
+            pool_args = {'poolclass': StaticPool}
+        engine = create_engine(
+            url,
+            echo=echo,
+            connect_args={'check_same_thread': False},
+            **pool_args
+        )
+        event.listen(engine, 'connect', _apply_sqlite_pragmas)
+        return engine
+
+    return create_engine(
+        url,
+        echo=echo,
+        pool_size=main_config.db.pool_size,
+        max_overflow=main_config.db.max_overflow,
+        pool_pre_ping=True
+    )
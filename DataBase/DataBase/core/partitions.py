@@ -0,0 +1,52 @@
+import datetime
+
+from sqlalchemy import text
+from loguru import logger as partitions_logger
+
+from DataBase.models.history_model import device_state_history
+from DataBase.models.telemetry_model import device_readings
+
+# Append-only tables partitioned by month of their time column
+PARTITIONED_TABLES = (device_state_history, device_readings)
+
+
+def _month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def _next_month(day: datetime.date) -> datetime.date:
+    return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def ensure_partitions(connection, months_ahead: int):
+    """
+    Creating monthly partitions of every partitioned table from the current month on, plus a default partition
+    what catches rows outside of them. Does nothing outside Postgres
+    :param connection: Connection inside the schema transaction
+    :param months_ahead: Number of future months to prepare
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in PARTITIONED_TABLES:
+        _ensure_table_partitions(connection, table.name, months_ahead)
+
+
+def _ensure_table_partitions(connection, parent: str, months_ahead: int):
+    connection.execute(text(f'CREATE TABLE IF NOT EXISTS "{parent}_default" PARTITION OF "{parent}" DEFAULT'))
+    month = _month_start(datetime.date.today())
+    for _ in range(months_ahead + 1):
+        following = _next_month(month)
+        name = f'{parent}_{month:%Y_%m}'
+        # A partition can not be attached while the default partition holds rows of its range, one failure must not abort the rest
+        savepoint = connection.begin_nested()
+        try:
+            connection.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{parent}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            ))
+            savepoint.commit()
+        except Exception:
+            savepoint.rollback()
+            partitions_logger.error(f'Can not create partition {name}', exc_info=True)
+        month = following
+    partitions_logger.info(f'Partitions of {parent} are prepared up to {month.isoformat()}')
@@ -0,0 +1,84 @@
+import itertools
+import threading
+
+from sqlalchemy import text
+from prometheus_client import Counter, Gauge
+from loguru import logger as replica_logger
+
+from configurations import main_config
+from .engine_factory import make_engine
+
+REPLICA_LAG = Gauge('db_replica_lag_seconds', 'Replication lag of the read replica', ['replica'])
+REPLICA_FALLBACKS = Counter('db_replica_fallback_total', 'Reads sent to the primary because no replica was usable')
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+LAG_QUERY = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+replica_engines = []
+_healthy = []
+_lock = threading.Lock()
+_round_robin = itertools.count()
+
+
+def _replica_name(engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+def init_replicas():
+    """
+    Creating engines of the read replicas from config, all of them are considered healthy until the first check
+    """
+    global _healthy
+    if replica_engines or not main_config.db.replica_urls:
+        return replica_engines
+    for url in main_config.db.replica_urls:
+        replica_engines.append(make_engine(url))
+    _healthy = list(replica_engines)
+    replica_logger.info(f'Read replicas configured: {[_replica_name(e) for e in replica_engines]}')
+    return replica_engines
+
+
+def _replica_lag(engine) -> float:
+    with engine.connect() as connection:
+        if connection.dialect.name != 'postgresql':
+            connection.execute(text('SELECT 1'))
+            return 0.0
+        return float(connection.execute(LAG_QUERY).scalar() or 0)
+
+
+def check_replicas():
+    """
+    Measuring the lag of every replica; replicas what are unreachable or lag more than allowed stop receiving reads
+    """
+    global _healthy
+    healthy = []
+    for engine in replica_engines:
+        name = _replica_name(engine)
+        try:
+            lag = _replica_lag(engine)
+        except Exception:
+            replica_logger.error(f'Read replica {name} is unreachable', exc_info=True)
+            continue
+        REPLICA_LAG.labels(name).set(lag)
+        if lag <= main_config.db.replica_max_lag:
+            healthy.append(engine)
+        else:
+            replica_logger.warning(f'Read replica {name} lags {lag:.1f}s, reads go to the primary')
+    with _lock:
+        _healthy = healthy
+
+
+def pick_replica():
+    """
+    Choosing a healthy replica round-robin
+    :return: Replica engine or None if reads have to go to the primary
+    """
+    with _lock:
+        healthy = _healthy
+    if not healthy:
+        REPLICA_FALLBACKS.inc()
+        return None
+    return healthy[next(_round_robin) % len(healthy)]
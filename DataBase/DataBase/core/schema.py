@@ -0,0 +1,116 @@
+import fcntl
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from loguru import logger as schema_logger
+
+from configurations import main_config
+from DataBase.models import stats_counters
+from .counters import rebuild_counters
+from .db_connection import Base, init_engine
+from .partitions import ensure_partitions
+
+# Arbitrary application-wide key of the Postgres advisory lock guarding schema changes
+SCHEMA_LOCK_KEY = 7_262_028
+
+_schema_ready = False
+
+# GIN trigram indexes what let Postgres answer the device search (ILIKE '%text%') without a full scan
+SEARCH_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_devices_title_trgm ON "Devices" USING gin (title gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_devices_address_trgm ON "Devices" USING gin (address gin_trgm_ops)',
+)
+
+
+def is_schema_ready() -> bool:
+    return _schema_ready
+
+
+def _add_missing_columns(connection):
+    """
+    Adding columns declared in the models but missing in already existing tables
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}'))
+            schema_logger.info(f'Column {table.name}.{column.name} added')
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+
+def _ensure_search_indexes(connection):
+    """
+    Creating the trigram search indexes. Without the pg_trgm extension on the server the search still works,
+    only by a scan, so a missing extension is logged and does not fail the schema
+    """
+    try:
+        with connection.begin_nested():
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    except Exception as e:
+        schema_logger.warning(f'pg_trgm is not available, device search runs without indexes: {e.__class__.__name__}')
+        return
+    for ddl in SEARCH_INDEXES:
+        connection.execute(text(ddl))
+
+
+@contextmanager
+def _sqlite_file_lock(engine):
+    """
+    SQLite has no advisory locks, workers of one box serialize on a lock file next to the DataBase file
+    """
+    database = engine.url.database
+    if engine.dialect.name != 'sqlite' or not database or database == ':memory:':
+        yield
+        return
+    with open(f'{database}.schema.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ensure_schema():
+    """
+    Creating missing tables, columns and indexes, a new statistics counters table is filled from the existing rows.
+    On Postgres it runs under an advisory lock (on SQLite under a file lock), so only one worker changes the schema at a time
+    """
+    global _schema_ready
+    engine = init_engine()
+    with _sqlite_file_lock(engine), engine.begin() as connection:
+        is_postgres = connection.dialect.name == 'postgresql'
+        if is_postgres:
+            connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SCHEMA_LOCK_KEY})
+            schema_logger.info('Schema advisory lock acquired')
+        _add_missing_columns(connection)
+        counters_missing = not inspect(connection).has_table(stats_counters.name)
+        Base.metadata.create_all(bind=connection)
+        if counters_missing:
+            # Counters are kept by the write paths from now on, the rows written before are counted once
+            rebuild_counters(connection)
+        if is_postgres:
+            _ensure_search_indexes(connection)
+        ensure_partitions(connection, main_config.db.history_months_ahead)
+    _schema_ready = True
+    schema_logger.info('Schema is up to date')
+
+
+def maintain_partitions():
+    """
+    Creating partitions of the coming months, run periodically by the server
+    """
+    engine = init_engine()
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as connection:
+        connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SCHEMA_LOCK_KEY})
+        ensure_partitions(connection, main_config.db.history_months_ahead)
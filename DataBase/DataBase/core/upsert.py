@@ -0,0 +1,21 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def increment(db, table: Table, keys: dict, increments: dict):
+    """
+    Adding values to counter columns of a row, the row is created if it does not exist yet.
+    A single INSERT ... ON CONFLICT DO UPDATE statement, so concurrent writers never lose an increment
+    :param db: Session or connection what runs the statement (inside the caller's transaction)
+    :param table: Table with a primary key or unique constraint on the key columns
+    :param keys: Values of the key columns
+    :param increments: Amounts to add by column name
+    """
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    statement = insert(table).values(**keys, **increments)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: table.c[column] + statement.excluded[column] for column in increments}
+    )
+    db.execute(statement)
@@ -0,0 +1,38 @@
+import asyncio
+
+from loguru import logger as events_logger
+
+from configurations import main_config
+from DataBase.core import db_connection
+from . import capture
+from .bus import EventBus, Subscription, RESYNC_EVENT
+from .desired_state import DesiredStateWatch
+from .listener import PgNotifyListener
+
+event_bus = EventBus(main_config.events.buffer_size)
+desired_state = DesiredStateWatch()
+event_bus.add_handler(desired_state.handle)
+_listener: PgNotifyListener | None = None
+
+
+async def start_change_feed():
+    """
+    Starting the change feed of this worker: Postgres LISTEN/NOTIFY when the primary is Postgres
+    (works across all server workers), in-process pub/sub otherwise
+    """
+    global _listener
+    engine = db_connection.init_engine()
+    event_bus.bind(asyncio.get_running_loop())
+    channel = main_config.events.channel if engine.dialect.name == 'postgresql' else None
+    capture.install(event_bus, channel)
+    if channel:
+        _listener = PgNotifyListener(engine, channel, event_bus)
+        _listener.start()
+    events_logger.info(f'Change feed started in {"LISTEN/NOTIFY" if channel else "in-process"} mode')
+
+
+async def stop_change_feed():
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
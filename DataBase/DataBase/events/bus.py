@@ -0,0 +1,129 @@
+import asyncio
+from typing import Optional
+
+from loguru import logger as events_logger
+from prometheus_client import Counter, Gauge
+
+SUBSCRIBERS = Gauge('change_feed_subscribers', 'Clients subscribed to the change feed')
+PUBLISHED = Counter('change_feed_events_total', 'Change events received by this worker', ['entity', 'op'])
+DROPPED = Counter('change_feed_dropped_total', 'Change events dropped because a subscriber buffer was full')
+
+RESYNC_EVENT = {'type': 'resync'}
+
+
+class Subscription:
+    """
+    One client of the change feed with its filter and bounded buffer.
+    When the client does not keep up, the buffer is replaced by a single resync event,
+    so the client re-fetches the state instead of receiving a gap silently
+    """
+
+    def __init__(self, entities: Optional[set[str]], ids: Optional[set[int]], buffer_size: int):
+        self.entities = entities
+        self.ids = ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+
+    def matches(self, event: dict) -> bool:
+        if self.entities and event['entity'] not in self.entities:
+            return False
+        if self.ids and event['id'] not in self.ids:
+            return False
+        return True
+
+    def offer(self, event: dict):
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+            return
+        DROPPED.inc(self.queue.qsize())
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC_EVENT)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class EventBus:
+    """
+    In-process fan-out of change events to the subscribers of this worker.
+    Events come either straight from the session hooks (single process) or from the LISTEN/NOTIFY listener
+    """
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._subscribers: set[Subscription] = set()
+        self._handlers: list = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """
+        Remembering the loop of the worker, events published from other threads are handed over to it
+        :param loop: Event loop what serves the subscribers
+        """
+        self._loop = loop
+
+    def add_handler(self, handler):
+        """
+        Registering an in-process consumer what is called in the loop thread for every event, resync included
+        :param handler: Callable what receives the event dict
+        """
+        self._handlers.append(handler)
+
+    def _call_handlers(self, event: dict):
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception:
+                events_logger.error('Change feed handler failed', exc_info=True)
+
+    def subscribe(self, entities: Optional[set[str]] = None, ids: Optional[set[int]] = None) -> Subscription:
+        """
+        Creating a subscription
+        :param entities: Entities to receive ('device', 'user'), all if empty
+        :param ids: IDs of the entities to receive, all if empty
+        :return: Subscription with a bounded buffer
+        """
+        subscription = Subscription(entities, ids, self.buffer_size)
+        self._subscribers.add(subscription)
+        SUBSCRIBERS.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        SUBSCRIBERS.set(len(self._subscribers))
+
+    def dispatch(self, event: dict):
+        """
+        Delivering the event to matching subscribers, must be called in the loop thread
+        :param event: Change event
+        """
+        PUBLISHED.labels(event['entity'], event['op']).inc()
+        self._call_handlers(event)
+        for subscription in self._subscribers:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def resync(self):
+        """
+        Telling every subscriber that events may have been missed and the state has to be re-fetched
+        """
+        self._call_handlers(RESYNC_EVENT)
+        for subscription in self._subscribers:
+            subscription.offer(RESYNC_EVENT)
+
+    def publish(self, event: dict):
+        """
+        Thread-safe entry point for events of the current process
+        :param event: Change event
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self.dispatch, event)
@@ -0,0 +1,129 @@
+import datetime
+import json
+
+from sqlalchemy import event, inspect, text
+from loguru import logger as events_logger
+
+from DataBase.core.db_connection import SessionLocal
+from DataBase.models import Devices, Users, Schedules, Rules
+from .bus import EventBus
+
+# Entity name and public ID column of every model what is published in the feed
+ENTITIES = {
+    Devices: ('device', 'device_id'),
+    Users: ('user', 'user_id'),
+    # Keep the in-memory timers and rule indexes of all workers current
+    Schedules: ('schedule', 'schedule_id'),
+    Rules: ('rule', 'rule_id'),
+}
+# pg_notify payloads are limited to 8000 bytes, larger events are sent without the row
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+_bus: EventBus | None = None
+_channel: str | None = None
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_event(change: dict) -> str:
+    return json.dumps(change, default=_json_default)
+
+
+def _make_event(obj, op: str, changes: list[str] | None = None) -> dict | None:
+    entity = ENTITIES.get(type(obj))
+    if entity is None:
+        return None
+    name, id_column = entity
+    state = inspect(obj)
+    if changes is None:
+        changes = [attr.key for attr in state.attrs if attr.history.has_changes()] if op == 'update' else []
+    if op == 'update' and not changes:
+        return None
+    return {
+        'type': 'change',
+        'entity': name,
+        'op': op,
+        'id': getattr(obj, id_column),
+        'changes': changes,
+        'data': {column.key: getattr(obj, column.key) for column in state.mapper.column_attrs},
+        'ts': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def install(bus: EventBus, channel: str | None):
+    """
+    Hooking the sessions so every committed write of devices, users, schedules and rules becomes a change event.
+    With a channel the events are sent through Postgres NOTIFY inside the writing transaction,
+    otherwise they are published to the in-process bus after commit
+    :param bus: Bus of the current process
+    :param channel: NOTIFY channel or None for in-process delivery
+    """
+    global _bus, _channel
+    _bus, _channel = bus, channel
+    if not event.contains(SessionLocal, 'after_flush', collect_changes):
+        event.listen(SessionLocal, 'after_flush', collect_changes)
+        event.listen(SessionLocal, 'after_commit', publish_changes)
+        event.listen(SessionLocal, 'after_soft_rollback', discard_changes)
+
+
+def collect_changes(session, flush_context):
+    if _bus is None:
+        return
+    changes = [
+        *(_make_event(obj, 'create') for obj in session.new),
+        *(_make_event(obj, 'update') for obj in session.dirty),
+        *(_make_event(obj, 'delete') for obj in session.deleted),
+    ]
+    _send(session, [change for change in changes if change is not None])
+
+
+def record_bulk_update(session, objs, changes: list[str]):
+    """
+    Reporting rows changed by an ORM bulk UPDATE ... RETURNING, such statements bypass the flush
+    and are not seen by collect_changes. Delivered on commit like the flushed changes
+    :param session: Session what ran the statement
+    :param objs: ORM objects returned by the statement
+    :param changes: Names of the changed columns
+    """
+    if _bus is None:
+        return
+    _send(session, [change for change in (_make_event(obj, 'update', changes) for obj in objs) if change is not None])
+
+
+def _send(session, changes: list[dict]):
+    if not changes:
+        return
+    connection = session.connection()
+    if _channel and connection.dialect.name == 'postgresql':
+        # Delivered by Postgres to every worker only if the transaction commits
+        payloads = []
+        for change in changes:
+            payload = encode_event(change)
+            if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+                payload = encode_event({**change, 'data': None})
+            payloads.append(payload)
+        # One round trip for all events of the flush, bulk updates may change hundreds of rows
+        connection.execute(
+            text('SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload'),
+            {'channel': _channel, 'payloads': payloads}
+        )
+        return
+    session.info.setdefault('change_events', []).extend(changes)
+
+
+def publish_changes(session):
+    changes = session.info.pop('change_events', None)
+    if not changes or _bus is None:
+        return
+    for change in changes:
+        # Same JSON round trip as the NOTIFY path, so subscribers see identical events in both modes
+        _bus.publish(json.loads(encode_event(change)))
+    events_logger.debug(f'Published {len(changes)} change events')
+
+
+def discard_changes(session, previous_transaction):
+    session.info.pop('change_events', None)
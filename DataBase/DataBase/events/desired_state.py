@@ -0,0 +1,93 @@
+import asyncio
+
+from prometheus_client import Counter, Gauge
+
+LONGPOLL_WAITERS = Gauge('device_longpoll_waiters', 'Device long-poll requests parked on this worker')
+LONGPOLL_CACHE_MISSES = Counter('device_longpoll_cache_misses_total', 'Long-poll requests what had to read the device from the DataBase')
+
+
+class DesiredStateWatch:
+    """
+    Last known desired state of every device polled on this worker, kept current by the change feed.
+    Parked long-poll requests wait on futures what are resolved by the next event of their device,
+    so waiting devices cost no DataBase queries
+    """
+
+    def __init__(self):
+        self._states: dict[int, dict] = {}
+        self._waiters: dict[int, set[asyncio.Future]] = {}
+
+    def get(self, device_id: int, loader) -> dict | None:
+        """
+        Getting the cached state, the DataBase is read only when the device is not cached yet
+        :param device_id: ID of the device
+        :param loader: Callable what reads the device row (device_id, active, version) or returns None
+        :return: State or None if the device does not exist
+        """
+        state = self._states.get(device_id)
+        if state is not None:
+            return state
+        LONGPOLL_CACHE_MISSES.inc()
+        data = loader(device_id)
+        return self.remember(data) if data is not None else None
+
+    def remember(self, data: dict) -> dict:
+        """
+        Caching the state of a device, an older version never replaces a newer one
+        :param data: Device row (device_id, active, version)
+        :return: Cached state
+        """
+        state = {'device_id': data['device_id'], 'active': data['active'], 'version': data['version']}
+        known = self._states.get(state['device_id'])
+        if known is not None and known['version'] > state['version']:
+            return known
+        self._states[state['device_id']] = state
+        return state
+
+    def handle(self, event: dict):
+        """
+        Change feed handler
+        :param event: Change event
+        """
+        if event.get('type') == 'resync':
+            # Events may have been missed: forget everything, parked requests re-read their device
+            self._states.clear()
+            for device_id in list(self._waiters):
+                self._wake(device_id)
+            return
+        if event['entity'] != 'device':
+            return
+        data = event.get('data')
+        if event['op'] == 'delete' or data is None:
+            self._states.pop(event['id'], None)
+        else:
+            self.remember(data)
+        self._wake(event['id'])
+
+    def _wake(self, device_id: int):
+        for waiter in self._waiters.pop(device_id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait(self, device_id: int, timeout: float) -> bool:
+        """
+        Parking until the next event of the device
+        :param device_id: ID of the device
+        :param timeout: Maximum wait in seconds
+        :return: False if the timeout passed without events
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(device_id, set()).add(waiter)
+        LONGPOLL_WAITERS.inc()
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            LONGPOLL_WAITERS.dec()
+            waiters = self._waiters.get(device_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[device_id]
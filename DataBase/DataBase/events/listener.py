@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from loguru import logger as events_logger
+
+from .bus import EventBus
+
+
+class PgNotifyListener:
+    """
+    Dedicated Postgres connection what LISTENs to the change channel and feeds the bus of this worker.
+    The connection is watched by the event loop (add_reader), so waiting for events costs no thread
+    """
+
+    def __init__(self, engine, channel: str, bus: EventBus):
+        self.engine = engine
+        self.channel = channel
+        self.bus = bus
+        self._connection = None
+        self._fd: int | None = None
+        self._task: asyncio.Task | None = None
+        self._lost: asyncio.Event = asyncio.Event()
+
+    def _connect(self):
+        dialect = self.engine.dialect
+        args, params = dialect.create_connect_args(self.engine.url)
+        connection = dialect.connect(*args, **params)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _on_readable(self):
+        try:
+            self._connection.poll()
+        except Exception:
+            events_logger.error('Change feed listener connection lost', exc_info=True)
+            self._lost.set()
+            return
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            try:
+                self.bus.dispatch(json.loads(notify.payload))
+            except Exception:
+                events_logger.error(f'Bad change feed payload: {notify.payload!r}', exc_info=True)
+
+    def _close_connection(self):
+        if self._connection is None:
+            return
+        # fileno() raises on a connection the server already closed, so the descriptor is kept from connect
+        asyncio.get_running_loop().remove_reader(self._fd)
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        delay = 1
+        connected_before = False
+        while True:
+            try:
+                self._connection = await asyncio.to_thread(self._connect)
+                self._lost.clear()
+                self._fd = self._connection.fileno()
+                loop.add_reader(self._fd, self._on_readable)
+                events_logger.info(f'Listening to change feed channel "{self.channel}"')
+                if connected_before:
+                    # State read while the listener was down may already be stale
+                    self.bus.resync()
+                connected_before = True
+                delay = 1
+                await self._lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                events_logger.error(f'Change feed listener failed, reconnecting in {delay}s', exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                self._close_connection()
+            # Events sent while the listener was down are lost, subscribers have to re-fetch
+            self.bus.resync()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
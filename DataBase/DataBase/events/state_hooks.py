@@ -0,0 +1,25 @@
+from loguru import logger as events_logger
+
+_listeners: list = []
+
+
+def add_state_listener(listener):
+    """
+    Registering a consumer of committed desired state changes
+    :param listener: Callable what receives a list of (device_id, active), must be thread-safe
+    """
+    _listeners.append(listener)
+
+
+def notify_state_changes(changes: list[tuple[int, bool]]):
+    """
+    Telling the listeners about desired state changes what have just been committed by this process
+    :param changes: List of (device_id, new desired state)
+    """
+    if not changes:
+        return
+    for listener in _listeners:
+        try:
+            listener(changes)
+        except Exception:
+            events_logger.error('State change listener failed', exc_info=True)
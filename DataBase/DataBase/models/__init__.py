@@ -1,2 +1,8 @@
 from .users_model import Users
 from .devices_model import Devices
+from .groups_model import DeviceGroups, Scenes
+from .schedules_model import Schedules, SCHEDULE_KINDS
+from .rules_model import Rules
+from .history_model import device_state_history, device_daily_uptime
+from .telemetry_model import device_readings, READING_METRICS, READING_METRIC_NAMES
+from .stats_model import stats_counters, daily_signups
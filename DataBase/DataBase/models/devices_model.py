@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Index, false, text
 from loguru import logger as devices_logger
 from DataBase.core.db_connection import Base
 
@@ -10,11 +10,29 @@ class Devices(Base):
     title = Column(String)
     description = Column(String)
     address = Column(String, unique=False, nullable=False)
+    # Desired state, what the user asked for
     active = Column(Boolean, default=False)
     create_time = Column(DateTime, unique=False, nullable=False)
+    # Version of the desired state, bumped by every update; firmware long-polls on it
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    desired_at = Column(DateTime, nullable=True)
+    # Reported state, what the device or its controller confirmed
+    reported_active = Column(Boolean, nullable=True)
+    reported_version = Column(Integer, nullable=True)
+    reported_at = Column(DateTime, nullable=True)
+    # Desired and reported state differ, maintained by DevicesRepo on every write of either side
+    diverged = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        # Partial index: converged devices are not in it, so the reconciler scan costs nothing for them
+        Index('ix_devices_diverged_desired_at', 'desired_at', postgresql_where=text('diverged'), sqlite_where=text('diverged = 1')),
+        # Trigram indexes of the AdminPanel search are created by core/schema.py, they need the pg_trgm extension
+    )
+    # The bumped version is read back with RETURNING in the same UPDATE
+    __mapper_args__ = {'eager_defaults': True}
 
     def __repr__(self):
         try:
-            return f'Devices(device_id={self.device_id}, title={self.title}, description={self.description}, address={self.address}, active={self.active}, create_time={self.create_time})'
+            return f'Devices(device_id={self.device_id}, title={self.title}, description={self.description}, address={self.address}, active={self.active}, create_time={self.create_time}, version={self.version}, reported_active={self.reported_active}, diverged={self.diverged})'
         except Exception as e:
             devices_logger.error(f'Error from returning of string format Devices model', exc_info=True)
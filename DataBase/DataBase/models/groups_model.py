@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, ARRAY, JSON
+from loguru import logger as groups_logger
+from DataBase.core.db_connection import Base
+
+
+class DeviceGroups(Base):
+    __tablename__ = 'DeviceGroups'
+
+    group_id = Column(Integer, autoincrement=True, primary_key=True)
+    # Telegram user_id of the owner, members are always a subset of the owner's devices
+    user_id = Column(Integer, nullable=False, index=True)
+    title = Column(String, nullable=False)
+    # Native integer array on Postgres, JSON list on SQLite
+    devices = Column(ARRAY(Integer).with_variant(JSON(), 'sqlite'), nullable=False, default=list())
+    create_time = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        try:
+            return f'DeviceGroups(group_id={self.group_id}, user_id={self.user_id}, title={self.title}, devices={self.devices})'
+        except Exception as e:
+            groups_logger.error(f'Error from returning of string format DeviceGroups model', exc_info=True)
+
+
+class Scenes(Base):
+    __tablename__ = 'Scenes'
+
+    scene_id = Column(Integer, autoincrement=True, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    title = Column(String, nullable=False)
+    # Desired state per device: {"<device_id>": true/false}
+    states = Column(JSON, nullable=False, default=dict)
+    create_time = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        try:
+            return f'Scenes(scene_id={self.scene_id}, user_id={self.user_id}, title={self.title}, states={self.states})'
+        except Exception as e:
+            groups_logger.error(f'Error from returning of string format Scenes model', exc_info=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Table, Column, Integer, Boolean, DateTime, Date, Index
+from DataBase.core.db_connection import Base
+
+# Append-only log of desired state changes: narrow rows without a surrogate key.
+# On Postgres the table is range-partitioned by month of changed_at (see DataBase/core/partitions.py)
+device_state_history = Table(
+    'DeviceStateHistory', Base.metadata,
+    Column('device_id', Integer, nullable=False),
+    Column('changed_at', DateTime, nullable=False),
+    Column('active', Boolean, nullable=False),
+    Index('ix_device_state_history_device_changed', 'device_id', 'changed_at'),
+    postgresql_partition_by='RANGE (changed_at)',
+)
+
+# Seconds every device spent turned on per day, for closed on-intervals only
+device_daily_uptime = Table(
+    'DeviceDailyUptime', Base.metadata,
+    Column('device_id', Integer, primary_key=True),
+    Column('day', Date, primary_key=True),
+    Column('on_seconds', Integer, nullable=False, default=0),
+)
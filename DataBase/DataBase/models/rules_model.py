@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Boolean, DateTime, true
+from loguru import logger as rules_logger
+from DataBase.core.db_connection import Base
+
+
+class Rules(Base):
+    __tablename__ = 'Rules'
+
+    rule_id = Column(Integer, autoincrement=True, primary_key=True)
+    # Telegram user_id of the owner, both devices are the owner's devices
+    user_id = Column(Integer, nullable=False, index=True)
+    # When the trigger device turns to trigger_active...
+    trigger_device_id = Column(Integer, nullable=False, index=True)
+    trigger_active = Column(Boolean, nullable=False)
+    # ...the action device is set to action_active
+    action_device_id = Column(Integer, nullable=False, index=True)
+    action_active = Column(Boolean, nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True, server_default=true())
+    create_time = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        try:
+            return f'Rules(rule_id={self.rule_id}, user_id={self.user_id}, trigger=({self.trigger_device_id}, {self.trigger_active}), action=({self.action_device_id}, {self.action_active}), enabled={self.enabled})'
+        except Exception as e:
+            rules_logger.error(f'Error from returning of string format Rules model', exc_info=True)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Time
+from loguru import logger as schedules_logger
+from DataBase.core.db_connection import Base
+
+SCHEDULE_KINDS = ('once', 'daily')
+
+
+class Schedules(Base):
+    __tablename__ = 'Schedules'
+
+    schedule_id = Column(Integer, autoincrement=True, primary_key=True)
+    # Telegram user_id of the owner, the device is one of the owner's devices
+    user_id = Column(Integer, nullable=False, index=True)
+    device_id = Column(Integer, nullable=False, index=True)
+    # Desired state what is set when the schedule fires
+    active = Column(Boolean, nullable=False)
+    # 'once' fires at next_run and is deleted, 'daily' fires every day at time_of_day
+    kind = Column(String, nullable=False)
+    time_of_day = Column(Time, nullable=True)
+    # Next due moment, the scheduler claims rows through this index
+    next_run = Column(DateTime, nullable=False, index=True)
+    last_run = Column(DateTime, nullable=True)
+    create_time = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        try:
+            return f'Schedules(schedule_id={self.schedule_id}, user_id={self.user_id}, device_id={self.device_id}, active={self.active}, kind={self.kind}, time_of_day={self.time_of_day}, next_run={self.next_run})'
+        except Exception as e:
+            schedules_logger.error(f'Error from returning of string format Schedules model', exc_info=True)
@@ -0,0 +1,18 @@
+from sqlalchemy import Table, Column, Integer, BigInteger, String, Date
+from DataBase.core.db_connection import Base
+
+# Totals of the AdminPanel dashboard, kept by the write paths (see DataBase/core/counters.py).
+# Every counter is split into shards, concurrent writers usually add to different rows and do not queue on one row lock
+stats_counters = Table(
+    'StatsCounters', Base.metadata,
+    Column('name', String(32), primary_key=True),
+    Column('shard', Integer, primary_key=True),
+    Column('value', BigInteger, nullable=False, default=0),
+)
+
+# Users registered per day
+daily_signups = Table(
+    'DailySignups', Base.metadata,
+    Column('day', Date, primary_key=True),
+    Column('users', Integer, nullable=False, default=0),
+)
@@ -0,0 +1,18 @@
+from sqlalchemy import Table, Column, Integer, SmallInteger, Float, DateTime, Index
+from DataBase.core.db_connection import Base
+
+# Codes of the reported metrics, stored as SMALLINT to keep the rows narrow
+READING_METRICS = {'power': 1, 'temperature': 2}
+READING_METRIC_NAMES = {code: name for name, code in READING_METRICS.items()}
+
+# Device readings, written in bulk by the telemetry buffer (see DataBase/telemetry).
+# On Postgres the table is range-partitioned by month of measured_at (see DataBase/core/partitions.py)
+device_readings = Table(
+    'DeviceReadings', Base.metadata,
+    Column('device_id', Integer, nullable=False),
+    Column('measured_at', DateTime, nullable=False),
+    Column('metric', SmallInteger, nullable=False),
+    Column('value', Float, nullable=False),
+    Index('ix_device_readings_device_measured', 'device_id', 'measured_at'),
+    postgresql_partition_by='RANGE (measured_at)',
+)
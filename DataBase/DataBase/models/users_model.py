@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ARRAY, JSON, Index, func
 from loguru import logger as user_model_logger
 from DataBase.core.db_connection import Base
 
@@ -8,13 +8,26 @@ class Users(Base):
     id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
     user_id = Column(Integer, unique=True, nullable=False)
     tag = Column(String, unique=False, nullable=True)
-    devices = Column(ARRAY(Integer), unique=False, nullable=True, default=list())
+    # Native integer array on Postgres, JSON list on SQLite
+    devices = Column(ARRAY(Integer).with_variant(JSON(), 'sqlite'), unique=False, nullable=True, default=list())
     device_counter = Column(Integer, default=0)
     active = Column(Boolean, default=True)
     create_time = Column(DateTime, unique=False, nullable=False)
+    __table_args__ = (
+        # Keyset pages of the AdminPanel: every sort order with and without the ban filter is an index range scan,
+        # id breaks ties so the pages never skip or repeat users
+        Index('ix_users_create_time', 'create_time', 'id'),
+        Index('ix_users_device_counter', 'device_counter', 'id'),
+        Index('ix_users_active_create_time', 'active', 'create_time', 'id'),
+        Index('ix_users_active_device_counter', 'active', 'device_counter', 'id'),
+    )
 
     def __repr__(self):
         try:
             return f'Users(id={self.id}, user_id={self.user_id}, tag={self.tag}, devices={self.devices}, device_counter={self.device_counter}, create_time={self.create_time}, active={self.active})'
         except Exception as e:
             user_model_logger.error(f'Error from returning of string format User model', exc_info=True)
+
+
+# Case-insensitive tag prefix search, text_pattern_ops lets Postgres use the index for LIKE 'prefix%'
+Index('ix_users_tag_lower', func.lower(Users.tag).label('tag_lower'), postgresql_ops={'tag_lower': 'text_pattern_ops'})
@@ -1,2 +1,9 @@
 from .users_repo import *
-from .devices_repo import *
\ No newline at end of file
+from .devices_repo import *
+from .history_repo import *
+from .telemetry_repo import *
+from .groups_repo import *
+from .scenes_repo import *
+from .schedules_repo import *
+from .rules_repo import *
+from .stats_repo import *
@@ -1,10 +1,16 @@
 from typing import Optional, Type
 import datetime
 
+from sqlalchemy import and_, func, inspect, or_, update
 from sqlalchemy.orm import Session
 from loguru import logger as devices_logger
 
-from DataBase.models import Devices
+from DataBase.core.counters import record_counts
+from DataBase.core.db_connection import use_primary
+from DataBase.events.capture import record_bulk_update
+from DataBase.events.state_hooks import notify_state_changes
+from DataBase.models import Devices, Schedules, Rules, Users
+from .history_repo import HistoryRepo
 
 
 class DevicesRepo:
@@ -15,6 +21,8 @@ class DevicesRepo:
         try:
             device = Devices(title=title, description=description, address=address, create_time=create_time)
             self.db.add(device)
+            self.db.flush()
+            HistoryRepo(self.db).record_change(device.device_id, bool(device.active), create_time)
             self.db.commit()
             self.db.refresh(device)
             devices_logger.info(f'Successful creation of a device [{repr(device)}] in the database')
@@ -24,9 +32,53 @@ class DevicesRepo:
             devices_logger.error('Error when creating a new device in the database', exc_info=True)
             raise
 
-    def get_device_by_id(self, device_id: int) -> Optional[Devices] | None:
+    def create_devices(self, user_id: int, devices: list[dict], create_time: datetime.datetime) -> Optional[list[Devices]]:
+        """
+        Func what creates many devices of one user in a single transaction: one multi-row INSERT of the devices,
+        their first history records and one update of the user's device list. Either every device is created or none
+        :param user_id: Telegram user_id of the owner
+        :param devices: List of dicts with title, description and address
+        :param create_time: Time of creation
+        :return: List of created Devices ORM models in the order of the input or None if the user does not exist
+        """
+        use_primary(self.db)
         try:
-            device = self.db.query(Devices).filter(Devices.device_id == device_id).first()
+            # Locked, concurrent imports of one user would otherwise overwrite each other's device list
+            user = self.db.query(Users).filter(Users.user_id == user_id).with_for_update().first()
+            if user is None:
+                return None
+            created = [
+                Devices(title=device['title'], description=device['description'], address=device['address'],
+                        create_time=create_time)
+                for device in devices
+            ]
+            self.db.add_all(created)
+            self.db.flush()
+            HistoryRepo(self.db).record_changes([(device.device_id, bool(device.active)) for device in created], create_time)
+            # A new list, in-place changes of the array column are not tracked
+            user.devices = [*(user.devices or []), *(device.device_id for device in created)]
+            user.device_counter = (user.device_counter or 0) + len(created)
+            device_ids = [device.device_id for device in created]
+            self.db.commit()
+            # Commit expires the rows, one query reloads all of them instead of a refresh per device
+            created = self.get_devices_by_ids(device_ids)
+            devices_logger.info(f'Successful creation of {len(created)} devices of user [{user_id}] in the database')
+            return created
+        except Exception:
+            self.db.rollback()
+            devices_logger.error(f'Error when creating devices of user [{user_id}] in the database', exc_info=True)
+            raise
+
+    def get_device_by_id(self, device_id: int, for_update: bool = False) -> Optional[Devices] | None:
+        """
+        Func what finds a device by its ID
+        :param device_id: ID of the device
+        :param for_update: Lock the row until the end of the transaction, for writes what depend on its current state
+        :return: Device ORM model or None
+        """
+        try:
+            query = self.db.query(Devices).filter(Devices.device_id == device_id)
+            device = (query.with_for_update() if for_update else query).first()
             devices_logger.info(f'Successfully retrieving the device [{repr(device)}] from the database')
             return device
         except Exception:
@@ -43,25 +95,253 @@ class DevicesRepo:
             raise
 
     def update_device(self, device_id: int, **new_values) -> Optional[Devices]:
-        device = self.get_device_by_id(device_id)
+        use_primary(self.db)
+        # Concurrent updates of the device wait here, each one sees the state left by the previous one
+        device = self.get_device_by_id(device_id, for_update=True)
+        toggled = False
         try:
             if device:
                 for key, value in new_values.items():
                     if hasattr(device, key) and value is not None:
                         setattr(device, key, value)
+                if self.db.is_modified(device):
+                    now = datetime.datetime.now()
+                    toggled = inspect(device).attrs.active.history.has_changes()
+                    # Incremented in SQL, so concurrent updates never produce the same version
+                    device.version = Devices.version + 1
+                    device.desired_at = now
+                    # A device what never reported has nothing to diverge from, its controller may not report at all
+                    device.diverged = device.reported_active is not None and device.active != device.reported_active
+                    if toggled:
+                        # The UPDATE takes the row lock first, so concurrent toggles of one device are logged in order
+                        self.db.flush()
+                        HistoryRepo(self.db).record_change(device_id, device.active, now)
                 self.db.commit()
                 self.db.refresh(device)
                 devices_logger.info(f'Successfully updated device [{repr(device)}] in DataBase')
+                if toggled:
+                    notify_state_changes([(device_id, device.active)])
             return device
         except Exception:
             self.db.rollback()
             devices_logger.error(f'Error when updating device [{device_id}] in DataBase', exc_info=True)
             raise
 
-    def delete_device(self, device_id: int) -> Optional[Devices]:
+    def _filter_devices(self, query, search: Optional[str], active: Optional[bool], owner_id: Optional[int]):
+        if search:
+            query = query.filter(or_(
+                Devices.title.icontains(search, autoescape=True),
+                Devices.address.icontains(search, autoescape=True)
+            ))
+        if active is not None:
+            query = query.filter(Devices.active.is_(active))
+        if owner_id is not None:
+            owned = self.db.query(Users.devices).filter(Users.user_id == owner_id).scalar()
+            query = query.filter(Devices.device_id.in_(list(owned or ())))
+        return query
+
+    def get_devices_page(self, limit: int, search: Optional[str] = None, active: Optional[bool] = None,
+                         owner_id: Optional[int] = None, after: Optional[int] = None,
+                         before: Optional[int] = None) -> tuple[list[Devices], bool]:
+        """
+        Func what reads one page of devices, newest first, with keyset pagination by device_id.
+        The search is a case-insensitive substring of the title or the address, served by the trigram indexes on Postgres
+        :param limit: Size of the page
+        :param search: Text to look for in the title or the address
+        :param active: Only turned on (True) or off (False) devices, None for all
+        :param owner_id: Telegram user_id of the owner
+        :param after: device_id of the last device of the previous page
+        :param before: device_id of the first device of the next page, to go back
+        :return: Devices of the page, newest first, and whether there are more devices beyond it in the direction of travel
+        """
+        try:
+            query = self._filter_devices(self.db.query(Devices), search, active, owner_id)
+            if before is not None:
+                # Going back reads the preceding rows in reverse order and flips them
+                query = query.filter(Devices.device_id > before).order_by(Devices.device_id.asc())
+            else:
+                if after is not None:
+                    query = query.filter(Devices.device_id < after)
+                query = query.order_by(Devices.device_id.desc())
+            devices = query.limit(limit + 1).all()
+            has_more = len(devices) > limit
+            devices = devices[:limit]
+            if before is not None:
+                devices.reverse()
+            devices_logger.info(f'Successfully retrieving a page of {len(devices)} devices from the database')
+            return devices, has_more
+        except Exception:
+            devices_logger.error('Error when getting a page of devices from DataBase', exc_info=True)
+            raise
+
+    def count_devices(self, search: Optional[str] = None, active: Optional[bool] = None, owner_id: Optional[int] = None) -> int:
+        """
+        Func what counts the devices matching the filters of the devices page
+        :param search: Text to look for in the title or the address
+        :param active: Only turned on (True) or off (False) devices, None for all
+        :param owner_id: Telegram user_id of the owner
+        :return: Number of devices
+        """
+        try:
+            return self._filter_devices(self.db.query(func.count(Devices.device_id)), search, active, owner_id).scalar()
+        except Exception:
+            devices_logger.error('Error when counting devices in DataBase', exc_info=True)
+            raise
+
+    def get_devices_by_ids(self, device_ids: list[int]) -> list[Devices]:
+        """
+        Func what reads many devices with one query
+        :param device_ids: IDs of the devices
+        :return: List of Devices ORM models ordered by ID, unknown IDs are skipped
+        """
+        try:
+            devices = self.db.query(Devices).filter(Devices.device_id.in_(device_ids)).order_by(Devices.device_id).all()
+            devices_logger.info(f'Successfully retrieving {len(devices)} devices by IDs from the database')
+            return devices
+        except Exception:
+            devices_logger.error('Error when getting devices by IDs from DataBase', exc_info=True)
+            raise
+
+    def change_devices_states(self, states: dict[int, bool], changed_at: datetime.datetime) -> list[Devices]:
+        """
+        Func what changes the desired state of many devices with a single UPDATE ... RETURNING.
+        Devices already in the requested state are not touched and keep their version;
+        the changed ones are logged in the state history and published in the change feed.
+        Runs inside the caller's transaction and does not commit
+        :param states: Desired state by device ID
+        :param changed_at: Time of the change
+        :return: List of changed Devices ORM models, unknown IDs are skipped
+        """
+        if not states:
+            return []
+        # Boolean expression what gives the requested state of the row being updated
+        target = Devices.device_id.in_([device_id for device_id, active in states.items() if active])
+        statement = (
+            update(Devices)
+            .where(Devices.device_id.in_(list(states)), Devices.active.is_distinct_from(target))
+            .values(
+                active=target,
+                version=Devices.version + 1,
+                desired_at=changed_at,
+                diverged=and_(Devices.reported_active.is_not(None), Devices.reported_active != target)
+            )
+            .returning(Devices)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        devices = self.db.scalars(statement).all()
+        HistoryRepo(self.db).record_changes([(device.device_id, device.active) for device in devices], changed_at)
+        record_bulk_update(self.db, devices, ['active', 'version', 'desired_at', 'diverged'])
+        # Every returned row has flipped, the statement skips devices already in the requested state
+        record_counts(self.db, {'devices_on': sum(1 if device.active else -1 for device in devices)})
+        return devices
+
+    def set_devices_states(self, states: dict[int, bool]) -> list[Devices]:
+        """
+        Func what changes the desired state of many devices in one transaction, see change_devices_states
+        :param states: Desired state by device ID
+        :return: List of changed Devices ORM models, unknown IDs are skipped
+        """
+        if not states:
+            return []
+        use_primary(self.db)
+        try:
+            devices = self.change_devices_states(states, datetime.datetime.now())
+            self.db.commit()
+            # Commit expires the rows, one query reloads all of them instead of a refresh per device
+            devices = self.get_devices_by_ids([device.device_id for device in devices]) if devices else []
+            devices_logger.info(f'Successfully changed state of {len(devices)} of {len(states)} devices in DataBase')
+            notify_state_changes([(device.device_id, device.active) for device in devices])
+            return devices
+        except Exception:
+            self.db.rollback()
+            devices_logger.error('Error when changing state of devices in DataBase', exc_info=True)
+            raise
+
+    def report_device_state(self, device_id: int, active: bool, version: Optional[int] = None) -> Optional[Devices]:
+        """
+        Func what records the state confirmed by the device or its controller
+        :param device_id: ID of the reporting device
+        :param active: Actual state of the hardware
+        :param version: Version of the desired state the device has applied, if known
+        :return: Device ORM model or None if the device does not exist
+        """
+        use_primary(self.db)
         device = self.get_device_by_id(device_id)
         try:
             if device:
+                device.reported_active = active
+                device.reported_version = version
+                device.reported_at = datetime.datetime.now()
+                device.diverged = device.active != active
+                self.db.commit()
+                self.db.refresh(device)
+                devices_logger.info(f'Successfully recorded reported state of device [{repr(device)}] in DataBase')
+            return device
+        except Exception:
+            self.db.rollback()
+            devices_logger.error(f'Error when recording reported state of device [{device_id}] in DataBase', exc_info=True)
+            raise
+
+    def report_devices_states(self, reports: list[dict]) -> list[Devices]:
+        """
+        Func what records states confirmed by a controller for many devices in one transaction
+        :param reports: Dicts with device_id, active and optional version
+        :return: List of updated Devices ORM models, unknown device IDs are skipped
+        """
+        use_primary(self.db)
+        try:
+            by_id = {report['device_id']: report for report in reports}
+            devices = self.db.query(Devices).filter(Devices.device_id.in_(by_id)).all()
+            now = datetime.datetime.now()
+            for device in devices:
+                report = by_id[device.device_id]
+                device.reported_active = report['active']
+                device.reported_version = report.get('version')
+                device.reported_at = now
+                device.diverged = device.active != report['active']
+            self.db.commit()
+            devices_logger.info(f'Successfully recorded reported state of {len(devices)} devices in DataBase')
+            return devices
+        except Exception:
+            self.db.rollback()
+            devices_logger.error('Error when recording reported states of devices in DataBase', exc_info=True)
+            raise
+
+    def get_diverged_devices(self, older_than: datetime.datetime, limit: int) -> list[Devices]:
+        """
+        Func what finds devices whose reported state still differs from the desired one.
+        Reads only the partial index of diverged devices, devices what never reported are not in it
+        :param older_than: Only devices whose desired state was set before this moment
+        :param limit: Maximum number of devices
+        :return: List of Devices ORM models, the longest diverged first
+        """
+        try:
+            devices = (
+                self.db.query(Devices)
+                .filter(Devices.diverged, Devices.desired_at < older_than, Devices.reported_at.is_not(None))
+                .order_by(Devices.desired_at)
+                .limit(limit)
+                .all()
+            )
+            devices_logger.info(f'Successfully retrieving {len(devices)} diverged devices from the database')
+            return devices
+        except Exception:
+            devices_logger.error('Error when getting diverged devices from DataBase', exc_info=True)
+            raise
+
+    def delete_device(self, device_id: int) -> Optional[Devices]:
+        use_primary(self.db)
+        device = self.get_device_by_id(device_id, for_update=True)
+        try:
+            if device:
+                # Schedules and rules go with the device, deleted one by one so the workers hear about it
+                for schedule in self.db.query(Schedules).filter(Schedules.device_id == device_id).all():
+                    self.db.delete(schedule)
+                rules = self.db.query(Rules).filter(
+                    (Rules.trigger_device_id == device_id) | (Rules.action_device_id == device_id)
+                ).all()
+                for rule in rules:
+                    self.db.delete(rule)
                 self.db.delete(device)
                 self.db.commit()
                 devices_logger.info(f'Successfully deleted device [{repr(device)}] from DataBase')
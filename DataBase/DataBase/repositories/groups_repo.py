@@ -0,0 +1,134 @@
+from typing import Optional
+import datetime
+
+from sqlalchemy.orm import Session
+from loguru import logger as groups_logger
+
+from DataBase.core.db_connection import use_primary
+from DataBase.models import DeviceGroups, Devices, Users
+from .devices_repo import DevicesRepo
+
+
+def owned_device_ids(db: Session, user_id: int) -> set[int]:
+    """
+    Func what returns IDs of the devices the user owns
+    :param db: Session
+    :param user_id: Telegram user_id
+    :return: Set of device IDs, empty for an unknown user
+    """
+    devices = db.query(Users.devices).filter(Users.user_id == user_id).scalar()
+    return set(devices or ())
+
+
+class GroupsRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_group(self, user_id: int, title: str, devices: list[int], create_time: datetime.datetime) -> DeviceGroups:
+        """
+        Func what creates a device group, devices the user does not own are left out
+        :param user_id: Telegram user_id of the owner
+        :param title: Title of the group
+        :param devices: IDs of the member devices
+        :param create_time: Time of creation
+        :return: DeviceGroups ORM model
+        """
+        use_primary(self.db)
+        try:
+            owned = owned_device_ids(self.db, user_id)
+            group = DeviceGroups(
+                user_id=user_id,
+                title=title,
+                devices=[device_id for device_id in dict.fromkeys(devices) if device_id in owned],
+                create_time=create_time
+            )
+            self.db.add(group)
+            self.db.commit()
+            self.db.refresh(group)
+            groups_logger.info(f'Successful creation of a group [{repr(group)}] in the database')
+            return group
+        except Exception:
+            self.db.rollback()
+            groups_logger.error('Error when creating a new group in the database', exc_info=True)
+            raise
+
+    def get_group_by_id(self, group_id: int) -> Optional[DeviceGroups]:
+        try:
+            group = self.db.query(DeviceGroups).filter(DeviceGroups.group_id == group_id).first()
+            groups_logger.info(f'Successfully retrieving the group [{repr(group)}] from the database')
+            return group
+        except Exception:
+            groups_logger.error(f'Error when getting group [{group_id}] from DataBase', exc_info=True)
+            raise
+
+    def get_user_groups(self, user_id: int) -> list[DeviceGroups]:
+        try:
+            groups = self.db.query(DeviceGroups).filter(DeviceGroups.user_id == user_id).order_by(DeviceGroups.group_id).all()
+            groups_logger.info(f'Successfully retrieving {len(groups)} groups of user [{user_id}] from the database')
+            return groups
+        except Exception:
+            groups_logger.error(f'Error when getting groups of user [{user_id}] from DataBase', exc_info=True)
+            raise
+
+    def update_group(self, group_id: int, title: Optional[str] = None, devices: Optional[list[int]] = None) -> Optional[DeviceGroups]:
+        use_primary(self.db)
+        group = self.get_group_by_id(group_id)
+        try:
+            if group:
+                if title is not None:
+                    group.title = title
+                if devices is not None:
+                    owned = owned_device_ids(self.db, group.user_id)
+                    # A new list object, in-place changes of the array/JSON column are not tracked
+                    group.devices = [device_id for device_id in dict.fromkeys(devices) if device_id in owned]
+                self.db.commit()
+                self.db.refresh(group)
+                groups_logger.info(f'Successfully updated group [{repr(group)}] in DataBase')
+            return group
+        except Exception:
+            self.db.rollback()
+            groups_logger.error(f'Error when updating group [{group_id}] in DataBase', exc_info=True)
+            raise
+
+    def delete_group(self, group_id: int) -> Optional[DeviceGroups]:
+        use_primary(self.db)
+        group = self.get_group_by_id(group_id)
+        try:
+            if group:
+                self.db.delete(group)
+                self.db.commit()
+                groups_logger.info(f'Successfully deleted group [{repr(group)}] from DataBase')
+            return group
+        except Exception:
+            self.db.rollback()
+            groups_logger.error(f'Error when deleting group [{group_id}] from Database', exc_info=True)
+            raise
+
+    def _members(self, group: DeviceGroups) -> list[int]:
+        # Devices deleted or given away since the group was saved are skipped
+        owned = owned_device_ids(self.db, group.user_id)
+        return [device_id for device_id in group.devices or () if device_id in owned]
+
+    def get_group_devices(self, group_id: int) -> Optional[list[Devices]]:
+        """
+        Func what reads the member devices of a group with one query
+        :param group_id: ID of the group
+        :return: List of Devices ORM models or None if the group does not exist
+        """
+        group = self.get_group_by_id(group_id)
+        if group is None:
+            return None
+        return DevicesRepo(self.db).get_devices_by_ids(self._members(group))
+
+    def set_group_state(self, group_id: int, active: bool) -> Optional[list[Devices]]:
+        """
+        Func what turns all member devices of a group on or off with a single UPDATE
+        :param group_id: ID of the group
+        :param active: Desired state
+        :return: List of changed Devices ORM models or None if the group does not exist
+        """
+        use_primary(self.db)
+        group = self.get_group_by_id(group_id)
+        if group is None:
+            return None
+        return DevicesRepo(self.db).set_devices_states({device_id: active for device_id in self._members(group)})
@@ -0,0 +1,182 @@
+import datetime
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.orm import Session
+from loguru import logger as history_logger
+
+from DataBase.core.upsert import increment
+from DataBase.models import device_state_history, device_daily_uptime
+
+
+def split_by_day(start: datetime.datetime, end: datetime.datetime) -> list[tuple[datetime.date, int]]:
+    """
+    Func what cuts an interval at midnights
+    :param start: Start of the interval
+    :param end: End of the interval
+    :return: List of (day, whole seconds of the interval on that day)
+    """
+    parts = []
+    while start < end:
+        midnight = datetime.datetime.combine(start.date() + datetime.timedelta(days=1), datetime.time())
+        part_end = min(end, midnight)
+        parts.append((start.date(), int((part_end - start).total_seconds())))
+        start = part_end
+    return parts
+
+
+def _midnight_after(moment: datetime.datetime) -> datetime.datetime:
+    midnight = datetime.datetime.combine(moment.date(), datetime.time())
+    return midnight if midnight == moment else midnight + datetime.timedelta(days=1)
+
+
+class HistoryRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _last_change(self, device_id: int, before: datetime.datetime, inclusive: bool = False):
+        condition = device_state_history.c.changed_at <= before if inclusive else device_state_history.c.changed_at < before
+        return self.db.execute(
+            select(device_state_history.c.changed_at, device_state_history.c.active)
+            .where(device_state_history.c.device_id == device_id, condition)
+            .order_by(device_state_history.c.changed_at.desc())
+            .limit(1)
+        ).first()
+
+    def record_change(self, device_id: int, active: bool, changed_at: datetime.datetime):
+        """
+        Func what appends a state change and, when an on-interval closes, adds it to the daily rollups.
+        Runs inside the caller's transaction and does not commit
+        :param device_id: ID of the device
+        :param active: New desired state
+        :param changed_at: Time of the change
+        """
+        self.record_changes([(device_id, active)], changed_at)
+
+    def record_changes(self, changes: list[tuple[int, bool]], changed_at: datetime.datetime):
+        """
+        Func what records state changes of many devices made at the same moment:
+        one query for the previous changes, one multi-row INSERT into the log, then the rollups of closed on-intervals.
+        Runs inside the caller's transaction and does not commit
+        :param changes: List of (device_id, new desired state)
+        :param changed_at: Time of the changes
+        """
+        if not changes:
+            return
+        history = device_state_history
+        closing = [device_id for device_id, active in changes if not active]
+        previous = []
+        if closing:
+            latest = (
+                select(history.c.device_id, func.max(history.c.changed_at).label('changed_at'))
+                .where(history.c.device_id.in_(closing), history.c.changed_at <= changed_at)
+                .group_by(history.c.device_id)
+                .subquery()
+            )
+            previous = self.db.execute(
+                select(history.c.device_id, history.c.changed_at, history.c.active)
+                .join(latest, and_(history.c.device_id == latest.c.device_id, history.c.changed_at == latest.c.changed_at))
+            ).all()
+        self.db.execute(history.insert().values([
+            {'device_id': device_id, 'changed_at': changed_at, 'active': active} for device_id, active in changes
+        ]))
+        for device_id, on_since, was_active in previous:
+            if was_active:
+                for day, seconds in split_by_day(on_since, changed_at):
+                    increment(self.db, device_daily_uptime, {'device_id': device_id, 'day': day}, {'on_seconds': seconds})
+        history_logger.info(f'State changes of {len(changes)} devices recorded')
+
+    def get_recent_history(self, device_id: int, limit: int) -> list[dict]:
+        """
+        Func what returns the latest state changes of a device
+        :param device_id: ID of the device
+        :param limit: Maximum number of changes
+        :return: List of dicts with changed_at and active, newest first
+        """
+        try:
+            rows = self.db.execute(
+                select(device_state_history.c.changed_at, device_state_history.c.active)
+                .where(device_state_history.c.device_id == device_id)
+                .order_by(device_state_history.c.changed_at.desc())
+                .limit(limit)
+            ).all()
+            history_logger.info(f'Successfully retrieving {len(rows)} state changes of device [{device_id}] from the database')
+            return [row._asdict() for row in rows]
+        except Exception:
+            history_logger.error(f'Error when getting state history of device [{device_id}] from DataBase', exc_info=True)
+            raise
+
+    def _on_seconds_from_events(self, device_id: int, start: datetime.datetime, end: datetime.datetime) -> float:
+        """
+        Func what integrates the on-time of a short interval straight from the log
+        """
+        if start >= end:
+            return 0
+        previous = self._last_change(device_id, start)
+        changes = self.db.execute(
+            select(device_state_history.c.changed_at, device_state_history.c.active)
+            .where(
+                device_state_history.c.device_id == device_id,
+                device_state_history.c.changed_at >= start,
+                device_state_history.c.changed_at < end,
+            )
+            .order_by(device_state_history.c.changed_at)
+        ).all()
+        total = 0.0
+        on_since = start if previous is not None and previous.active else None
+        for changed_at, active in changes:
+            if active and on_since is None:
+                on_since = changed_at
+            elif not active and on_since is not None:
+                total += (changed_at - on_since).total_seconds()
+                on_since = None
+        if on_since is not None:
+            total += (end - on_since).total_seconds()
+        return total
+
+    def get_uptime(self, device_id: int, start: datetime.datetime, end: datetime.datetime) -> dict:
+        """
+        Func what computes how long a device was on within a range.
+        Whole days are summed from the daily rollups, only the partial days at the edges
+        and a still open on-interval are read from the log
+        :param device_id: ID of the device
+        :param start: Start of the range
+        :param end: End of the range, clipped to now
+        :return: Dict with on_seconds over the range and the per-day rollups of its whole days
+        """
+        try:
+            end = min(end, datetime.datetime.now())
+            first_day, last_day = _midnight_after(start), datetime.datetime.combine(end.date(), datetime.time())
+            days = []
+            total = 0.0
+            if first_day < last_day:
+                days = self.db.execute(
+                    select(device_daily_uptime.c.day, device_daily_uptime.c.on_seconds)
+                    .where(
+                        device_daily_uptime.c.device_id == device_id,
+                        device_daily_uptime.c.day >= first_day.date(),
+                        device_daily_uptime.c.day < last_day.date(),
+                    )
+                    .order_by(device_daily_uptime.c.day)
+                ).all()
+                total += sum(row.on_seconds for row in days)
+                # Rollups hold closed intervals only, an interval still open now counts for the whole days it covers
+                last = self._last_change(device_id, datetime.datetime.now(), inclusive=True)
+                if last is not None and last.active:
+                    open_start = max(last.changed_at, first_day)
+                    if open_start < last_day:
+                        total += (last_day - open_start).total_seconds()
+                total += self._on_seconds_from_events(device_id, start, first_day)
+                total += self._on_seconds_from_events(device_id, last_day, end)
+            else:
+                total += self._on_seconds_from_events(device_id, start, end)
+            history_logger.info(f'Successfully computed uptime of device [{device_id}] from {start} to {end}')
+            return {
+                'device_id': device_id,
+                'start': start,
+                'end': end,
+                'on_seconds': int(total),
+                'days': [row._asdict() for row in days],
+            }
+        except Exception:
+            history_logger.error(f'Error when computing uptime of device [{device_id}]', exc_info=True)
+            raise
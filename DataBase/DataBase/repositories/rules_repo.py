@@ -0,0 +1,201 @@
+from typing import Optional
+import datetime
+
+from sqlalchemy.orm import Session
+from loguru import logger as rules_logger
+
+from DataBase.core.db_connection import use_primary
+from DataBase.models import Rules
+from .devices_repo import DevicesRepo
+from .groups_repo import owned_device_ids
+
+
+class RuleCycleError(Exception):
+    """
+    The rule would make a device flip back and forth forever
+    """
+
+
+def find_oscillation(edges: list[tuple[tuple[int, bool], tuple[int, bool]]],
+                     new_edge: tuple[tuple[int, bool], tuple[int, bool]]) -> Optional[int]:
+    """
+    Func what checks whether a new rule closes a cycle what drives some device to both states.
+    Nodes are (device_id, state), every rule is an edge from its trigger to its action.
+    The nodes lying on a cycle through the new edge are those reachable from its action and reaching its trigger.
+    Cycles what only confirm states ("A on -> B on", "B on -> A on") are allowed, they stop by themselves
+    :param edges: Existing enabled rules of the user as (trigger, action)
+    :param new_edge: The new rule as (trigger, action)
+    :return: ID of a device what would oscillate or None
+    """
+    forward, backward = {}, {}
+    for source, target in [*edges, new_edge]:
+        forward.setdefault(source, set()).add(target)
+        backward.setdefault(target, set()).add(source)
+
+    def reach(start, graph) -> set:
+        seen, stack = {start}, [start]
+        while stack:
+            for node in graph.get(stack.pop(), ()):
+                if node not in seen:
+                    seen.add(node)
+                    stack.append(node)
+        return seen
+
+    trigger, action = new_edge
+    on_cycle = reach(action, forward) & reach(trigger, backward)
+    for device_id, state in on_cycle:
+        if (device_id, not state) in on_cycle:
+            return device_id
+    return None
+
+
+def _edge(rule: Rules) -> tuple[tuple[int, bool], tuple[int, bool]]:
+    return (rule.trigger_device_id, rule.trigger_active), (rule.action_device_id, rule.action_active)
+
+
+class RulesRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _check_oscillation(self, user_id: int, new_edge: tuple[tuple[int, bool], tuple[int, bool]]):
+        edges = [_edge(rule) for rule in self.get_user_rules(user_id) if rule.enabled]
+        device_id = find_oscillation(edges, new_edge)
+        if device_id is not None:
+            raise RuleCycleError(f'Rule would switch device {device_id} on and off in a loop')
+
+    def create_rule(self, user_id: int, trigger_device_id: int, trigger_active: bool,
+                    action_device_id: int, action_active: bool, create_time: datetime.datetime) -> Optional[Rules]:
+        """
+        Func what creates an automation rule between two devices of the user
+        :param user_id: Telegram user_id of the owner
+        :param trigger_device_id: Device whose change fires the rule
+        :param trigger_active: State of the trigger device what fires the rule
+        :param action_device_id: Device what is changed
+        :param action_active: State what is set
+        :param create_time: Time of creation
+        :return: Rules ORM model or None if the user does not own one of the devices
+        :raises RuleCycleError: If the rule would make a device oscillate
+        """
+        use_primary(self.db)
+        try:
+            owned = owned_device_ids(self.db, user_id)
+            if trigger_device_id not in owned or action_device_id not in owned:
+                return None
+            self._check_oscillation(user_id, ((trigger_device_id, trigger_active), (action_device_id, action_active)))
+            rule = Rules(
+                user_id=user_id,
+                trigger_device_id=trigger_device_id,
+                trigger_active=trigger_active,
+                action_device_id=action_device_id,
+                action_active=action_active,
+                enabled=True,
+                create_time=create_time
+            )
+            self.db.add(rule)
+            self.db.commit()
+            self.db.refresh(rule)
+            rules_logger.info(f'Successful creation of a rule [{repr(rule)}] in the database')
+            return rule
+        except RuleCycleError:
+            self.db.rollback()
+            rules_logger.warning(f'Rule of user [{user_id}] rejected: it closes an oscillating cycle')
+            raise
+        except Exception:
+            self.db.rollback()
+            rules_logger.error('Error when creating a new rule in the database', exc_info=True)
+            raise
+
+    def get_rule_by_id(self, rule_id: int) -> Optional[Rules]:
+        try:
+            rule = self.db.query(Rules).filter(Rules.rule_id == rule_id).first()
+            rules_logger.info(f'Successfully retrieving the rule [{repr(rule)}] from the database')
+            return rule
+        except Exception:
+            rules_logger.error(f'Error when getting rule [{rule_id}] from DataBase', exc_info=True)
+            raise
+
+    def get_user_rules(self, user_id: int) -> list[Rules]:
+        try:
+            rules = self.db.query(Rules).filter(Rules.user_id == user_id).order_by(Rules.rule_id).all()
+            rules_logger.info(f'Successfully retrieving {len(rules)} rules of user [{user_id}] from the database')
+            return rules
+        except Exception:
+            rules_logger.error(f'Error when getting rules of user [{user_id}] from DataBase', exc_info=True)
+            raise
+
+    def get_enabled_rules(self) -> list[Rules]:
+        """
+        Func what reads every enabled rule, used to build the trigger index of a worker
+        :return: List of Rules ORM models
+        """
+        # A replica may not have the latest rules yet
+        use_primary(self.db)
+        try:
+            rules = self.db.query(Rules).filter(Rules.enabled).all()
+            rules_logger.info(f'Successfully retrieving {len(rules)} enabled rules from the database')
+            return rules
+        except Exception:
+            rules_logger.error('Error when getting enabled rules from DataBase', exc_info=True)
+            raise
+
+    def set_rule_enabled(self, rule_id: int, enabled: bool) -> Optional[Rules]:
+        """
+        Func what turns a rule on or off, turning on is checked for oscillating cycles like creation
+        :param rule_id: ID of the rule
+        :param enabled: New flag
+        :return: Rules ORM model or None if the rule does not exist
+        :raises RuleCycleError: If enabling the rule would make a device oscillate
+        """
+        use_primary(self.db)
+        rule = self.get_rule_by_id(rule_id)
+        try:
+            if rule:
+                if enabled and not rule.enabled:
+                    self._check_oscillation(rule.user_id, _edge(rule))
+                rule.enabled = enabled
+                self.db.commit()
+                self.db.refresh(rule)
+                rules_logger.info(f'Successfully updated rule [{repr(rule)}] in DataBase')
+            return rule
+        except RuleCycleError:
+            self.db.rollback()
+            rules_logger.warning(f'Enabling rule [{rule_id}] rejected: it closes an oscillating cycle')
+            raise
+        except Exception:
+            self.db.rollback()
+            rules_logger.error(f'Error when updating rule [{rule_id}] in DataBase', exc_info=True)
+            raise
+
+    def delete_rule(self, rule_id: int) -> Optional[Rules]:
+        use_primary(self.db)
+        rule = self.get_rule_by_id(rule_id)
+        try:
+            if rule:
+                self.db.delete(rule)
+                self.db.commit()
+                rules_logger.info(f'Successfully deleted rule [{repr(rule)}] from DataBase')
+            return rule
+        except Exception:
+            self.db.rollback()
+            rules_logger.error(f'Error when deleting rule [{rule_id}] from Database', exc_info=True)
+            raise
+
+    def apply_actions(self, states: dict[int, bool]) -> list[tuple[int, bool]]:
+        """
+        Func what executes the actions of fired rules in one transaction through the bulk state change.
+        Does not notify the state listeners, the rules engine follows the chain itself.
+        Controllers get the changes through the change feed events of the statement, the bot queues them
+        :param states: Desired state by device ID
+        :return: List of (device_id, active) of the devices what actually changed
+        """
+        use_primary(self.db)
+        try:
+            devices = DevicesRepo(self.db).change_devices_states(states, datetime.datetime.now())
+            changes = [(device.device_id, device.active) for device in devices]
+            self.db.commit()
+            rules_logger.info(f'Rule actions changed {len(changes)} of {len(states)} devices')
+            return changes
+        except Exception:
+            self.db.rollback()
+            rules_logger.error('Error when executing rule actions', exc_info=True)
+            raise
@@ -0,0 +1,90 @@
+from typing import Optional
+import datetime
+
+from sqlalchemy.orm import Session
+from loguru import logger as scenes_logger
+
+from DataBase.core.db_connection import use_primary
+from DataBase.models import Scenes, Devices
+from .devices_repo import DevicesRepo
+from .groups_repo import owned_device_ids
+
+
+class ScenesRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_scene(self, user_id: int, title: str, states: dict[int, bool], create_time: datetime.datetime) -> Scenes:
+        """
+        Func what saves a scene, devices the user does not own are left out
+        :param user_id: Telegram user_id of the owner
+        :param title: Title of the scene
+        :param states: Desired state by device ID
+        :param create_time: Time of creation
+        :return: Scenes ORM model
+        """
+        use_primary(self.db)
+        try:
+            owned = owned_device_ids(self.db, user_id)
+            scene = Scenes(
+                user_id=user_id,
+                title=title,
+                # JSON object keys are strings
+                states={str(device_id): active for device_id, active in states.items() if device_id in owned},
+                create_time=create_time
+            )
+            self.db.add(scene)
+            self.db.commit()
+            self.db.refresh(scene)
+            scenes_logger.info(f'Successful creation of a scene [{repr(scene)}] in the database')
+            return scene
+        except Exception:
+            self.db.rollback()
+            scenes_logger.error('Error when creating a new scene in the database', exc_info=True)
+            raise
+
+    def get_scene_by_id(self, scene_id: int) -> Optional[Scenes]:
+        try:
+            scene = self.db.query(Scenes).filter(Scenes.scene_id == scene_id).first()
+            scenes_logger.info(f'Successfully retrieving the scene [{repr(scene)}] from the database')
+            return scene
+        except Exception:
+            scenes_logger.error(f'Error when getting scene [{scene_id}] from DataBase', exc_info=True)
+            raise
+
+    def get_user_scenes(self, user_id: int) -> list[Scenes]:
+        try:
+            scenes = self.db.query(Scenes).filter(Scenes.user_id == user_id).order_by(Scenes.scene_id).all()
+            scenes_logger.info(f'Successfully retrieving {len(scenes)} scenes of user [{user_id}] from the database')
+            return scenes
+        except Exception:
+            scenes_logger.error(f'Error when getting scenes of user [{user_id}] from DataBase', exc_info=True)
+            raise
+
+    def delete_scene(self, scene_id: int) -> Optional[Scenes]:
+        use_primary(self.db)
+        scene = self.get_scene_by_id(scene_id)
+        try:
+            if scene:
+                self.db.delete(scene)
+                self.db.commit()
+                scenes_logger.info(f'Successfully deleted scene [{repr(scene)}] from DataBase')
+            return scene
+        except Exception:
+            self.db.rollback()
+            scenes_logger.error(f'Error when deleting scene [{scene_id}] from Database', exc_info=True)
+            raise
+
+    def apply_scene(self, scene_id: int) -> Optional[list[Devices]]:
+        """
+        Func what sets every device of a scene to its saved state with a single UPDATE
+        :param scene_id: ID of the scene
+        :return: List of changed Devices ORM models or None if the scene does not exist
+        """
+        use_primary(self.db)
+        scene = self.get_scene_by_id(scene_id)
+        if scene is None:
+            return None
+        owned = owned_device_ids(self.db, scene.user_id)
+        states = {int(device_id): active for device_id, active in scene.states.items() if int(device_id) in owned}
+        return DevicesRepo(self.db).set_devices_states(states)
@@ -0,0 +1,171 @@
+from typing import Optional
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from loguru import logger as schedules_logger
+
+from DataBase.core.db_connection import use_primary
+from DataBase.events.state_hooks import notify_state_changes
+from DataBase.models import Schedules
+from .devices_repo import DevicesRepo
+from .groups_repo import owned_device_ids
+
+
+def next_daily_run(time_of_day: datetime.time, after: datetime.datetime) -> datetime.datetime:
+    """
+    Func what finds the first moment at time_of_day strictly after the given one
+    :param time_of_day: Local time of day
+    :param after: Moment to start from
+    :return: Next due moment
+    """
+    run = datetime.datetime.combine(after.date(), time_of_day)
+    return run if run > after else run + datetime.timedelta(days=1)
+
+
+class SchedulesRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_schedule(self, user_id: int, device_id: int, active: bool, kind: str, create_time: datetime.datetime,
+                        run_at: Optional[datetime.datetime] = None,
+                        time_of_day: Optional[datetime.time] = None) -> Optional[Schedules]:
+        """
+        Func what creates a schedule of one of the user's devices
+        :param user_id: Telegram user_id of the owner
+        :param device_id: ID of the device
+        :param active: State what is set when the schedule fires
+        :param kind: 'once' or 'daily'
+        :param create_time: Time of creation
+        :param run_at: Moment of a 'once' schedule
+        :param time_of_day: Time of day of a 'daily' schedule
+        :return: Schedules ORM model or None if the user does not own the device
+        """
+        use_primary(self.db)
+        try:
+            if device_id not in owned_device_ids(self.db, user_id):
+                return None
+            next_run = run_at if kind == 'once' else next_daily_run(time_of_day, create_time)
+            schedule = Schedules(
+                user_id=user_id,
+                device_id=device_id,
+                active=active,
+                kind=kind,
+                time_of_day=time_of_day if kind == 'daily' else None,
+                next_run=next_run,
+                create_time=create_time
+            )
+            self.db.add(schedule)
+            self.db.commit()
+            self.db.refresh(schedule)
+            schedules_logger.info(f'Successful creation of a schedule [{repr(schedule)}] in the database')
+            return schedule
+        except Exception:
+            self.db.rollback()
+            schedules_logger.error('Error when creating a new schedule in the database', exc_info=True)
+            raise
+
+    def get_schedule_by_id(self, schedule_id: int) -> Optional[Schedules]:
+        try:
+            schedule = self.db.query(Schedules).filter(Schedules.schedule_id == schedule_id).first()
+            schedules_logger.info(f'Successfully retrieving the schedule [{repr(schedule)}] from the database')
+            return schedule
+        except Exception:
+            schedules_logger.error(f'Error when getting schedule [{schedule_id}] from DataBase', exc_info=True)
+            raise
+
+    def get_user_schedules(self, user_id: int) -> list[Schedules]:
+        try:
+            schedules = self.db.query(Schedules).filter(Schedules.user_id == user_id).order_by(Schedules.next_run).all()
+            schedules_logger.info(f'Successfully retrieving {len(schedules)} schedules of user [{user_id}] from the database')
+            return schedules
+        except Exception:
+            schedules_logger.error(f'Error when getting schedules of user [{user_id}] from DataBase', exc_info=True)
+            raise
+
+    def get_device_schedules(self, device_id: int) -> list[Schedules]:
+        try:
+            schedules = self.db.query(Schedules).filter(Schedules.device_id == device_id).order_by(Schedules.next_run).all()
+            schedules_logger.info(f'Successfully retrieving {len(schedules)} schedules of device [{device_id}] from the database')
+            return schedules
+        except Exception:
+            schedules_logger.error(f'Error when getting schedules of device [{device_id}] from DataBase', exc_info=True)
+            raise
+
+    def delete_schedule(self, schedule_id: int) -> Optional[Schedules]:
+        use_primary(self.db)
+        schedule = self.get_schedule_by_id(schedule_id)
+        try:
+            if schedule:
+                self.db.delete(schedule)
+                self.db.commit()
+                schedules_logger.info(f'Successfully deleted schedule [{repr(schedule)}] from DataBase')
+            return schedule
+        except Exception:
+            self.db.rollback()
+            schedules_logger.error(f'Error when deleting schedule [{schedule_id}] from Database', exc_info=True)
+            raise
+
+    def get_upcoming(self, start: Optional[datetime.datetime], end: datetime.datetime) -> list[tuple[datetime.datetime, int]]:
+        """
+        Func what reads the due moments of a time window through the next_run index
+        :param start: Inclusive start of the window, None also takes every overdue schedule
+        :param end: Exclusive end of the window
+        :return: List of (next_run, schedule_id)
+        """
+        # A replica may not have the latest schedules yet
+        use_primary(self.db)
+        query = select(Schedules.next_run, Schedules.schedule_id).where(Schedules.next_run < end)
+        if start is not None:
+            query = query.where(Schedules.next_run >= start)
+        return [tuple(row) for row in self.db.execute(query).all()]
+
+    def run_due_schedules(self, now: datetime.datetime, limit: int, misfire_grace: float) -> dict:
+        """
+        Func what claims due schedules and applies them in one transaction.
+        Rows are locked with FOR UPDATE SKIP LOCKED, so several server instances share the work and never run a schedule twice.
+        A 'once' schedule fires however late it is and is deleted. Missed days of a 'daily' schedule collapse into one run,
+        which is skipped when it is more than misfire_grace late. Schedules of one device are applied in due order,
+        so after downtime the latest of them wins
+        :param now: Current time
+        :param limit: Maximum number of schedules claimed
+        :param misfire_grace: Seconds a 'daily' schedule may be late and still fire
+        :return: Dict with numbers of claimed and missed schedules, (device_id, active) of the changed devices
+                 and (next_run, schedule_id) of the rescheduled ones
+        """
+        use_primary(self.db)
+        try:
+            schedules = self.db.scalars(
+                select(Schedules)
+                .where(Schedules.next_run <= now)
+                .order_by(Schedules.next_run)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+            states = {}
+            missed = 0
+            rescheduled = []
+            for schedule in schedules:
+                late = (now - schedule.next_run).total_seconds()
+                if schedule.kind == 'daily' and late > misfire_grace:
+                    missed += 1
+                else:
+                    states[schedule.device_id] = schedule.active
+                    schedule.last_run = now
+                if schedule.kind == 'daily':
+                    schedule.next_run = next_daily_run(schedule.time_of_day, now)
+                    rescheduled.append((schedule.next_run, schedule.schedule_id))
+                else:
+                    self.db.delete(schedule)
+            self.db.flush()
+            devices = DevicesRepo(self.db).change_devices_states(states, now)
+            changed = [(device.device_id, device.active) for device in devices]
+            self.db.commit()
+            notify_state_changes(changed)
+            if schedules:
+                schedules_logger.info(f'Ran {len(schedules) - missed} due schedules ({missed} missed), {len(changed)} devices changed')
+            return {'claimed': len(schedules), 'missed': missed, 'changed': changed, 'rescheduled': rescheduled}
+        except Exception:
+            self.db.rollback()
+            schedules_logger.error('Error when running due schedules', exc_info=True)
+            raise
@@ -0,0 +1,41 @@
+import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from loguru import logger as stats_logger
+
+from DataBase.core.counters import COUNTERS
+from DataBase.models import stats_counters, daily_signups
+
+
+class StatsRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_stats(self, days: int) -> dict:
+        """
+        Func what reads the dashboard totals from the counters kept by the write paths,
+        the cost does not depend on the number of users and devices
+        :param days: Number of the last days with signups, today included
+        :return: Dict with users, users_banned, devices, devices_on and signups per day, oldest first
+        """
+        try:
+            totals = dict(self.db.execute(
+                select(stats_counters.c.name, func.sum(stats_counters.c.value)).group_by(stats_counters.c.name)
+            ).all())
+            today = datetime.date.today()
+            first_day = today - datetime.timedelta(days=days - 1)
+            signups = dict(self.db.execute(
+                select(daily_signups.c.day, daily_signups.c.users).where(daily_signups.c.day >= first_day)
+            ).all())
+            stats_logger.info('Successfully retrieving statistics from the database')
+            return {
+                **{name: int(totals.get(name) or 0) for name in COUNTERS},
+                'signups': [
+                    {'day': day, 'users': signups.get(day, 0)}
+                    for day in (first_day + datetime.timedelta(days=n) for n in range(days))
+                ],
+            }
+        except Exception:
+            stats_logger.error('Error when getting statistics from DataBase', exc_info=True)
+            raise
@@ -0,0 +1,47 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from loguru import logger as telemetry_logger
+
+from DataBase.models import device_readings, READING_METRIC_NAMES
+
+
+class TelemetryRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_readings(self, device_id: int, start: datetime.datetime, end: datetime.datetime,
+                     metric: Optional[int] = None, limit: int = 1000) -> list[dict]:
+        """
+        Func what returns written readings of a device within [start, end), readings still in the buffer are not included
+        :param device_id: ID of the device
+        :param start: Start of the range
+        :param end: End of the range
+        :param metric: Metric code, all metrics if None
+        :param limit: Maximum number of readings
+        :return: List of dicts with measured_at, metric name and value, oldest first
+        """
+        try:
+            query = (
+                select(device_readings.c.measured_at, device_readings.c.metric, device_readings.c.value)
+                .where(
+                    device_readings.c.device_id == device_id,
+                    device_readings.c.measured_at >= start,
+                    device_readings.c.measured_at < end,
+                )
+                .order_by(device_readings.c.measured_at)
+                .limit(limit)
+            )
+            if metric is not None:
+                query = query.where(device_readings.c.metric == metric)
+            rows = self.db.execute(query).all()
+            telemetry_logger.info(f'Successfully retrieving {len(rows)} readings of device [{device_id}] from the database')
+            return [
+                {'measured_at': measured_at, 'metric': READING_METRIC_NAMES[code], 'value': value}
+                for measured_at, code, value in rows
+            ]
+        except Exception:
+            telemetry_logger.error(f'Error when getting readings of device [{device_id}] from DataBase', exc_info=True)
+            raise
@@ -1,12 +1,20 @@
 import datetime
 from typing import Optional, Type
 
+from sqlalchemy import func, tuple_, update
 from sqlalchemy.orm import Session
 from loguru import logger as user_repo_logger
 
+from DataBase.core.counters import record_counts
+from DataBase.core.db_connection import use_primary
+from DataBase.events.capture import record_bulk_update
 from DataBase.models import Users
 
 
+# Sort orders of the users page, each one is backed by an index of the Users table
+USER_SORT_COLUMNS = {'create_time': Users.create_time, 'device_counter': Users.device_counter}
+
+
 class UserRepo:
     def __init__(self, db: Session):
         self.db = db
@@ -22,14 +30,16 @@ class UserRepo:
         except Exception:
             user_repo_logger.error(f'Error when creating a new user in the database', exc_info=True)
 
-    def get_user_by_id(self, user_id: int) -> Optional[Users] | None:
+    def get_user_by_id(self, user_id: int, for_update: bool = False) -> Optional[Users] | None:
         """
         Func what find user in DataBase by him ID
         :param user_id: Unique user ID
+        :param for_update: Lock the row until the end of the transaction, for writes what depend on its current state
         :return: User ORM model from DataBase
         """
         try:
-            user = self.db.query(Users).filter(Users.user_id == user_id).first()
+            query = self.db.query(Users).filter(Users.user_id == user_id)
+            user = (query.with_for_update() if for_update else query).first()
             user_repo_logger.info(f'Successfully retrieving the user [{repr(user)}] from the database')
             return user
         except Exception:
@@ -43,6 +53,63 @@ class UserRepo:
         except Exception:
             user_repo_logger.error(f'Error when getting all users from DataBase', exc_info=True)
 
+    def _filter_users(self, query, active: Optional[bool], tag_prefix: Optional[str]):
+        if active is not None:
+            query = query.filter(Users.active.is_(active))
+        if tag_prefix:
+            query = query.filter(func.lower(Users.tag).startswith(tag_prefix.lower(), autoescape=True))
+        return query
+
+    def get_users_page(self, limit: int, sort: str = 'create_time', descending: bool = True,
+                       active: Optional[bool] = None, tag_prefix: Optional[str] = None,
+                       after: Optional[tuple] = None, before: Optional[tuple] = None) -> tuple[list[Users], bool]:
+        """
+        Func what reads one page of users with keyset pagination: the page starts right after (or ends right before)
+        the (sort value, id) key of a boundary user, so every page is an index range scan whatever its depth
+        :param limit: Size of the page
+        :param sort: Sort column, a key of USER_SORT_COLUMNS
+        :param descending: Sort direction
+        :param active: Only active (True) or only banned (False) users, None for all
+        :param tag_prefix: Case-insensitive prefix of the tag
+        :param after: Key of the last user of the previous page
+        :param before: Key of the first user of the next page, to go back
+        :return: Users of the page in sort order and whether there are more users beyond it in the direction of travel
+        """
+        try:
+            column = USER_SORT_COLUMNS[sort]
+            key = tuple_(column, Users.id)
+            # Going back reads the preceding rows in reverse order and flips them
+            backward = before is not None
+            forward_descending = descending != backward
+            query = self._filter_users(self.db.query(Users), active, tag_prefix)
+            boundary = before if backward else after
+            if boundary is not None:
+                query = query.filter(key < tuple_(*boundary) if forward_descending else key > tuple_(*boundary))
+            order = (column.desc(), Users.id.desc()) if forward_descending else (column.asc(), Users.id.asc())
+            users = query.order_by(*order).limit(limit + 1).all()
+            has_more = len(users) > limit
+            users = users[:limit]
+            if backward:
+                users.reverse()
+            user_repo_logger.info(f'Successfully retrieving a page of {len(users)} users from the database')
+            return users, has_more
+        except Exception:
+            user_repo_logger.error('Error when getting a page of users from DataBase', exc_info=True)
+            raise
+
+    def count_users(self, active: Optional[bool] = None, tag_prefix: Optional[str] = None) -> int:
+        """
+        Func what counts the users matching the filters of the users page
+        :param active: Only active (True) or only banned (False) users, None for all
+        :param tag_prefix: Case-insensitive prefix of the tag
+        :return: Number of users
+        """
+        try:
+            return self._filter_users(self.db.query(func.count(Users.id)), active, tag_prefix).scalar()
+        except Exception:
+            user_repo_logger.error('Error when counting users in DataBase', exc_info=True)
+            raise
+
     def update_user(self, user_id: int, **new_values) -> Type[Users] | None:
         """
         Func what can update User properties in DataBase.
@@ -51,7 +118,8 @@ class UserRepo:
         :param new_values: Kwargs what correspond to User ORM model properties
         :return: User ORM model from DataBase
         """
-        user = self.get_user_by_id(user_id)
+        use_primary(self.db)
+        user = self.get_user_by_id(user_id, for_update=True)
         try:
             if user:
                 for key, value in new_values.items():
@@ -64,13 +132,48 @@ class UserRepo:
         except Exception:
             user_repo_logger.error(f'Error when updating user [{repr(user)}] in DataBase')
 
+    def set_users_active(self, user_ids: list[int], active: bool) -> list[Users]:
+        """
+        Func what bans or unbans many users with one UPDATE ... RETURNING.
+        Users already in the requested state are not touched
+        :param user_ids: Telegram user_ids of the users
+        :param active: New active flag, False is a ban
+        :return: List of changed User ORM models, unknown IDs are skipped
+        """
+        if not user_ids:
+            return []
+        use_primary(self.db)
+        try:
+            statement = (
+                update(Users)
+                .where(Users.user_id.in_(user_ids), Users.active.is_distinct_from(active))
+                .values(active=active)
+                .returning(Users)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            users = self.db.scalars(statement).all()
+            record_bulk_update(self.db, users, ['active'])
+            # Every returned row has flipped, the statement skips users already in the requested state
+            record_counts(self.db, {'users_banned': -len(users) if active else len(users)})
+            changed_ids = [user.user_id for user in users]
+            self.db.commit()
+            # Commit expires the rows, one query reloads all of them instead of a refresh per user
+            users = self.db.query(Users).filter(Users.user_id.in_(changed_ids)).order_by(Users.user_id).all() if changed_ids else []
+            user_repo_logger.info(f'Successfully set active={active} for {len(users)} of {len(user_ids)} users in DataBase')
+            return users
+        except Exception:
+            self.db.rollback()
+            user_repo_logger.error(f'Error when setting active={active} for {len(user_ids)} users in DataBase', exc_info=True)
+            raise
+
     def delete_user(self, user_id: int) -> Type[Users] | None:
         """
         Func what deleting User by him ID
         :param user_id: User ID for deleting
         :return: User ORM model (yeah, he was deleted)
         """
-        user = self.get_user_by_id(user_id)
+        use_primary(self.db)
+        user = self.get_user_by_id(user_id, for_update=True)
         try:
             if user:
                 self.db.delete(user)
@@ -0,0 +1,43 @@
+from configurations import main_config
+from DataBase.core.db_connection import SessionLocal
+from DataBase.core.schema import is_schema_ready
+from DataBase.events import event_bus
+from DataBase.events.state_hooks import add_state_listener
+from DataBase.repositories.rules_repo import RulesRepo
+from .engine import RulesEngine, RateLimiter
+from .index import RuleIndex, CompiledRule
+
+
+def load_rules() -> list[dict]:
+    with SessionLocal() as db:
+        return [
+            {column.key: getattr(rule, column.key) for column in rule.__table__.columns}
+            for rule in RulesRepo(db).get_enabled_rules()
+        ]
+
+
+def apply_actions(states: dict[int, bool]) -> list[tuple[int, bool]]:
+    with SessionLocal() as db:
+        return RulesRepo(db).apply_actions(states)
+
+
+rules_engine = RulesEngine(
+    load_rules,
+    apply_actions,
+    is_schema_ready,
+    max_depth=main_config.rules.max_depth,
+    rate_limit=main_config.rules.rate_limit,
+    rate_window=main_config.rules.rate_window,
+    queue_size=main_config.rules.queue_size
+)
+event_bus.add_handler(rules_engine.handle)
+add_state_listener(rules_engine.notify)
+
+
+async def start_rules():
+    if main_config.rules.enabled:
+        rules_engine.start()
+
+
+async def stop_rules():
+    await rules_engine.stop()
@@ -0,0 +1,221 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from loguru import logger as rules_logger
+from prometheus_client import Counter, Gauge, Histogram
+
+from .index import RuleIndex
+
+FIRED = Counter('rules_fired_total', 'Rules what fired')
+SUPPRESSED = Counter('rules_suppressed_total', 'Rule fires and state changes skipped by the guards', ['reason'])
+ACTION_FAILURES = Counter('rules_action_failures_total', 'Batches of rule actions what failed to apply')
+INDEXED = Gauge('rules_indexed', 'Enabled rules in the trigger index of this worker')
+EVALUATION_SECONDS = Histogram(
+    'rules_evaluation_seconds',
+    'Time to match and check the rules of one batch of state changes',
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+ACTION_SECONDS = Histogram(
+    'rules_action_seconds',
+    'Time from the commit of the triggering change to the commit of the rule actions',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+
+@dataclass
+class Cascade:
+    """
+    State changes waiting for evaluation with the chain of rules what caused them
+    """
+    changes: list[tuple[int, bool]]
+    depth: int = 0
+    fired: frozenset[int] = frozenset()
+    started: float = field(default_factory=time.monotonic)
+
+
+class RateLimiter:
+    """
+    Token bucket per rule: a burst of rate fires, refilled over window seconds
+    """
+
+    def __init__(self, rate: int, window: float):
+        self.rate = rate
+        self.window = window
+        self._buckets: dict[int, tuple[float, float]] = {}
+
+    def allow(self, key: int) -> bool:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.rate, now))
+        tokens = min(self.rate, tokens + (now - updated) * self.rate / self.window)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+
+class RulesEngine:
+    """
+    Rules engine of one worker. State changes committed by this worker are queued by notify() and evaluated
+    by a background task: only the rules indexed under (device, new state) are looked at, their actions are applied
+    in one transaction and the resulting changes are evaluated again as the next step of the same cascade.
+    A rule what fires twice in one cascade closes a cycle and is skipped, cascades are cut at max_depth
+    and every rule is rate-limited, so a bad set of rules cannot flip devices forever.
+    The index of every worker is kept current by the change feed
+    """
+
+    def __init__(self, load: Callable[[], list[dict]], apply: Callable[[dict[int, bool]], list[tuple[int, bool]]],
+                 ready: Callable[[], bool], max_depth: int, rate_limit: int, rate_window: float, queue_size: int):
+        """
+        :param load: Blocking func what reads all enabled rules as dicts
+        :param apply: Blocking func what sets desired states and returns the (device_id, active) what changed
+        :param ready: Func what tells whether the DataBase schema is ready
+        :param max_depth: Maximum steps of one cascade
+        :param rate_limit: Fires of one rule allowed per rate_window
+        :param rate_window: Window of the rate limit in seconds
+        :param queue_size: Maximum cascades waiting for evaluation
+        """
+        self.load = load
+        self.apply = apply
+        self.ready = ready
+        self.max_depth = max_depth
+        self.index = RuleIndex()
+        self.limiter = RateLimiter(rate_limit, rate_window)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loaded = False
+        # Rule events what arrive while the index is being read, replayed on top of it
+        self._replay: Optional[list[dict]] = None
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+            rules_logger.info('Rules engine started')
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._loop = None
+            rules_logger.info('Rules engine stopped')
+
+    def notify(self, changes: list[tuple[int, bool]]):
+        """
+        Thread-safe entry point for desired state changes committed by this worker
+        :param changes: List of (device_id, new desired state)
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        cascade = Cascade(list(changes))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._offer(cascade)
+        else:
+            loop.call_soon_threadsafe(self._offer, cascade)
+
+    def _offer(self, cascade: Cascade):
+        try:
+            self._queue.put_nowait(cascade)
+        except asyncio.QueueFull:
+            SUPPRESSED.labels('queue_full').inc(len(cascade.changes))
+            rules_logger.warning(f'Rules queue is full, {len(cascade.changes)} state changes are not evaluated')
+
+    def handle(self, event: dict):
+        """
+        Change feed handler
+        :param event: Change event
+        """
+        if event.get('type') == 'resync':
+            self._loaded = False
+            return
+        if event['entity'] != 'rule':
+            return
+        if self._replay is not None:
+            self._replay.append(event)
+        self._apply_event(event)
+
+    def _apply_event(self, event: dict):
+        if event['op'] == 'delete':
+            self.index.remove(event['id'])
+        elif event.get('data') is not None:
+            self.index.put(event['data'])
+        else:
+            self._loaded = False
+        INDEXED.set(len(self.index))
+
+    async def _load(self):
+        self._replay = []
+        try:
+            rules = await asyncio.to_thread(self.load)
+            self.index.load(rules)
+            for event in self._replay:
+                self._apply_event(event)
+        finally:
+            self._replay = None
+        self._loaded = True
+        INDEXED.set(len(self.index))
+        rules_logger.info(f'Rule index loaded: {len(self.index)} enabled rules')
+
+    def _evaluate(self, cascade: Cascade) -> tuple[dict[int, bool], frozenset[int]]:
+        actions = {}
+        fired = set(cascade.fired)
+        for device_id, active in cascade.changes:
+            for rule in self.index.match(device_id, active):
+                if rule.rule_id in fired:
+                    SUPPRESSED.labels('cycle').inc()
+                    rules_logger.warning(f'Rule {rule.rule_id} fired twice in one cascade, cycle stopped')
+                    continue
+                if not self.limiter.allow(rule.rule_id):
+                    SUPPRESSED.labels('rate_limit').inc()
+                    continue
+                fired.add(rule.rule_id)
+                actions[rule.action_device_id] = rule.action_active
+                FIRED.inc()
+        return actions, frozenset(fired)
+
+    async def _step(self, cascade: Cascade):
+        started = time.perf_counter()
+        actions, fired = self._evaluate(cascade)
+        EVALUATION_SECONDS.observe(time.perf_counter() - started)
+        if not actions:
+            return
+        if cascade.depth >= self.max_depth:
+            SUPPRESSED.labels('depth').inc(len(actions))
+            rules_logger.warning(f'Rule cascade cut at depth {cascade.depth}')
+            return
+        try:
+            changes = await asyncio.to_thread(self.apply, actions)
+        except Exception:
+            ACTION_FAILURES.inc()
+            rules_logger.error('Rule actions failed', exc_info=True)
+            return
+        ACTION_SECONDS.observe(time.monotonic() - cascade.started)
+        if changes:
+            self._offer(Cascade(changes, cascade.depth + 1, fired, cascade.started))
+
+    async def _run(self):
+        delay = 1
+        while True:
+            try:
+                if not self._loaded:
+                    if not self.ready():
+                        await asyncio.sleep(1)
+                        continue
+                    await self._load()
+                await self._step(await self._queue.get())
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                rules_logger.error(f'Rules engine pass failed, retrying in {delay}s', exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    Rule reduced to what the evaluation needs
+    """
+    rule_id: int
+    action_device_id: int
+    action_active: bool
+
+
+class RuleIndex:
+    """
+    Enabled rules of all users keyed by (trigger device, trigger state),
+    so a state change looks up only the rules it can fire
+    """
+
+    def __init__(self):
+        self._by_trigger: dict[tuple[int, bool], dict[int, CompiledRule]] = {}
+        # Trigger key of every indexed rule, to move or drop it on update
+        self._keys: dict[int, tuple[int, bool]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rules: list[dict]):
+        """
+        Replacing the whole index
+        :param rules: Rows of the Rules table
+        """
+        self._by_trigger.clear()
+        self._keys.clear()
+        for rule in rules:
+            self.put(rule)
+
+    def put(self, rule: dict):
+        """
+        Adding or updating a rule, disabled rules are dropped
+        :param rule: Row of the Rules table
+        """
+        self.remove(rule['rule_id'])
+        if not rule['enabled']:
+            return
+        key = (rule['trigger_device_id'], rule['trigger_active'])
+        self._by_trigger.setdefault(key, {})[rule['rule_id']] = CompiledRule(
+            rule_id=rule['rule_id'],
+            action_device_id=rule['action_device_id'],
+            action_active=rule['action_active']
+        )
+        self._keys[rule['rule_id']] = key
+
+    def remove(self, rule_id: int):
+        key = self._keys.pop(rule_id, None)
+        if key is None:
+            return
+        rules = self._by_trigger[key]
+        del rules[rule_id]
+        if not rules:
+            del self._by_trigger[key]
+
+    def match(self, device_id: int, active: bool) -> tuple[CompiledRule, ...]:
+        """
+        Rules fired by a state change
+        :param device_id: ID of the changed device
+        :param active: Its new desired state
+        :return: Tuple of compiled rules ordered by ID
+        """
+        rules = self._by_trigger.get((device_id, active))
+        return tuple(sorted(rules.values(), key=lambda rule: rule.rule_id)) if rules else ()
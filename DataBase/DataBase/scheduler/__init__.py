@@ -0,0 +1,36 @@
+from configurations import main_config
+from DataBase.core.db_connection import SessionLocal
+from DataBase.core.schema import is_schema_ready
+from DataBase.events import event_bus
+from DataBase.repositories.schedules_repo import SchedulesRepo
+from .timers import Scheduler
+
+
+def load_upcoming(start, end):
+    with SessionLocal() as db:
+        return SchedulesRepo(db).get_upcoming(start, end)
+
+
+def run_due(now, limit, misfire_grace):
+    with SessionLocal() as db:
+        return SchedulesRepo(db).run_due_schedules(now, limit, misfire_grace)
+
+
+scheduler = Scheduler(
+    load_upcoming,
+    run_due,
+    is_schema_ready,
+    batch_size=main_config.scheduler.batch_size,
+    lookahead=main_config.scheduler.lookahead,
+    misfire_grace=main_config.scheduler.misfire_grace
+)
+event_bus.add_handler(scheduler.handle)
+
+
+async def start_scheduler():
+    if main_config.scheduler.enabled:
+        scheduler.start()
+
+
+async def stop_scheduler():
+    await scheduler.stop()
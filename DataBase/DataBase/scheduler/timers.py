@@ -0,0 +1,176 @@
+import asyncio
+import datetime
+import heapq
+from typing import Callable, Optional
+
+from loguru import logger as scheduler_logger
+from prometheus_client import Counter, Gauge, Histogram
+
+RUNS = Counter('scheduler_runs_total', 'Schedules what fired')
+MISSED = Counter('scheduler_missed_total', 'Daily schedules skipped because they were too late')
+TIMERS = Gauge('scheduler_timers', 'Due moments held in the in-memory heap of this worker')
+LATENESS = Histogram(
+    'scheduler_lateness_seconds',
+    'Delay between the due moment and the claim of the earliest schedule of a batch',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0, 60.0, 300.0)
+)
+
+
+class Scheduler:
+    """
+    Timer loop of one worker. The due moments of the next lookahead seconds are kept in a min-heap;
+    the loop sleeps until the earliest of them and then claims the due schedules from the DataBase in batches.
+    The window is extended incrementally through the next_run index, schedules created or changed meanwhile
+    arrive through the change feed. The heap only says when to look: the DataBase claim decides what runs,
+    so stale entries and several workers waking for the same moment are harmless
+    """
+
+    def __init__(self, load: Callable[[Optional[datetime.datetime], datetime.datetime], list[tuple[datetime.datetime, int]]],
+                 run: Callable[[datetime.datetime, int, float], dict], ready: Callable[[], bool],
+                 batch_size: int, lookahead: float, misfire_grace: float):
+        """
+        :param load: Blocking func what returns (next_run, schedule_id) of a window, None as start also takes the overdue ones
+        :param run: Blocking func what claims and applies due schedules, see SchedulesRepo.run_due_schedules
+        :param ready: Func what tells whether the DataBase schema is ready
+        :param batch_size: Maximum schedules claimed in one transaction
+        :param lookahead: Seconds of due moments held in memory
+        :param misfire_grace: Seconds a daily schedule may be late and still fire
+        """
+        self.load = load
+        self.run = run
+        self.ready = ready
+        self.batch_size = batch_size
+        self.lookahead = datetime.timedelta(seconds=lookahead)
+        self.misfire_grace = misfire_grace
+        self._heap: list[tuple[datetime.datetime, int]] = []
+        # Latest known due moment of every schedule in the heap, older heap entries of it are stale
+        self._due: dict[int, datetime.datetime] = {}
+        self._loaded_until: Optional[datetime.datetime] = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            scheduler_logger.info('Scheduler started')
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            scheduler_logger.info('Scheduler stopped')
+
+    def _push(self, next_run: datetime.datetime, schedule_id: int):
+        if self._due.get(schedule_id) == next_run:
+            return
+        self._due[schedule_id] = next_run
+        heapq.heappush(self._heap, (next_run, schedule_id))
+        TIMERS.set(len(self._due))
+
+    def _reset(self):
+        self._heap.clear()
+        self._due.clear()
+        self._loaded_until = None
+        TIMERS.set(0)
+
+    def handle(self, event: dict):
+        """
+        Change feed handler
+        :param event: Change event
+        """
+        if event.get('type') == 'resync':
+            # Events may have been missed: the window is read again, overdue schedules included
+            self._reset()
+            self._wake.set()
+            return
+        if event['entity'] != 'schedule':
+            return
+        data = event.get('data')
+        if event['op'] == 'delete':
+            self._due.pop(event['id'], None)
+            TIMERS.set(len(self._due))
+            return
+        if data is None:
+            self._reset()
+        else:
+            next_run = datetime.datetime.fromisoformat(data['next_run'])
+            if self._loaded_until is not None and next_run < self._loaded_until:
+                self._push(next_run, event['id'])
+            else:
+                # Beyond the loaded window the schedule is picked up when the window gets there
+                self._due.pop(event['id'], None)
+        self._wake.set()
+
+    async def _load(self, now: datetime.datetime):
+        start, end = self._loaded_until, now + self.lookahead
+        rows = await asyncio.to_thread(self.load, start, end)
+        if start is not None and self._loaded_until is None:
+            # Reset by a resync meanwhile, the next pass reads the whole window again
+            return
+        for next_run, schedule_id in rows:
+            self._push(next_run, schedule_id)
+        self._loaded_until = end
+
+    def _pop_due(self, now: datetime.datetime) -> Optional[datetime.datetime]:
+        earliest = None
+        while self._heap and self._heap[0][0] <= now:
+            next_run, schedule_id = heapq.heappop(self._heap)
+            if self._due.get(schedule_id) != next_run:
+                continue
+            del self._due[schedule_id]
+            earliest = earliest or next_run
+        TIMERS.set(len(self._due))
+        return earliest
+
+    async def _run_due(self, now: datetime.datetime):
+        while True:
+            result = await asyncio.to_thread(self.run, now, self.batch_size, self.misfire_grace)
+            RUNS.inc(result['claimed'] - result['missed'])
+            MISSED.inc(result['missed'])
+            for next_run, schedule_id in result['rescheduled']:
+                if self._loaded_until is not None and next_run < self._loaded_until:
+                    self._push(next_run, schedule_id)
+            if result['claimed'] < self.batch_size:
+                return
+
+    def _next_wake(self, now: datetime.datetime) -> float:
+        # The window is extended when half of it has passed
+        wake_at = self._loaded_until - self.lookahead / 2
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        return max((wake_at - now).total_seconds(), 0)
+
+    async def _loop(self):
+        delay = 1
+        while True:
+            try:
+                if not self.ready():
+                    await asyncio.sleep(1)
+                    continue
+                now = datetime.datetime.now()
+                if self._loaded_until is None or now >= self._loaded_until - self.lookahead / 2:
+                    await self._load(now)
+                    if self._loaded_until is None:
+                        continue
+                earliest = self._pop_due(now)
+                if earliest is not None:
+                    LATENESS.observe(max((datetime.datetime.now() - earliest).total_seconds(), 0))
+                    await self._run_due(now)
+                    continue
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._next_wake(now))
+                except asyncio.TimeoutError:
+                    pass
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                scheduler_logger.error(f'Scheduler pass failed, retrying in {delay}s', exc_info=True)
+                # Due moments popped before the failure are read again with the whole window
+                self._reset()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
@@ -0,0 +1,19 @@
+from configurations import main_config
+from .buffer import TelemetryBuffer, TelemetryOverloaded
+from .codec import BINARY_RECORD, BINARY_CONTENT_TYPE, decode_binary, encode_binary, local_naive
+from .writer import write_readings
+
+telemetry_buffer = TelemetryBuffer(
+    write_readings,
+    flush_size=main_config.telemetry.flush_size,
+    flush_interval=main_config.telemetry.flush_interval,
+    capacity=main_config.telemetry.buffer_size
+)
+
+
+async def start_telemetry():
+    telemetry_buffer.start()
+
+
+async def stop_telemetry():
+    await telemetry_buffer.stop()
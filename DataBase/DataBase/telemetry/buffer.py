@@ -0,0 +1,137 @@
+import asyncio
+import time
+from typing import Callable
+
+from loguru import logger as telemetry_logger
+from prometheus_client import Counter, Gauge, Histogram
+
+ACCEPTED = Counter('telemetry_readings_accepted_total', 'Readings accepted into the buffer')
+REJECTED = Counter('telemetry_readings_rejected_total', 'Readings rejected because the buffer stayed full')
+WRITTEN = Counter('telemetry_readings_written_total', 'Readings written to the DataBase')
+BUFFERED = Gauge('telemetry_buffered_readings', 'Readings accepted but not written yet')
+FLUSH_FAILURES = Counter('telemetry_flush_failures_total', 'Failed telemetry flushes')
+FLUSH_SECONDS = Histogram(
+    'telemetry_flush_seconds',
+    'Time of one telemetry flush',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+
+class TelemetryOverloaded(Exception):
+    """
+    Buffer stayed full for the whole enqueue timeout
+    """
+
+
+class TelemetryBuffer:
+    """
+    In-memory buffer of readings of this worker, written to the DataBase in bulk by a background task
+    when flush_size readings are pending or flush_interval has passed.
+    Readings being written still count against the capacity, so when the DataBase falls behind
+    the buffer fills up and writers are slowed down and then rejected instead of growing the memory
+    """
+
+    def __init__(self, writer: Callable[[list[tuple]], None], flush_size: int, flush_interval: float, capacity: int):
+        """
+        :param writer: Blocking func what writes a list of rows in one transaction, run in a thread
+        :param flush_size: Pending readings what trigger a flush
+        :param flush_interval: Maximum time readings stay pending in seconds
+        :param capacity: Maximum of buffered readings, pending and being written
+        """
+        self.writer = writer
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self._pending: list[tuple] = []
+        self._buffered = 0
+        self._wake = asyncio.Event()
+        self._freed = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    async def put(self, rows: list[tuple], timeout: float):
+        """
+        Adding readings, waiting up to timeout while the buffer is full
+        :param rows: List of (device_id, measured_at, metric, value) rows
+        :param timeout: Maximum wait for free space in seconds
+        """
+        if len(rows) > self.capacity:
+            raise ValueError(f'Batch of {len(rows)} readings exceeds the buffer capacity {self.capacity}')
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._buffered + len(rows) > self.capacity:
+            remaining = deadline - loop.time()
+            freed = self._freed
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(freed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                REJECTED.inc(len(rows))
+                raise TelemetryOverloaded(f'Telemetry buffer is full ({self._buffered} readings)')
+        self._pending.extend(rows)
+        self._buffered += len(rows)
+        ACCEPTED.inc(len(rows))
+        BUFFERED.set(self._buffered)
+        if len(self._pending) >= self.flush_size:
+            self._wake.set()
+
+    async def flush(self) -> bool:
+        """
+        Writing all pending readings
+        :return: False if the write failed, the readings are then kept for the next flush
+        """
+        if not self._pending:
+            return True
+        rows, self._pending = self._pending, []
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.writer, rows)
+        except Exception:
+            FLUSH_FAILURES.inc()
+            telemetry_logger.error(f'Telemetry flush of {len(rows)} readings failed', exc_info=True)
+            self._pending[:0] = rows
+            return False
+        FLUSH_SECONDS.observe(time.perf_counter() - started)
+        WRITTEN.inc(len(rows))
+        self._buffered -= len(rows)
+        BUFFERED.set(self._buffered)
+        # Wakes writers waiting for space, the next ones wait on a fresh event
+        self._freed.set()
+        self._freed = asyncio.Event()
+        return True
+
+    async def _run(self):
+        delay = self.flush_interval
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if await self.flush():
+                delay = self.flush_interval
+            else:
+                # The DataBase is down or failing: back off, the buffer meanwhile applies backpressure
+                delay = min(max(delay, 0.5) * 2, 30)
+        if not await self.flush():
+            telemetry_logger.error(f'{len(self._pending)} buffered readings are lost on shutdown')
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stopping the flush task after a last flush of everything pending
+        """
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,52 @@
+import datetime
+import math
+import struct
+
+from DataBase.models.telemetry_model import READING_METRIC_NAMES
+
+# Binary batch: concatenated little-endian records of
+# device_id uint32, measured_at float64 (unix seconds), metric uint8 (code from READING_METRICS), value float32
+BINARY_RECORD = struct.Struct('<IdBf')
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+MAX_DEVICE_ID = 2 ** 31 - 1
+
+
+def local_naive(moment: datetime.datetime) -> datetime.datetime:
+    """
+    Func what converts an aware datetime to the naive local time all DataBase columns use
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def decode_binary(body: bytes) -> list[tuple]:
+    """
+    Func what decodes a binary batch of readings
+    :param body: Request body
+    :return: List of (device_id, measured_at, metric, value) rows
+    """
+    if len(body) % BINARY_RECORD.size:
+        raise ValueError(f'Body length must be a multiple of {BINARY_RECORD.size} bytes')
+    rows = []
+    fromtimestamp = datetime.datetime.fromtimestamp
+    for index, (device_id, timestamp, metric, value) in enumerate(BINARY_RECORD.iter_unpack(body)):
+        if metric not in READING_METRIC_NAMES:
+            raise ValueError(f'Record {index}: unknown metric code {metric}')
+        if device_id > MAX_DEVICE_ID:
+            raise ValueError(f'Record {index}: device_id {device_id} is out of range')
+        if not math.isfinite(value):
+            raise ValueError(f'Record {index}: value must be finite')
+        try:
+            measured_at = fromtimestamp(timestamp)
+        except (ValueError, OverflowError, OSError):
+            raise ValueError(f'Record {index}: timestamp {timestamp} is out of range')
+        rows.append((device_id, measured_at, metric, value))
+    return rows
+
+
+def encode_binary(rows) -> bytes:
+    """
+    Func what encodes (device_id, unix seconds, metric code, value) rows to a binary batch, used by clients and benchmarks
+    """
+    return b''.join(BINARY_RECORD.pack(*row) for row in rows)
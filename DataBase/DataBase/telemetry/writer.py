@@ -0,0 +1,36 @@
+import io
+
+from DataBase.core import db_connection
+from DataBase.models.telemetry_model import device_readings
+
+COLUMNS = ('device_id', 'measured_at', 'metric', 'value')
+
+
+def _copy_readings(engine, rows: list[tuple]):
+    data = io.StringIO()
+    data.writelines(
+        f'{device_id}\t{measured_at.isoformat(" ")}\t{metric}\t{value!r}\n'
+        for device_id, measured_at, metric, value in rows
+    )
+    data.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY "{device_readings.name}" ({", ".join(COLUMNS)}) FROM STDIN', data)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def write_readings(rows: list[tuple]):
+    """
+    Func what writes readings to the primary in one transaction:
+    COPY on Postgres, a single executemany INSERT elsewhere
+    :param rows: List of (device_id, measured_at, metric, value) rows
+    """
+    engine = db_connection.init_engine()
+    if engine.dialect.name == 'postgresql':
+        _copy_readings(engine, rows)
+        return
+    with engine.begin() as connection:
+        connection.execute(device_readings.insert(), [dict(zip(COLUMNS, row)) for row in rows])
@@ -1,8 +1,68 @@
+import os
+
 from . import config as cf
 from .env_conf import EnvConfig
 
+env = EnvConfig.read()
+
+db_pool_size = env.int('DB_POOL_SIZE', 5)
+db_max_overflow = env.int('DB_MAX_OVERFLOW', 10)
+
 main_config = cf.Config(
     db=cf.DBConfig(
-        db_url=EnvConfig.read()('DATABASE_URL')
+        db_url=env('DATABASE_URL'),
+        echo=env.bool('DB_ECHO', True),
+        pool_size=db_pool_size,
+        max_overflow=db_max_overflow,
+        replica_urls=env.list('DATABASE_REPLICA_URLS', []),
+        replica_max_lag=env.float('REPLICA_MAX_LAG', 5.0),
+        replica_check_interval=env.float('REPLICA_CHECK_INTERVAL', 5.0),
+        sqlite_synchronous=env('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        sqlite_mmap_size=env.int('SQLITE_MMAP_SIZE', 268435456),
+        sqlite_busy_timeout=env.int('SQLITE_BUSY_TIMEOUT', 5000),
+        history_months_ahead=env.int('HISTORY_MONTHS_AHEAD', 3)
+    ),
+    server=cf.ServerConfig(
+        mode=env('SERVER_MODE', 'development'),
+        host=env('SERVER_HOST', '0.0.0.0'),
+        port=env.int('SERVER_PORT', 8000),
+        workers=env.int('WEB_CONCURRENCY', os.cpu_count() or 1)
+    ),
+    monitoring=cf.MonitoringConfig(
+        loop_lag_interval=env.float('LOOP_LAG_INTERVAL', 0.5),
+        loop_block_threshold=env.float('LOOP_BLOCK_THRESHOLD', 0.25)
+    ),
+    admission=cf.AdmissionConfig(
+        max_concurrency=env.int('ADMISSION_MAX_CONCURRENCY', db_pool_size + db_max_overflow),
+        max_queue=env.int('ADMISSION_MAX_QUEUE', 100),
+        request_timeout=env.float('REQUEST_TIMEOUT', 10.0),
+        retry_after=env.int('ADMISSION_RETRY_AFTER', 1)
+    ),
+    events=cf.EventsConfig(
+        channel=env('EVENTS_CHANNEL', 'iot_butler_changes'),
+        buffer_size=env.int('EVENTS_BUFFER_SIZE', 100),
+        heartbeat=env.float('EVENTS_HEARTBEAT', 15.0),
+        longpoll_timeout=env.float('LONGPOLL_TIMEOUT', 30.0),
+        longpoll_max_timeout=env.float('LONGPOLL_MAX_TIMEOUT', 120.0)
+    ),
+    telemetry=cf.TelemetryConfig(
+        flush_size=env.int('TELEMETRY_FLUSH_SIZE', 5000),
+        flush_interval=env.float('TELEMETRY_FLUSH_INTERVAL', 1.0),
+        buffer_size=env.int('TELEMETRY_BUFFER_SIZE', 100000),
+        max_batch=env.int('TELEMETRY_MAX_BATCH', 10000),
+        enqueue_timeout=env.float('TELEMETRY_ENQUEUE_TIMEOUT', 1.0)
+    ),
+    scheduler=cf.SchedulerConfig(
+        enabled=env.bool('SCHEDULER_ENABLED', True),
+        batch_size=env.int('SCHEDULER_BATCH_SIZE', 500),
+        lookahead=env.float('SCHEDULER_LOOKAHEAD', 300.0),
+        misfire_grace=env.float('SCHEDULER_MISFIRE_GRACE', 3600.0)
+    ),
+    rules=cf.RulesConfig(
+        enabled=env.bool('RULES_ENABLED', True),
+        max_depth=env.int('RULES_MAX_DEPTH', 8),
+        rate_limit=env.int('RULES_RATE_LIMIT', 10),
+        rate_window=env.float('RULES_RATE_WINDOW', 60.0),
+        queue_size=env.int('RULES_QUEUE_SIZE', 1000)
     )
 )
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -7,6 +7,94 @@ class DBConfig:
     Configuration class for DataBase
     """
     db_url: str
+    echo: bool = True
+    pool_size: int = 5
+    max_overflow: int = 10
+    replica_urls: list[str] = field(default_factory=list)
+    replica_max_lag: float = 5.0
+    replica_check_interval: float = 5.0
+    sqlite_synchronous: str = 'NORMAL'
+    sqlite_mmap_size: int = 268435456
+    sqlite_busy_timeout: int = 5000
+    history_months_ahead: int = 3
+
+
+@dataclass
+class ServerConfig:
+    """
+    Configuration class for the API server process
+    """
+    mode: str = 'development'
+    host: str = '0.0.0.0'
+    port: int = 8000
+    workers: int = 1
+
+
+@dataclass
+class MonitoringConfig:
+    """
+    Configuration class for event loop monitoring
+    """
+    loop_lag_interval: float = 0.5
+    loop_block_threshold: float = 0.25
+
+
+@dataclass
+class AdmissionConfig:
+    """
+    Configuration class for API admission control
+    """
+    max_concurrency: int = 15
+    max_queue: int = 100
+    request_timeout: float = 10.0
+    retry_after: int = 1
+
+
+@dataclass
+class EventsConfig:
+    """
+    Configuration class for the change feed
+    """
+    channel: str = 'iot_butler_changes'
+    buffer_size: int = 100
+    heartbeat: float = 15.0
+    longpoll_timeout: float = 30.0
+    longpoll_max_timeout: float = 120.0
+
+
+@dataclass
+class TelemetryConfig:
+    """
+    Configuration class for telemetry ingestion
+    """
+    flush_size: int = 5000
+    flush_interval: float = 1.0
+    buffer_size: int = 100000
+    max_batch: int = 10000
+    enqueue_timeout: float = 1.0
+
+
+@dataclass
+class SchedulerConfig:
+    """
+    Configuration class for the scheduler of device actions
+    """
+    enabled: bool = True
+    batch_size: int = 500
+    lookahead: float = 300.0
+    misfire_grace: float = 3600.0
+
+
+@dataclass
+class RulesConfig:
+    """
+    Configuration class for the automation rules engine
+    """
+    enabled: bool = True
+    max_depth: int = 8
+    rate_limit: int = 10
+    rate_window: float = 60.0
+    queue_size: int = 1000
 
 
 @dataclass
@@ -15,3 +103,10 @@ class Config:
     Main configuration class for whole project
     """
     db: DBConfig
+    server: ServerConfig
+    monitoring: MonitoringConfig
+    admission: AdmissionConfig
+    events: EventsConfig
+    telemetry: TelemetryConfig
+    scheduler: SchedulerConfig
+    rules: RulesConfig
@@ -0,0 +1,24 @@
+"""
+Gunicorn settings of the production DataBase server: N uvicorn workers (uvloop + httptools).
+The app is not preloaded, so each worker creates its own DB engine after fork.
+"""
+import os
+import shutil
+
+bind = f"{os.getenv('SERVER_HOST', '0.0.0.0')}:{os.getenv('SERVER_PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = False
+graceful_timeout = 30
+timeout = 60
+
+# Metrics of all workers are aggregated through files in this directory.
+# It must be set before prometheus_client is imported anywhere in the master process
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
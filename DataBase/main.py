@@ -1,22 +1,127 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 import uvicorn
 
 import API
-from DataBase.core.db_connection import create_tables
+from API.middleware import AdmissionControlMiddleware
+from DataBase.core.db_connection import init_engine
+from DataBase.core.replicas import check_replicas, replica_engines
+from DataBase.core.schema import ensure_schema, maintain_partitions
+from DataBase.events import start_change_feed, stop_change_feed
+from DataBase.telemetry import start_telemetry, stop_telemetry
+from DataBase.scheduler import start_scheduler, stop_scheduler
+from DataBase.rules import start_rules, stop_rules
+from configurations import main_config
+from monitoring import LoopMonitor, make_metrics_app
 from log.config import logger
 
-logger.info('Creating Tables')
-create_tables()
-logger.info('Tables created')
+loop_monitor = LoopMonitor(
+    'database',
+    interval=main_config.monitoring.loop_lag_interval,
+    block_threshold=main_config.monitoring.loop_block_threshold
+)
+
+
+async def prepare_schema():
+    """
+    Running the schema check until it succeeds, the readiness endpoint turns green after it
+    """
+    delay = 1
+    while True:
+        try:
+            logger.info('Checking DataBase schema')
+            await asyncio.to_thread(ensure_schema)
+            return
+        except Exception:
+            logger.error(f'DataBase schema check failed, retrying in {delay}s', exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+async def watch_replicas():
+    """
+    Periodically checking the lag of the read replicas
+    """
+    while True:
+        await asyncio.to_thread(check_replicas)
+        await asyncio.sleep(main_config.db.replica_check_interval)
+
 
-app = FastAPI()
+async def watch_partitions():
+    """
+    Preparing partitions of the coming months once a day
+    """
+    while True:
+        await asyncio.sleep(24 * 60 * 60)
+        try:
+            await asyncio.to_thread(maintain_partitions)
+        except Exception:
+            logger.error('Partition maintenance failed', exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine is created here, i.e. in the worker process after fork
+    init_engine()
+    loop_monitor.start()
+    await start_change_feed()
+    await start_telemetry()
+    await start_scheduler()
+    await start_rules()
+    background_tasks = [asyncio.create_task(prepare_schema()), asyncio.create_task(watch_partitions())]
+    if replica_engines:
+        background_tasks.append(asyncio.create_task(watch_replicas()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await stop_rules()
+    await stop_scheduler()
+    await stop_telemetry()
+    await stop_change_feed()
+    await loop_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 logger.info('FastAPI object initialized')
 
+app.add_middleware(
+    AdmissionControlMiddleware,
+    max_concurrency=main_config.admission.max_concurrency,
+    max_queue=main_config.admission.max_queue,
+    request_timeout=main_config.admission.request_timeout,
+    retry_after=main_config.admission.retry_after,
+    # Change feed connections and parked long-polls are long-lived and would hold admission slots forever,
+    # telemetry ingestion holds no DataBase connection and has its own backpressure
+    exempt_paths=('/user/health', '/user/ready', '/metrics', '/events/', '/device/poll/', '/telemetry/ingest',
+                  '/docs', '/redoc', '/openapi.json')
+)
+
 logger.info('Connecting routers')
 app.include_router(API.user_router)
 app.include_router(API.device_router)
+app.include_router(API.events_router)
+app.include_router(API.telemetry_router)
+app.include_router(API.group_router)
+app.include_router(API.scene_router)
+app.include_router(API.schedule_router)
+app.include_router(API.rule_router)
+app.include_router(API.stats_router)
+app.mount('/metrics', make_metrics_app())
 logger.info('Routers are connected')
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if main_config.server.mode == 'production':
+        logger.info(f'Starting production server with {main_config.server.workers} workers')
+        uvicorn.run(
+            'main:app',
+            host=main_config.server.host,
+            port=main_config.server.port,
+            workers=main_config.server.workers,
+            loop='uvloop',
+            http='httptools'
+        )
+    else:
+        uvicorn.run(app, host=main_config.server.host, port=main_config.server.port)
@@ -0,0 +1,2 @@
+from .loop_monitor import LoopMonitor
+from .exporter import make_metrics_app
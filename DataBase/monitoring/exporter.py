@@ -0,0 +1,18 @@
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, make_asgi_app, multiprocess
+
+
+def make_metrics_app():
+    """
+    ASGI app serving Prometheus metrics.
+    With PROMETHEUS_MULTIPROC_DIR set (several server workers) metrics of all workers are aggregated
+
+    Returns:
+        ASGI application for the /metrics mount
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return make_asgi_app(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return make_asgi_app(registry)